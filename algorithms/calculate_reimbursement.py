@@ -4,85 +4,194 @@ Black Box Reimbursement System Replica
 Based on analysis of 1000 historical cases and employee interviews
 """
 
+import os
 import sys
 import math
+import time
+import atexit
+import json
+import select
+import signal
+import socket
+import pickle
+import sqlite3
+import tempfile
+import threading
+import hashlib
+import argparse
+import functools
+
+import numpy as np
+
+from reimbursement_rules import RULES_FILE, RULE_NAMES, load_rules, evaluate_rule, evaluate_rule_batch, rule_band
+from reimbursement_trace import TRACE_ENV, Tracer, band_labels
+
+RULES = load_rules()
+
+STREAM_CHUNK_SIZE = 1024
+CACHE_SIZE = 65536
+
+# Set to a file path to persist cached results across processes
+CACHE_DB_ENV = "REIMBURSEMENT_CACHE_DB"
+
+# Unix socket the daemon listens on (--serve) and clients connect to (--client)
+SOCKET_ENV = "REIMBURSEMENT_SOCKET"
+
+# Daemon connections flush once this many response bytes are pending
+DAEMON_WRITE_BUFFER = 1 << 16
+
+_persistent_cache = None
+_persistent_cache_path = None
+
+# Active Tracer, see enable_tracing(); None keeps the hot paths untraced
+_tracer = None
+
+def _trip_hash(days, miles_cents, receipt_cents):
+    """
+    Stable 32-bit hash of a trip (FNV-1a over the three integer keys)
+    
+    Unlike the built-in hash() this is the same in every process, and run.sh
+    computes the identical value with shell arithmetic.
+    """
+    h = 2166136261
+    for value in (days, miles_cents, receipt_cents):
+        h = ((h ^ (value & 0xFFFFFFFF)) * 16777619) & 0xFFFFFFFF
+    return h ^ (h >> 16)
+
+def _trip_hash_batch(days, miles_cents, receipt_cents):
+    """
+    Vectorized _trip_hash() over int64 arrays
+    """
+    h = np.full(days.shape, 2166136261, dtype=np.uint64)
+    for value in (days, miles_cents, receipt_cents):
+        h = ((h ^ (value.astype(np.uint64) & 0xFFFFFFFF)) * 16777619) & 0xFFFFFFFF
+    return h ^ (h >> 16)
+
+def _check_finite(*values):
+    """
+    Raise ValueError unless every trip input is a finite number
+    
+    Shared by the scalar, batch and stream paths so an inf or nan input is
+    rejected the same way everywhere instead of overflowing later.
+    """
+    for value in values:
+        if not math.isfinite(float(value)):
+            raise ValueError(f"trip inputs must be finite numbers, got {value}")
 
 def calculate_reimbursement(trip_duration_days, miles_traveled, total_receipts_amount):
     """
     Calculate reimbursement based on reverse-engineered legacy system logic
+    
+    Receipts are money and are taken to the nearest cent. Results are memoized
+    on (days, miles, receipt cents), see enable_persistent_cache().
     """
+    _check_finite(trip_duration_days, miles_traveled, total_receipts_amount)
     days = int(trip_duration_days)
     miles = float(miles_traveled)
-    receipts = float(total_receipts_amount)
-    
-    # Base per diem calculation with trip length scaling
-    # Analysis showed per-day rates decrease with longer trips
-    if days == 1:
-        base_perdiem = 95.0  # Higher rate for single day trips
-    elif days == 2:
-        base_perdiem = 102.0  
-    elif days <= 4:
-        base_perdiem = 105.0  # Optimal base rate from analysis
-    elif days == 5:
-        base_perdiem = 108.0  # 5-day bonus mentioned in interviews
-    elif days <= 7:
-        base_perdiem = 102.0
-    elif days <= 10:
-        base_perdiem = 98.0   # Decreasing for longer trips
-    else:
-        base_perdiem = 95.0   # Lowest for very long trips
+    receipt_cents = round(float(total_receipts_amount) * 100)
+    if _tracer is not None:
+        return _traced_reimbursement(days, miles, receipt_cents)
+    return _cached_reimbursement(days, miles, receipt_cents)
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _cached_reimbursement(days, miles, receipt_cents):
+    """
+    LRU layer in front of the optional on-disk cache and the calculation
+    """
+    if _persistent_cache is None:
+        return _compute_reimbursement(days, miles, receipt_cents)
     
-    base_amount = days * base_perdiem
+    key = (days, miles, receipt_cents)
+    row = _persistent_cache.execute(
+        "SELECT reimbursement FROM results WHERE days = ? AND miles = ? AND receipt_cents = ?",
+        key).fetchone()
+    if row is not None:
+        return row[0]
     
-    # Mileage calculation with tiered rates
-    # Analysis showed clear breakpoint around 100 miles
-    mileage_reimbursement = 0.0
+    result = _compute_reimbursement(days, miles, receipt_cents)
+    with _persistent_cache:
+        _persistent_cache.execute("INSERT OR IGNORE INTO results VALUES (?, ?, ?, ?)", key + (result,))
+    return result
+
+def _engine_fingerprint():
+    """
+    Hash of this file and the rule table, so persisted results are dropped
+    when the rules change
+    """
+    digest = hashlib.sha256()
+    for path in (os.path.abspath(__file__), RULES_FILE):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def enable_persistent_cache(path):
+    """
+    Back the in-memory LRU cache with an SQLite file at path
     
-    if miles <= 100:
-        # First tier: higher rate for short distances
-        mileage_reimbursement = miles * 0.65
-    else:
-        # First 100 miles at higher rate
-        mileage_reimbursement = 100 * 0.65
-        # Remaining miles at lower rate
-        remaining_miles = miles - 100
-        mileage_reimbursement += remaining_miles * 0.45
-    
-    # Receipt processing with penalties for very small amounts
-    receipt_adjustment = 0.0
-    
-    if receipts <= 5.0:
-        # Small receipt penalty - analysis showed these get poor treatment
-        receipt_adjustment = -20.0  # Penalty for tiny receipts
-    elif receipts <= 20.0:
-        # Still small, but not as penalized
-        receipt_adjustment = receipts * 0.3
-    elif receipts <= 100.0:
-        # Moderate amounts get decent treatment  
-        receipt_adjustment = receipts * 0.6
-    else:
-        # Large amounts with diminishing returns
-        receipt_adjustment = 100 * 0.6 + (receipts - 100) * 0.4
+    Results stored by a different version of this file are discarded.
+    """
+    global _persistent_cache, _persistent_cache_path
+    
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    conn.execute("CREATE TABLE IF NOT EXISTS results ("
+                 "days INTEGER, miles REAL, receipt_cents INTEGER, reimbursement REAL, "
+                 "PRIMARY KEY (days, miles, receipt_cents))")
+    
+    fingerprint = _engine_fingerprint()
+    row = conn.execute("SELECT value FROM meta WHERE key = 'engine'").fetchone()
+    if row is None or row[0] != fingerprint:
+        with conn:
+            conn.execute("DELETE FROM results")
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('engine', ?)", (fingerprint,))
+    
+    if _persistent_cache is not None:
+        _persistent_cache.close()
+    _persistent_cache = conn
+    _persistent_cache_path = path
+    _cached_reimbursement.cache_clear()
+
+def disable_persistent_cache():
+    """
+    Close the on-disk cache, if enabled, and return its path (or None)
+    """
+    global _persistent_cache, _persistent_cache_path
+    
+    path = _persistent_cache_path
+    if _persistent_cache is not None:
+        _persistent_cache.close()
+    _persistent_cache = _persistent_cache_path = None
+    _cached_reimbursement.cache_clear()
+    return path
+
+def clear_cache():
+    """
+    Empty the in-memory cache and, if enabled, the persistent one
+    """
+    _cached_reimbursement.cache_clear()
+    if _persistent_cache is not None:
+        with _persistent_cache:
+            _persistent_cache.execute("DELETE FROM results")
+
+def _compute_reimbursement(days, miles, receipt_cents):
+    """
+    Uncached calculation for one canonical trip key
+    """
+    receipts = receipt_cents / 100
+    
+    # Every component is a table lookup, see reimbursement_rules.txt
+    base_amount = evaluate_rule(RULES["per_diem"], days)
+    mileage_reimbursement = evaluate_rule(RULES["mileage"], miles)
+    receipt_adjustment = evaluate_rule(RULES["receipts"], receipts)
     
     # Efficiency bonus/penalty based on miles per day
     miles_per_day = miles / days if days > 0 else 0
-    efficiency_adjustment = 0.0
-    
-    if miles_per_day >= 100 and miles_per_day <= 200:
-        # Sweet spot for efficiency (though analysis showed mixed results)
-        efficiency_adjustment = 15.0
-    elif miles_per_day > 250:
-        # Too high efficiency might be unrealistic
-        efficiency_adjustment = -10.0
+    efficiency_adjustment = evaluate_rule(RULES["efficiency"], miles_per_day)
     
     # Trip length bonuses/penalties
-    length_adjustment = 0.0
-    if days == 5:
-        # 5-day bonus confirmed in interviews and analysis
-        length_adjustment = 25.0
-    elif days >= 12:
-        # Very long trips get slight penalty
-        length_adjustment = -15.0
+    length_adjustment = evaluate_rule(RULES["trip_length"], days)
     
     # Combine all components
     total_reimbursement = (base_amount + 
@@ -93,7 +202,7 @@ def calculate_reimbursement(trip_duration_days, miles_traveled, total_receipts_a
     
     # Apply some variance based on "hidden factors" mentioned in interviews
     # Using a simple hash-based pseudo-randomness to simulate unknown factors
-    hash_factor = hash(f"{days}_{miles}_{receipts}") % 100
+    hash_factor = _trip_hash(days, round(miles * 100), receipt_cents) % 100
     variance = (hash_factor - 50) * 0.5  # Small random variance +/- $25
     
     total_reimbursement += variance
@@ -103,9 +212,500 @@ def calculate_reimbursement(trip_duration_days, miles_traveled, total_receipts_a
     
     return round(total_reimbursement, 2)
 
+def reimbursement_breakdown(trip_duration_days, miles_traveled, total_receipts_amount):
+    """
+    Every component of a reimbursement and the rule band it came from
+    
+    Returns {"components": {name: dollars}, "bands": {rule: band index},
+    "subtotal", "floored", "reimbursement"}; the reimbursement equals
+    calculate_reimbursement() for the same trip.
+    """
+    _check_finite(trip_duration_days, miles_traveled, total_receipts_amount)
+    days = int(trip_duration_days)
+    miles = float(miles_traveled)
+    receipt_cents = round(float(total_receipts_amount) * 100)
+    
+    inputs = {
+        "per_diem": days,
+        "mileage": miles,
+        "receipts": receipt_cents / 100,
+        "efficiency": miles / days if days > 0 else 0,
+        "trip_length": days,
+    }
+    components = {name: evaluate_rule(RULES[name], inputs[name]) for name in RULE_NAMES}
+    bands = {name: rule_band(RULES[name], inputs[name]) for name in RULE_NAMES}
+    hash_factor = _trip_hash(days, round(miles * 100), receipt_cents) % 100
+    components["variance"] = (hash_factor - 50) * 0.5
+    
+    # Summed in the same order as _compute_reimbursement()
+    subtotal = 0
+    for name in RULE_NAMES:
+        subtotal = subtotal + components[name]
+    subtotal += components["variance"]
+    
+    return {
+        "components": components,
+        "bands": bands,
+        "subtotal": subtotal,
+        "floored": subtotal < 50.0,
+        "reimbursement": round(max(subtotal, 50.0), 2),
+    }
+
+def _traced_reimbursement(days, miles, receipt_cents):
+    """
+    calculate_reimbursement() with the call timed and its breakdown recorded
+    """
+    started = time.perf_counter()
+    result = _cached_reimbursement(days, miles, receipt_cents)
+    seconds = time.perf_counter() - started
+    # The breakdown is recomputed outside the timed section
+    _tracer.record_call((days, miles, receipt_cents / 100),
+                        reimbursement_breakdown(days, miles, receipt_cents / 100), seconds)
+    return result
+
+def enable_tracing(keep_calls=0):
+    """
+    Start recording component, band, floor and timing counters for every
+    calculate_reimbursement() and calculate_reimbursement_batch() call
+    
+    Returns the new Tracer; keep_calls > 0 also keeps that many recent
+    scalar calls in full. Tracing is off by default and costs one None
+    check per call while off.
+    """
+    global _tracer
+    _tracer = Tracer(RULES, band_labels(RULES_FILE), keep_calls)
+    return _tracer
+
+def disable_tracing():
+    """
+    Stop tracing and return the Tracer that was active, if any
+    """
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+def _round_cents(values):
+    """
+    Round an array to cents exactly the way the built-in round(x, 2) does
+    """
+    scaled = values * 100
+    cents = np.rint(scaled)
+    # np.rint can only disagree with round() when the scaled product lands
+    # exactly on a half cent, so defer those few ties to the built-in
+    ties = np.abs(scaled - np.trunc(scaled)) == 0.5
+    result = cents / 100
+    if ties.any():
+        result[ties] = [round(v, 2) for v in values[ties].tolist()]
+    return result
+
+def batch_rule_inputs(days, miles, receipts):
+    """
+    Per-rule inputs and the hidden-factor variance for arrays of trips
+    
+    Returns ({rule name: input array}, variance array); the reimbursement is
+    the sum of every rule at its input plus the variance, floored and rounded.
+    """
+    days = np.asarray(days)
+    miles = np.asarray(miles, dtype=np.float64)
+    receipts = np.asarray(receipts, dtype=np.float64)
+    for values in (days.astype(np.float64), miles, receipts):
+        if not np.isfinite(values).all():
+            _check_finite(values[~np.isfinite(values)][0])
+    days = days.astype(np.int64)
+    receipt_cents = np.rint(receipts * 100)
+    receipts = receipt_cents / 100
+    
+    miles_per_day = np.divide(miles, days, out=np.zeros_like(miles), where=days > 0)
+    inputs = {
+        "per_diem": days,
+        "mileage": miles,
+        "receipts": receipts,
+        "efficiency": miles_per_day,
+        "trip_length": days,
+    }
+    
+    # The "hidden factors" variance uses the same stable hash as the scalar path
+    miles_cents = np.rint(miles * 100).astype(np.int64)
+    hash_factor = _trip_hash_batch(days, miles_cents, receipt_cents.astype(np.int64)) % 100
+    variance = (hash_factor.astype(np.int64) - 50) * 0.5
+    
+    return inputs, variance
+
+def calculate_reimbursement_batch(days, miles, receipts):
+    """
+    Vectorized calculate_reimbursement() over arrays of trips
+    """
+    if _tracer is not None:
+        started = time.perf_counter()
+    inputs, variance = batch_rule_inputs(days, miles, receipts)
+    
+    # Summed in the same order as the scalar path
+    total_reimbursement = evaluate_rule_batch(RULES["per_diem"], inputs["per_diem"])
+    for name in RULE_NAMES[1:]:
+        total_reimbursement = total_reimbursement + evaluate_rule_batch(RULES[name], inputs[name])
+    
+    total_reimbursement += variance
+    
+    if _tracer is not None:
+        result = _round_cents(np.maximum(total_reimbursement, 50.0))
+        _tracer.record_batch(inputs, variance, total_reimbursement, time.perf_counter() - started)
+        return result
+    
+    total_reimbursement = np.maximum(total_reimbursement, 50.0)
+    
+    return _round_cents(total_reimbursement)
+
+def _parse_trip(line):
+    """
+    Parse one streamed trip given as a CSV row or a JSON Lines object
+    """
+    line = line.strip()
+    if line.startswith("{"):
+        trip = json.loads(line)
+        # Accept public-case records as well as flat private-case records
+        trip = trip.get("input", trip)
+        fields = (trip["trip_duration_days"],
+                  trip["miles_traveled"],
+                  trip["total_receipts_amount"])
+    else:
+        fields = [field.strip() for field in line.split(",")]
+        if len(fields) != 3:
+            raise ValueError(f"expected 3 fields, got {len(fields)}")
+    _check_finite(*fields)
+    return int(fields[0]), float(fields[1]), float(fields[2])
+
+def _input_pending(stream):
+    """
+    True if more input can be read from stream without blocking
+    """
+    try:
+        return bool(select.select([stream], [], [], 0)[0])
+    except (OSError, ValueError):
+        return True
+
+def _iter_chunks(stream, chunk_size):
+    """
+    Group input lines into chunks of at most chunk_size lines
+    
+    A chunk is also cut short whenever the producer pauses, so interactive
+    callers get their answers without waiting for a full chunk.
+    """
+    chunk = []
+    for line in stream:
+        chunk.append(line)
+        if len(chunk) >= chunk_size or not _input_pending(stream):
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def stream_reimbursements(instream, outstream, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Read trips from instream and write one result per trip to outstream
+    
+    Trips are CSV rows (days,miles,receipts) or JSON Lines objects. Lines
+    that cannot be parsed produce ERROR so output stays aligned with input.
+    Blank lines and a CSV header (a first row that does not start with a
+    number) are skipped. Returns the number of ERROR lines written.
+    """
+    errors = 0
+    first_line = True
+    for chunk in _iter_chunks(instream, chunk_size):
+        trips = []
+        for line in chunk:
+            if not line.strip():
+                continue
+            try:
+                trips.append(_parse_trip(line))
+            except (ValueError, KeyError, TypeError) as e:
+                # Like run.sh --batch, only a first row whose days field is
+                # not a number is a header; "1,abc,3" is a bad trip
+                first_char = line.lstrip()[:1]
+                if first_line and not first_char.isdigit() and first_char != "{":
+                    first_line = False
+                    continue
+                print(f"Error: Invalid input - {e}", file=sys.stderr)
+                trips.append(None)
+            first_line = False
+        
+        valid = [trip for trip in trips if trip is not None]
+        if valid:
+            days, miles, receipts = zip(*valid)
+            results = iter(calculate_reimbursement_batch(days, miles, receipts).tolist())
+        
+        lines = []
+        for trip in trips:
+            if trip is None:
+                errors += 1
+                lines.append("ERROR\n")
+            else:
+                lines.append(f"{next(results):.2f}\n")
+        outstream.write("".join(lines))
+        outstream.flush()
+    return errors
+
+def _run_stream(argv):
+    """
+    Command line entry point for --stream mode
+    """
+    parser = argparse.ArgumentParser(
+        prog="calculate_reimbursement.py --stream",
+        description="Read trips from stdin as CSV or JSON Lines and write one result per line",
+    )
+    parser.add_argument("--chunk-size", type=int, default=STREAM_CHUNK_SIZE,
+                        help="maximum number of trips buffered before results are written")
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+    
+    errors = stream_reimbursements(sys.stdin, sys.stdout, args.chunk_size)
+    return 1 if errors else 0
+
+def default_socket_path():
+    """
+    Daemon socket path: $REIMBURSEMENT_SOCKET, else a per-user file in the
+    temp directory
+    """
+    return os.environ.get(SOCKET_ENV) or os.path.join(
+        tempfile.gettempdir(), f"reimbursement-{os.getuid()}.sock")
+
+def _answer(line):
+    """
+    Daemon response line for one request line
+    
+    Any failure only answers ERROR for this line; the connection and the
+    other requests pipelined on it carry on.
+    """
+    try:
+        return f"{calculate_reimbursement(*_parse_trip(line)):.2f}\n"
+    except Exception:
+        return "ERROR\n"
+
+async def _handle_connection(reader, writer):
+    """
+    Serve one client: one response line per non-blank request line, in order
+    
+    Responses are written without waiting on the client, so a client can
+    pipeline any number of trips; the connection only pauses for the
+    client to catch up when DAEMON_WRITE_BUFFER bytes are pending.
+    """
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if not line.strip():
+                continue
+            writer.write(_answer(line.decode(errors="replace")).encode())
+            if writer.transport.get_write_buffer_size() > DAEMON_WRITE_BUFFER:
+                await writer.drain()
+        await writer.drain()
+    except (ConnectionError, ValueError):
+        # Client went away, or sent a line longer than the reader's limit
+        pass
+    finally:
+        writer.close()
+
+async def _serve_socket(sock):
+    import asyncio
+    
+    server = await asyncio.start_unix_server(_handle_connection, sock=sock)
+    async with server:
+        await server.serve_forever()
+
+def _bind_socket(path):
+    """
+    Listen on a Unix socket at path, replacing a stale socket file but
+    refusing to take over from a live daemon
+    """
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.unlink(path)
+        else:
+            raise OSError(f"a daemon is already listening on {path}")
+        finally:
+            probe.close()
+    
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(path)
+    os.chmod(path, 0o600)
+    sock.listen(socket.SOMAXCONN)
+    return sock
+
+def serve(path, workers=1):
+    """
+    Run the reimbursement daemon on a Unix socket until SIGINT or SIGTERM
+    
+    With workers > 1 the listening socket is shared by that many forked
+    worker processes, each running its own asyncio loop and cache. An
+    SQLite connection cannot cross a fork, so the persistent cache is
+    reopened in every worker, and the workers' trace counters are merged
+    into this process's tracer when they exit.
+    """
+    import asyncio
+    
+    sock = _bind_socket(path)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    children = []
+    try:
+        if workers <= 1:
+            asyncio.run(_serve_socket(sock))
+            return
+        
+        cache_path = disable_persistent_cache()
+        for _ in range(workers):
+            trace_read, trace_write = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    os.close(trace_read)
+                    if cache_path is not None:
+                        enable_persistent_cache(cache_path)
+                    asyncio.run(_serve_socket(sock))
+                except (KeyboardInterrupt, SystemExit):
+                    pass
+                finally:
+                    try:
+                        # os._exit() skips atexit, so hand the counters over here
+                        if _tracer is not None:
+                            with os.fdopen(trace_write, 'wb') as f:
+                                pickle.dump(_tracer, f)
+                    finally:
+                        os._exit(0)
+            os.close(trace_write)
+            children.append((pid, trace_read))
+        
+        # Wait for any worker to exit; the pool goes down together
+        os.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for pid, trace_read in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+            # Read to EOF before reaping, so a large trace cannot block the worker
+            with os.fdopen(trace_read, 'rb') as f:
+                trace = f.read()
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+            if trace and _tracer is not None:
+                _tracer.merge(pickle.loads(trace))
+        sock.close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+def _run_serve(argv):
+    """
+    Command line entry point for --serve mode
+    """
+    parser = argparse.ArgumentParser(
+        prog="calculate_reimbursement.py --serve",
+        description="Serve reimbursements on a Unix socket, one result line per request line",
+    )
+    parser.add_argument("--socket", default=default_socket_path(),
+                        help=f"socket path (default: ${SOCKET_ENV} or a per-user file in the temp directory)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes sharing the socket (default: 1)")
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    
+    try:
+        serve(args.socket, args.workers)
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+def _run_client(argv):
+    """
+    Command line entry point for --client mode
+    
+    With a trip on the command line this behaves like the regular CLI;
+    without one it pipelines stdin to the daemon and prints every result.
+    """
+    parser = argparse.ArgumentParser(
+        prog="calculate_reimbursement.py --client",
+        description="Ask a running --serve daemon for reimbursements",
+    )
+    parser.add_argument("--socket", default=default_socket_path(),
+                        help=f"socket path (default: ${SOCKET_ENV} or a per-user file in the temp directory)")
+    parser.add_argument("trip", nargs="*", help="days miles receipts; read trips from stdin if omitted")
+    args = parser.parse_args(argv)
+    if args.trip and len(args.trip) != 3:
+        parser.error("expected <days> <miles> <receipts>")
+    
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(args.socket)
+    except OSError as e:
+        print(f"Error: Cannot connect to daemon at {args.socket} - {e}", file=sys.stderr)
+        return 1
+    
+    with sock, sock.makefile('r') as responses:
+        if args.trip:
+            sock.sendall((",".join(args.trip) + "\n").encode())
+            result = responses.readline().strip()
+            if result in ("", "ERROR"):
+                print("Error: Invalid input", file=sys.stderr)
+                return 1
+            print(result)
+            return 0
+        
+        # Send from a thread so a large pipeline cannot deadlock against
+        # responses filling the socket buffer
+        def send_all():
+            try:
+                for line in sys.stdin:
+                    sock.sendall(line.encode())
+                sock.shutdown(socket.SHUT_WR)
+            except OSError:
+                pass
+        
+        sender = threading.Thread(target=send_all, daemon=True)
+        sender.start()
+        errors = 0
+        for result in responses:
+            errors += result.startswith("ERROR")
+            sys.stdout.write(result)
+        sender.join()
+    sys.stdout.flush()
+    return 1 if errors else 0
+
 if __name__ == "__main__":
+    if os.environ.get(CACHE_DB_ENV):
+        enable_persistent_cache(os.environ[CACHE_DB_ENV])
+    
+    if os.environ.get(TRACE_ENV):
+        atexit.register(enable_tracing().write, os.environ[TRACE_ENV])
+    
+    if len(sys.argv) > 1 and sys.argv[1] == "--stream":
+        try:
+            sys.exit(_run_stream(sys.argv[2:]))
+        except (BrokenPipeError, KeyboardInterrupt):
+            sys.exit(1)
+    
+    if len(sys.argv) > 1 and sys.argv[1] == "--serve":
+        sys.exit(_run_serve(sys.argv[2:]))
+    
+    if len(sys.argv) > 1 and sys.argv[1] == "--client":
+        try:
+            sys.exit(_run_client(sys.argv[2:]))
+        except (BrokenPipeError, KeyboardInterrupt):
+            sys.exit(1)
+    
     if len(sys.argv) != 4:
         print("Usage: python3 calculate_reimbursement.py <days> <miles> <receipts>", file=sys.stderr)
+        print("       python3 calculate_reimbursement.py --stream [--chunk-size N] < trips", file=sys.stderr)
+        print("       python3 calculate_reimbursement.py --serve [--socket PATH] [--workers N]", file=sys.stderr)
+        print("       python3 calculate_reimbursement.py --client [--socket PATH] [<days> <miles> <receipts>]", file=sys.stderr)
         sys.exit(1)
     
     try:
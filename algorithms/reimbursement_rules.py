@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Loader and compiler for the shared reimbursement rule table
+Turns reimbursement_rules.txt into sorted breakpoint arrays evaluated with
+bisect for single trips and np.searchsorted for batches
+"""
+
+import os
+import sys
+import math
+import bisect
+from collections import namedtuple
+
+import numpy as np
+
+# Set to a file path to evaluate an alternative rule table (run.sh honours it too)
+RULES_ENV = "REIMBURSEMENT_RULES"
+
+RULES_FILE = os.environ.get(RULES_ENV) or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "reimbursement_rules.txt")
+
+RULE_NAMES = ("per_diem", "mileage", "receipts", "efficiency", "trip_length")
+
+# breakpoints excludes the final "inf" band; every other field has one entry per band
+CompiledRule = namedtuple("CompiledRule", [
+    "breakpoints", "bases", "rates", "origins",
+    "breakpoint_array", "base_array", "rate_array", "origin_array",
+])
+
+def load_rule_table(path=RULES_FILE):
+    """
+    Parse the rule table into {rule name: [(op, bound, base, rate, origin), ...]}
+    """
+    table = {}
+    last_name = None
+    with open(path, 'r') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            fields = line.split()
+            if len(fields) != 6:
+                raise ValueError(f"{path}:{line_number}: expected 6 columns, got {len(fields)}")
+            name, op, bound, base, rate, origin = fields
+            if op not in ("<", "<="):
+                raise ValueError(f"{path}:{line_number}: unknown operator {op!r}")
+            if name in table and name != last_name:
+                raise ValueError(f"{path}:{line_number}: bands of rule {name} must be listed together")
+            last_name = name
+            table.setdefault(name, []).append(
+                (op, float(bound), float(base), float(rate), float(origin)))
+    return table
+
+def compile_rule(name, bands):
+    """
+    Compile one rule's bands into breakpoint and coefficient arrays
+
+    A band "x < bound" is stored as "x <= the float just below bound", so
+    every breakpoint selects its band with a single bisect_left.
+    """
+    breakpoints = []
+    for op, bound, _, _, _ in bands[:-1]:
+        if math.isinf(bound):
+            raise ValueError(f"rule {name}: only the last band may be unbounded")
+        breakpoints.append(math.nextafter(bound, -math.inf) if op == "<" else bound)
+    if not math.isinf(bands[-1][1]):
+        raise ValueError(f"rule {name}: last band must have bound inf")
+    if any(lo >= hi for lo, hi in zip(breakpoints, breakpoints[1:])):
+        raise ValueError(f"rule {name}: bounds must be strictly increasing")
+
+    bases = [band[2] for band in bands]
+    rates = [band[3] for band in bands]
+    origins = [band[4] for band in bands]
+    return CompiledRule(
+        breakpoints, bases, rates, origins,
+        np.array(breakpoints, dtype=np.float64),
+        np.array(bases, dtype=np.float64),
+        np.array(rates, dtype=np.float64),
+        np.array(origins, dtype=np.float64),
+    )
+
+def load_rules(path=RULES_FILE):
+    """
+    Load and compile every rule the engine needs
+    """
+    table = load_rule_table(path)
+    missing = [name for name in RULE_NAMES if name not in table]
+    if missing:
+        raise ValueError(f"{path}: missing rules: {', '.join(missing)}")
+    return {name: compile_rule(name, bands) for name, bands in table.items()}
+
+def evaluate_rule(rule, x):
+    """
+    Value of a compiled rule for one input
+    """
+    band = bisect.bisect_left(rule.breakpoints, x)
+    return rule.bases[band] + rule.rates[band] * (x - rule.origins[band])
+
+def rule_band(rule, x):
+    """
+    Index of the band a single input falls in
+    """
+    return bisect.bisect_left(rule.breakpoints, x)
+
+def evaluate_rule_batch(rule, x):
+    """
+    Value of a compiled rule for an array of inputs
+    """
+    band = np.searchsorted(rule.breakpoint_array, x, side='left')
+    return rule.base_array[band] + rule.rate_array[band] * (x - rule.origin_array[band])
+
+if __name__ == "__main__":
+    # Print the compiled tables, useful after editing the rule file
+    path = sys.argv[1] if len(sys.argv) > 1 else RULES_FILE
+    for name, rule in load_rules(path).items():
+        print(f"{name}:")
+        for band, (base, rate, origin) in enumerate(zip(rule.bases, rule.rates, rule.origins)):
+            bound = rule.breakpoints[band] if band < len(rule.breakpoints) else math.inf
+            print(f"  x <= {bound!r:<22} {base:+.2f} {rate:+.4f} * (x - {origin:g})")
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Optional instrumentation for the reimbursement engine
+Counts which rule band fired for every component, sums each component's
+contribution, and records floor clamps and call timings, exportable as
+JSON or Prometheus text
+"""
+
+import json
+import collections
+
+import numpy as np
+
+from reimbursement_rules import RULE_NAMES, load_rule_table
+
+# Components of a reimbursement, in the order they are summed
+COMPONENTS = RULE_NAMES + ("variance",)
+
+# Set to an output path to trace the CLI and write the counters at exit;
+# a .prom suffix selects Prometheus text, anything else JSON
+TRACE_ENV = "REIMBURSEMENT_TRACE"
+
+def band_labels(path):
+    """
+    Human-readable condition of every band, e.g. "<=100", per rule
+    """
+    return {name: [f"{op}{bound:g}" for op, bound, _, _, _ in bands]
+            for name, bands in load_rule_table(path).items()}
+
+class Tracer:
+    """
+    Counters for traced calls; scalar calls and batches are kept apart
+
+    With keep_calls > 0 the most recent scalar calls are also kept in full
+    (components, bands, floor and timing) for inspection.
+    """
+
+    def __init__(self, rules, labels, keep_calls=0):
+        self.rules = rules
+        self.labels = labels
+        self.band_counts = {name: [0] * len(labels[name]) for name in RULE_NAMES}
+        self.band_amounts = {name: [0.0] * len(labels[name]) for name in RULE_NAMES}
+        self.variance_amount = 0.0
+        self.trips = {"scalar": 0, "batch": 0}
+        self.calls = {"scalar": 0, "batch": 0}
+        self.seconds = {"scalar": 0.0, "batch": 0.0}
+        self.max_seconds = {"scalar": 0.0, "batch": 0.0}
+        self.floor_clamps = 0
+        self.recent_calls = collections.deque(maxlen=keep_calls) if keep_calls > 0 else None
+
+    def _record_timing(self, mode, trips, seconds):
+        self.calls[mode] += 1
+        self.trips[mode] += trips
+        self.seconds[mode] += seconds
+        self.max_seconds[mode] = max(self.max_seconds[mode], seconds)
+
+    def record_call(self, trip, breakdown, seconds):
+        """Account for one scalar call and its reimbursement_breakdown()"""
+        self._record_timing("scalar", 1, seconds)
+        for name in RULE_NAMES:
+            band = breakdown["bands"][name]
+            self.band_counts[name][band] += 1
+            self.band_amounts[name][band] += breakdown["components"][name]
+        self.variance_amount += breakdown["components"]["variance"]
+        self.floor_clamps += breakdown["floored"]
+        if self.recent_calls is not None:
+            self.recent_calls.append(dict(breakdown, trip=list(trip), seconds=seconds))
+
+    def record_batch(self, inputs, variance, totals, seconds):
+        """
+        Account for one calculate_reimbursement_batch() call from its rule
+        inputs, variance and unfloored totals
+        """
+        self._record_timing("batch", len(totals), seconds)
+        for name in RULE_NAMES:
+            rule = self.rules[name]
+            x = inputs[name]
+            bands = np.searchsorted(rule.breakpoint_array, x, side='left')
+            amounts = rule.base_array[bands] + rule.rate_array[bands] * (x - rule.origin_array[bands])
+            size = len(self.band_counts[name])
+            counts = np.bincount(bands, minlength=size)
+            sums = np.bincount(bands, weights=amounts, minlength=size)
+            for band in range(size):
+                self.band_counts[name][band] += int(counts[band])
+                self.band_amounts[name][band] += float(sums[band])
+        self.variance_amount += float(np.sum(variance))
+        self.floor_clamps += int(np.count_nonzero(totals < 50.0))
+
+    def merge(self, other):
+        """Add the counters of another Tracer over the same rule table"""
+        for mode in self.trips:
+            self.calls[mode] += other.calls[mode]
+            self.trips[mode] += other.trips[mode]
+            self.seconds[mode] += other.seconds[mode]
+            self.max_seconds[mode] = max(self.max_seconds[mode], other.max_seconds[mode])
+        for name in RULE_NAMES:
+            for band, count in enumerate(other.band_counts[name]):
+                self.band_counts[name][band] += count
+                self.band_amounts[name][band] += other.band_amounts[name][band]
+        self.variance_amount += other.variance_amount
+        self.floor_clamps += other.floor_clamps
+        if self.recent_calls is not None and other.recent_calls is not None:
+            self.recent_calls.extend(other.recent_calls)
+
+    def to_dict(self):
+        """Every counter as plain JSON-ready data"""
+        data = {
+            "trips": dict(self.trips),
+            "calls": dict(self.calls),
+            "seconds": dict(self.seconds),
+            "max_seconds": dict(self.max_seconds),
+            "floor_clamps": self.floor_clamps,
+            "components": {
+                name: [{"band": band, "condition": self.labels[name][band],
+                        "count": self.band_counts[name][band],
+                        "amount": round(self.band_amounts[name][band], 2)}
+                       for band in range(len(self.labels[name]))]
+                for name in RULE_NAMES
+            },
+            "variance_amount": round(self.variance_amount, 2),
+        }
+        if self.recent_calls is not None:
+            data["recent_calls"] = list(self.recent_calls)
+        return data
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self):
+        """Counters in the Prometheus text exposition format"""
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{val}"' for key, val in labels)
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+        modes = ("scalar", "batch")
+        metric("reimbursement_trips_total", "counter", "Trips calculated",
+               [((("mode", mode),), self.trips[mode]) for mode in modes])
+        metric("reimbursement_calls_total", "counter", "Engine calls",
+               [((("mode", mode),), self.calls[mode]) for mode in modes])
+        metric("reimbursement_call_seconds_total", "counter", "Time spent in engine calls",
+               [((("mode", mode),), repr(self.seconds[mode])) for mode in modes])
+        metric("reimbursement_call_seconds_max", "gauge", "Slowest engine call",
+               [((("mode", mode),), repr(self.max_seconds[mode])) for mode in modes])
+        metric("reimbursement_floor_clamps_total", "counter", "Trips raised to the $50 minimum",
+               [((), self.floor_clamps)])
+
+        band_samples = []
+        amount_samples = []
+        for name in RULE_NAMES:
+            for band, condition in enumerate(self.labels[name]):
+                labels = (("component", name), ("band", band), ("condition", condition))
+                band_samples.append((labels, self.band_counts[name][band]))
+                amount_samples.append((labels, round(self.band_amounts[name][band], 2)))
+        metric("reimbursement_band_trips_total", "counter", "Trips that fell in each rule band",
+               band_samples)
+        metric("reimbursement_band_amount_total", "counter", "Dollars contributed by each rule band",
+               amount_samples)
+        metric("reimbursement_variance_amount_total", "counter", "Dollars contributed by the hash variance",
+               [((), round(self.variance_amount, 2))])
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write the counters to path, as Prometheus text for a .prom file"""
+        with open(path, 'w') as f:
+            f.write(self.to_prometheus() if path.endswith(".prom") else self.to_json() + "\n")
@@ -3,105 +3,411 @@
 # Black Box Challenge - Reimbursement System Replica
 # This script replicates the legacy 60-year-old reimbursement system
 # Usage: ./run.sh <trip_duration_days> <miles_traveled> <total_receipts_amount>
+#        ./run.sh --batch FILE   (one "days,miles,receipts" trip per line, - for stdin)
+#
+# The tiers come from reimbursement_rules.txt, the rule table shared with
+# calculate_reimbursement.py (REIMBURSEMENT_RULES overrides its path). Each
+# rule band contributes "base + rate * (x - origin)" evaluated like bc with
+# scale=2, which truncates the product to max(2, operand decimals) places.
+# The table is compiled into shell functions once and cached in
+# data/.cache/run_rules, keyed on a checksum of the table and this script.
+#
+# All arithmetic is done on scaled integers with shell builtins; bc is only
+# used for inputs too large to fit in 64-bit integers. The hidden-factor
+# variance uses the same stable trip hash as calculate_reimbursement.py
+# (inputs are keyed to the nearest cent).
 
-# Validate input parameters
-if [ $# -ne 3 ]; then
-    echo "Error: Exactly 3 parameters required" >&2
-    echo "Usage: $0 <trip_duration_days> <miles_traveled> <total_receipts_amount>" >&2
-    exit 1
-fi
+# Largest input the integer path handles: 9 whole digits, 6 decimals
+MAX_WHOLE_DIGITS=9
+MAX_DECIMALS=6
 
-# Get input parameters
-days=$1
-miles=$2
-receipts=$3
-
-# Check if parameters are numeric
-if ! [[ "$days" =~ ^[0-9]+$ ]] || ! [[ "$miles" =~ ^[0-9]+(\.[0-9]+)?$ ]] || ! [[ "$receipts" =~ ^[0-9]+(\.[0-9]+)?$ ]]; then
-    echo "Error: Invalid numeric parameters" >&2
-    exit 1
+# Locate the rule table next to the real script, following the root symlink
+script_path=${BASH_SOURCE[0]}
+while [ -L "$script_path" ]; do
+    link=$(readlink "$script_path")
+    if [[ "$link" == /* ]] || [[ "$script_path" != */* ]]; then
+        script_path=$link
+    else
+        script_path=${script_path%/*}/$link
+    fi
+done
+if [[ "$script_path" == */* ]]; then
+    SCRIPT_DIR=${script_path%/*}
+else
+    SCRIPT_DIR=.
 fi
+RULES_FILE=${REIMBURSEMENT_RULES:-$SCRIPT_DIR/reimbursement_rules.txt}
 
-# FIXED: Base per diem calculation with reduced rates based on high-error case analysis
-# Analysis showed my rates were 50-100% too high for long trips
-if [ "$days" -eq 1 ]; then
-    base_perdiem=85  # Reduced from 95
-elif [ "$days" -eq 2 ]; then
-    base_perdiem=88  # Reduced from 102
-elif [ "$days" -le 4 ]; then
-    base_perdiem=85  # Reduced from 105
-elif [ "$days" -eq 5 ]; then
-    base_perdiem=85  # Reduced from 108, 5-day bonus was overestimated
-elif [ "$days" -le 7 ]; then
-    base_perdiem=80  # Reduced from 102
-elif [ "$days" -le 10 ]; then
-    base_perdiem=75  # Reduced from 98
-else
-    base_perdiem=65  # Reduced from 95 - long trips get much lower rates
+# Compiled rule tables are cached as shell source in the repo's data/.cache,
+# one file per table path; a script copied out of the repo compiles in memory
+rules_path=$RULES_FILE
+[[ "$rules_path" == /* ]] || rules_path=$PWD/$rules_path
+RULES_CACHE=""
+if [ -d "$SCRIPT_DIR/../data" ]; then
+    RULES_CACHE=$SCRIPT_DIR/../data/.cache/run_rules/${rules_path//[^A-Za-z0-9._-]/_}.sh
 fi
 
-# Calculate base amount
-base_amount=$(echo "scale=2; $days * $base_perdiem" | bc)
+# Split a decimal string into whole and fractional digits
+split_decimal() {
+    local value=$1
+    whole=${value%%.*}
+    if [[ "$value" == *.* ]]; then
+        frac=${value#*.}
+    else
+        frac=""
+    fi
+}
 
-# Mileage calculation with tiered rates
-if (( $(echo "$miles <= 100" | bc -l) )); then
-    mileage_reimbursement=$(echo "scale=2; $miles * 0.65" | bc)
-else
-    mileage_reimbursement=$(echo "scale=2; 100 * 0.65 + ($miles - 100) * 0.45" | bc)
-fi
+# Convert a decimal string to an integer count of 10^-scale units
+# Sets: units
+to_units() {
+    local value=$1 scale=$2 sign=1
+    if [[ "$value" == -* ]]; then
+        sign=-1
+        value=${value#-}
+    fi
+    split_decimal "$value"
+    while (( ${#frac} < scale )); do
+        frac="${frac}0"
+    done
+    units=$(( sign * (10#$whole * 10**scale + 10#${frac:-0}) ))
+}
 
-# FIXED: Receipt processing - high receipts penalize instead of benefit
-# Analysis showed high receipts (>$1000) cause major penalties, not benefits
-if (( $(echo "$receipts <= 5.0" | bc -l) )); then
-    receipt_adjustment=-10.0  # Small penalty for tiny receipts
-elif (( $(echo "$receipts <= 50.0" | bc -l) )); then
-    receipt_adjustment=$(echo "scale=2; $receipts * 0.2" | bc)  # Small benefit
-elif (( $(echo "$receipts <= 500.0" | bc -l) )); then
-    receipt_adjustment=$(echo "scale=2; $receipts * 0.15" | bc)  # Moderate benefit
-elif (( $(echo "$receipts <= 1000.0" | bc -l) )); then
-    # Cap beneficial receipts at 500, start applying penalties
-    base_benefit=$(echo "scale=2; 500 * 0.15" | bc)  # $75 max benefit
-    excess=$(echo "scale=2; $receipts - 500" | bc)
-    penalty=$(echo "scale=2; $excess * 0.05" | bc)  # 5% penalty on excess
-    receipt_adjustment=$(echo "scale=2; $base_benefit - $penalty" | bc)
-else
-    # High receipts (>$1000) get heavy penalties - this was the key missing piece
-    base_benefit=$(echo "scale=2; 500 * 0.15" | bc)  # $75 max benefit
-    excess_moderate=$(echo "scale=2; 500 * 0.05" | bc)  # $25 penalty for 500-1000 range
-    excess_high=$(echo "scale=2; ($receipts - 1000) * 0.08" | bc)  # 8% penalty for >$1000
-    receipt_adjustment=$(echo "scale=2; $base_benefit - $excess_moderate - $excess_high" | bc)
-fi
+# Parse one rule-table number
+# Sets: number_units, number_scale (its decimal count)
+parse_number() {
+    split_decimal "${1#-}"
+    number_scale=${#frac}
+    to_units "$1" "$number_scale"
+    number_units=$units
+}
 
-# Efficiency and length adjustments
-miles_per_day=$(echo "scale=2; $miles / $days" | bc)
-efficiency_adjustment=0
+# Load the rule table into parallel arrays, one entry per band. Numbers are
+# kept as written (for bc) and as integers plus decimal counts, so the
+# integer path can rescale them to each trip's precision. A rule's bands
+# are contiguous; rule_start_<name> and rule_end_<name> delimit them
+# Sets: rule_* arrays and variables, RULES_SCALE (most decimals used by any number)
+load_rules() {
+    local name op bound base rate origin i start_var
+    rule_names=() rule_ops=() rule_bounds=() rule_bases=() rule_rates=() rule_origins=()
+    RULES_SCALE=0
 
-if (( $(echo "$miles_per_day >= 100 && $miles_per_day <= 200" | bc -l) )); then
-    efficiency_adjustment=15
-elif (( $(echo "$miles_per_day > 250" | bc -l) )); then
-    efficiency_adjustment=-10
-fi
+    if [ ! -r "$RULES_FILE" ]; then
+        echo "Error: Cannot read rule table: $RULES_FILE" >&2
+        exit 1
+    fi
+
+    while read -r name op bound base rate origin; do
+        [[ -z "$name" || "$name" == \#* ]] && continue
+        i=${#rule_names[@]}
+        if (( i == 0 )) || [ "${rule_names[i - 1]}" != "$name" ]; then
+            start_var=rule_start_$name
+            if [ -n "${!start_var}" ]; then
+                echo "Error: Bands of rule $name must be listed together in $RULES_FILE" >&2
+                exit 1
+            fi
+            printf -v "$start_var" %d "$i"
+        fi
+        printf -v "rule_end_$name" %d $(( i + 1 ))
+        rule_names[i]=$name rule_ops[i]=$op
+        rule_bounds[i]=$bound rule_bases[i]=$base rule_rates[i]=$rate rule_origins[i]=$origin
+
+        if [ "$bound" != inf ]; then
+            parse_number "$bound"
+            rule_bound_units[i]=$number_units rule_bound_scales[i]=$number_scale
+        fi
+        parse_number "$base"
+        rule_base_units[i]=$number_units rule_base_scales[i]=$number_scale
+        parse_number "$rate"
+        rule_rate_units[i]=$number_units rule_rate_scales[i]=$number_scale
+        parse_number "$origin"
+        rule_origin_units[i]=$number_units rule_origin_scales[i]=$number_scale
+
+        for number_scale in "${rule_bound_scales[i]:-0}" "${rule_base_scales[i]}" \
+                "${rule_rate_scales[i]}" "${rule_origin_scales[i]}"; do
+            (( number_scale > RULES_SCALE )) && RULES_SCALE=$number_scale
+        done
+    done < "$RULES_FILE"
+
+    # Pre-scale bounds, bases and origins to the smallest trip scale, and turn
+    # "x < bound" into "x <= bound - 1 unit" so every band test is one compare
+    RULES_MIN_SCALE=$(( RULES_SCALE > 2 ? RULES_SCALE : 2 ))
+    for ((i = 0; i < ${#rule_names[@]}; i++)); do
+        if [ "${rule_bounds[i]}" = inf ]; then
+            rule_unbounded[i]=1 rule_bound_at[i]=0 rule_strict[i]=0
+        else
+            rule_unbounded[i]=0
+            rule_bound_at[i]=$(( rule_bound_units[i] * 10**(RULES_MIN_SCALE - rule_bound_scales[i]) ))
+            rule_strict[i]=0
+            [ "${rule_ops[i]}" = "<" ] && rule_strict[i]=1
+        fi
+        rule_base_at[i]=$(( rule_base_units[i] * 10**(RULES_MIN_SCALE - rule_base_scales[i]) ))
+        rule_origin_at[i]=$(( rule_origin_units[i] * 10**(RULES_MIN_SCALE - rule_origin_scales[i]) ))
+    done
+}
+
+# One band of a compiled rule: base + rate * (x - origin), truncated like bc.
+# bc keeps min(a + b, max(scale, a, b)) decimals of a product with a and b
+# decimals. Arguments are x and its decimals, then the band's origin (in
+# RULES_MIN_SCALE units) and decimals, base and rate units and decimals
+# Sets: rule_value
+apply_band() {
+    local offset=$(( $1 - $3 * rules_factor )) offset_decimals=$2 keep
+    (( $4 > offset_decimals )) && offset_decimals=$4
+    (( keep = offset_decimals > $7 ? offset_decimals : $7,
+       keep = keep < 2 ? 2 : keep,
+       keep = offset_decimals + $7 < keep ? offset_decimals + $7 : keep,
+       rule_value = $5 * rules_factor + offset * $6 / 10**(scale + $7 - keep) * 10**(scale - keep) ))
+}
+
+# Compile every rule into a shell function, rule_<name> x x_decimals, with
+# its bands' bounds and coefficients written in as constants. x is in
+# 10^-scale units and x_decimals is the number of decimals bc would see in
+# x; the functions read scale and rules_factor, 10^(scale - RULES_MIN_SCALE)
+# Sets: compiled_rules (shell source), and defines the functions
+compile_rules() {
+    local name i j start_var end_var keyword test
+    compiled_rules=""
+    for ((i = 0; i < ${#rule_names[@]}; i = ${!end_var})); do
+        name=${rule_names[i]}
+        start_var=rule_start_$name end_var=rule_end_$name
+        compiled_rules+="rule_$name() {"$'\n'
+        keyword=if
+        for ((j = ${!start_var}; j < ${!end_var}; j++)); do
+            if (( rule_unbounded[j] )); then
+                test=1
+            elif (( rule_strict[j] )); then
+                test="\$1 < ${rule_bound_at[j]} * rules_factor"
+            else
+                test="\$1 <= ${rule_bound_at[j]} * rules_factor"
+            fi
+            compiled_rules+="    $keyword (( $test )); then "
+            if (( rule_rate_units[j] == 0 )); then
+                compiled_rules+="(( rule_value = ${rule_base_at[j]} * rules_factor ))"$'\n'
+            else
+                compiled_rules+="apply_band \$1 \$2 ${rule_origin_at[j]} ${rule_origin_scales[j]}"
+                compiled_rules+=" ${rule_base_at[j]} ${rule_rate_units[j]} ${rule_rate_scales[j]}"$'\n'
+            fi
+            keyword=elif
+        done
+        compiled_rules+="    fi"$'\n'"}"$'\n'
+    done
+    eval "$compiled_rules"
+}
+
+# Save the compiled rules for later runs; failing to write them is not an
+# error. The cache only loads while rules_key, the checksum of the table and
+# this script, matches the one it was built from, so any edit to either
+# rebuilds it whatever the files' timestamps. The bc path reloads the table
+save_rules_cache() {
+    local tmp=$RULES_CACHE.tmp.$$
+    [ -n "$RULES_CACHE" ] && [ -n "$rules_key" ] || return 0
+    mkdir -p "${RULES_CACHE%/*}" 2>/dev/null || return 0
+    {
+        printf '[ "$rules_key" = %q ] || return 1\n' "$rules_key"
+        declare -p RULES_SCALE RULES_MIN_SCALE
+        printf '%s' "$compiled_rules"
+    } > "$tmp" 2>/dev/null && mv -f "$tmp" "$RULES_CACHE" 2>/dev/null || rm -f "$tmp"
+}
+
+# Stable trip hash shared with calculate_reimbursement.py: FNV-1a over
+# days, miles in cents and receipts in cents, then folded
+# Sets: trip_hash_value
+trip_hash() {
+    local h=2166136261 value
+    for value in "$@"; do
+        h=$(( ((h ^ (value & 0xFFFFFFFF)) * 16777619) & 0xFFFFFFFF ))
+    done
+    trip_hash_value=$(( h ^ (h >> 16) ))
+}
+
+# Validate one trip
+# Sets: input_error
+validate_trip() {
+    input_error=""
+    if ! [[ "$1" =~ ^[0-9]+$ ]] || ! [[ "$2" =~ ^[0-9]+(\.[0-9]+)?$ ]] || ! [[ "$3" =~ ^[0-9]+(\.[0-9]+)?$ ]]; then
+        input_error="Invalid numeric parameters"
+    fi
+}
+
+# Reimbursement for one validated trip
+# Sets: total (decimal string, before final formatting)
+calculate_trip() {
+    local days=$1 miles=$2 receipts=$3
+    local miles_decimals receipts_decimals fits=1 value units
+
+    for value in "$days" "$miles" "$receipts"; do
+        split_decimal "$value"
+        whole=${whole#"${whole%%[!0]*}"}
+        if (( ${#whole} > MAX_WHOLE_DIGITS || ${#frac} > MAX_DECIMALS )); then
+            fits=0
+        fi
+    done
+    if (( ! fits )); then
+        calculate_trip_with_bc "$days" "$miles" "$receipts"
+        return
+    fi
+
+    split_decimal "$miles"; miles_decimals=${#frac}
+    split_decimal "$receipts"; receipts_decimals=${#frac}
+
+    # Every amount below is an integer count of 10^-scale dollars
+    local scale=2
+    (( miles_decimals > scale )) && scale=$miles_decimals
+    (( receipts_decimals > scale )) && scale=$receipts_decimals
+    (( RULES_SCALE > scale )) && scale=$RULES_SCALE
+    local one=$(( 10**scale )) rules_factor=$(( 10**(scale - RULES_MIN_SCALE) ))
+
+    days=$(( 10#$days ))
+    to_units "$miles" "$scale"; local miles_units=$units
+    to_units "$receipts" "$scale"; local receipts_units=$units
 
-length_adjustment=0
-if [ "$days" -eq 5 ]; then
-    length_adjustment=25
-elif [ "$days" -ge 12 ]; then
-    length_adjustment=-15
+    # Base per diem, mileage tiers and receipt bands
+    rule_per_diem $(( days * one )) 0; local base_amount=$rule_value
+    rule_mileage "$miles_units" "$miles_decimals"; local mileage_reimbursement=$rule_value
+    rule_receipts "$receipts_units" "$receipts_decimals"; local receipt_adjustment=$rule_value
+
+    # Efficiency and length adjustments (miles per day truncated to cents)
+    local miles_per_day_cents=0
+    if (( days > 0 )); then
+        miles_per_day_cents=$(( miles_units * 100 / (days * one) ))
+    fi
+    rule_efficiency $(( miles_per_day_cents * one / 100 )) 2; local efficiency_adjustment=$rule_value
+    rule_trip_length $(( days * one )) 0; local length_adjustment=$rule_value
+
+    # Simple hash-based variance (pseudo-random)
+    local to_cents=$(( 10**(scale - 2) ))
+    trip_hash "$days" $(( (miles_units + to_cents / 2) / to_cents )) \
+        $(( (receipts_units + to_cents / 2) / to_cents ))
+    local hash_mod=$(( trip_hash_value % 100 ))
+    local variance=$(( (hash_mod - 50) * one / 2 ))
+
+    # Combine all components
+    local total_units=$(( base_amount + mileage_reimbursement + receipt_adjustment
+        + efficiency_adjustment + length_adjustment + variance ))
+
+    # Ensure minimum reimbursement
+    if (( total_units < 50 * one )); then
+        total=50.00
+    else
+        printf -v total '%d.%0*d' $(( total_units / one )) "$scale" $(( total_units % one ))
+    fi
+}
+
+# bc version of the rule_<name> functions, only used by calculate_trip_with_bc
+# Sets: rule_value (decimal string)
+apply_rule_with_bc() {
+    local name=$1 x=$2 i
+    local start_var=rule_start_$name end_var=rule_end_$name
+    for ((i = ${!start_var}; i < ${!end_var}; i++)); do
+        if [ "${rule_bounds[i]}" = inf ] || (( $(echo "$x ${rule_ops[i]} ${rule_bounds[i]}" | bc -l) )); then
+            rule_value=$(echo "scale=2; ${rule_bases[i]} + ${rule_rates[i]} * ($x - ${rule_origins[i]})" | bc)
+            return
+        fi
+    done
+}
+
+# bc pipeline, only reached for inputs that overflow the integer path
+calculate_trip_with_bc() {
+    local days=$1 miles=$2 receipts=$3
+    local base_amount mileage_reimbursement receipt_adjustment
+    local miles_per_day=0 efficiency_adjustment length_adjustment variance
+
+    # A cached run only has the compiled rules
+    (( ${#rule_names[@]} )) || load_rules
+
+    apply_rule_with_bc per_diem "$days"; base_amount=$rule_value
+    apply_rule_with_bc mileage "$miles"; mileage_reimbursement=$rule_value
+    apply_rule_with_bc receipts "$receipts"; receipt_adjustment=$rule_value
+
+    if (( $(echo "$days > 0" | bc) )); then
+        miles_per_day=$(echo "scale=2; $miles / $days" | bc)
+    fi
+    apply_rule_with_bc efficiency "$miles_per_day"; efficiency_adjustment=$rule_value
+    apply_rule_with_bc trip_length "$days"; length_adjustment=$rule_value
+
+    trip_hash $(echo "$days % 4294967296" | bc) \
+        $(echo "($miles * 100 + 0.5) / 1 % 4294967296" | bc) \
+        $(echo "($receipts * 100 + 0.5) / 1 % 4294967296" | bc)
+    variance=$(echo "scale=2; ($((trip_hash_value % 100)) - 50) * 0.5" | bc)
+
+    total=$(echo "scale=2; $base_amount + $mileage_reimbursement + $receipt_adjustment + $efficiency_adjustment + $length_adjustment + $variance" | bc)
+
+    if (( $(echo "$total < 50" | bc -l) )); then
+        total=50.00
+    fi
+}
+
+# Batch mode: one result line per input trip, ERROR for invalid lines
+run_batch() {
+    local file=$1 line days miles receipts extra line_number=0 failures=0
+
+    [ "$file" = "-" ] && file=/dev/stdin
+    if [ ! -r "$file" ]; then
+        echo "Error: Cannot read batch file: $file" >&2
+        exit 1
+    fi
+
+    while IFS=$', \t\r' read -r days miles receipts extra || [ -n "$days" ]; do
+        line_number=$((line_number + 1))
+        [ -z "$days$miles$receipts" ] && continue
+
+        validate_trip "$days" "$miles" "$receipts"
+        if [ -z "$input_error" ] && [ -n "$extra" ]; then
+            input_error="Expected 3 fields"
+        fi
+        if [ -n "$input_error" ]; then
+            # Skip a CSV header row
+            if [ "$line_number" -eq 1 ] && ! [[ "$days" =~ ^[0-9] ]]; then
+                continue
+            fi
+            echo "Error on line $line_number: $input_error" >&2
+            echo "ERROR"
+            failures=$((failures + 1))
+            continue
+        fi
+
+        calculate_trip "$days" "$miles" "$receipts"
+        printf "%.2f\n" "$total"
+    done < "$file"
+
+    [ "$failures" -eq 0 ]
+}
+
+# Parsing and compiling the table costs more than a trip, so reuse the cache
+rules_key=""
+[ -n "$RULES_CACHE" ] && rules_key=$(cksum "$RULES_FILE" "$script_path" 2>/dev/null)
+if [ -z "$rules_key" ] || ! source "$RULES_CACHE" 2>/dev/null; then
+    load_rules
+    compile_rules
+    save_rules_cache
 fi
 
-# Simple hash-based variance (pseudo-random)
-hash_input="${days}_${miles}_${receipts}"
-hash_val=$(echo -n "$hash_input" | cksum | cut -d' ' -f1)
-hash_mod=$((hash_val % 100))
-variance=$(echo "scale=2; ($hash_mod - 50) * 0.5" | bc)
+if [ "$1" = "--batch" ]; then
+    if [ $# -ne 2 ]; then
+        echo "Usage: $0 --batch FILE" >&2
+        exit 1
+    fi
+    run_batch "$2"
+    exit
+fi
 
-# Combine all components
-total=$(echo "scale=2; $base_amount + $mileage_reimbursement + $receipt_adjustment + $efficiency_adjustment + $length_adjustment + $variance" | bc)
+# Validate input parameters
+if [ $# -ne 3 ]; then
+    echo "Error: Exactly 3 parameters required" >&2
+    echo "Usage: $0 <trip_duration_days> <miles_traveled> <total_receipts_amount>" >&2
+    echo "       $0 --batch FILE" >&2
+    exit 1
+fi
 
-# Ensure minimum reimbursement
-if (( $(echo "$total < 50" | bc -l) )); then
-    total=50.00
+# Check if parameters are numeric
+validate_trip "$1" "$2" "$3"
+if [ -n "$input_error" ]; then
+    echo "Error: $input_error" >&2
+    exit 1
 fi
 
+calculate_trip "$1" "$2" "$3"
+
 # Output final result
-printf "%.2f\n" "$total" 
\ No newline at end of file
+printf "%.2f\n" "$total"
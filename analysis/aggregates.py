@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Shared aggregation layer for the case analyses
+Each helper makes one pass over the data (a sort, a bincount or a unique)
+and answers every group, bin or threshold question from the result
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+# counts has one entry per group; sums has one array per value column
+GroupStats = namedtuple("GroupStats", ["keys", "counts", "sums"])
+
+# Below/above counts and per-column sums for every candidate threshold
+SplitStats = namedtuple("SplitStats", ["points", "count_below", "sums_below", "count_above", "sums_above"])
+
+def _means(sums, counts):
+    """Per-group means, NaN for empty groups"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return sums / counts
+
+def group_by(keys, *values):
+    """
+    Count and sum each value column per distinct key, in key order
+    """
+    keys = np.asarray(keys)
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(unique_keys))
+    sums = [np.bincount(inverse, weights=np.asarray(v, dtype=np.float64), minlength=len(unique_keys))
+            for v in values]
+    return GroupStats(unique_keys, counts, sums)
+
+def bin_by(x, edges, *values):
+    """
+    Count and sum each value column per bin, with pd.cut semantics
+
+    Bin i holds edges[i] < x <= edges[i + 1]; values outside every bin
+    (including NaN) are left out.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    edges = np.asarray(edges, dtype=np.float64)
+    bins = np.searchsorted(edges, x, side='left') - 1
+    inside = (bins >= 0) & (bins < len(edges) - 1) & ~np.isnan(x)
+    bins = bins[inside]
+    count = len(edges) - 1
+    counts = np.bincount(bins, minlength=count)
+    sums = [np.bincount(bins, weights=np.asarray(v, dtype=np.float64)[inside], minlength=count)
+            for v in values]
+    return GroupStats(np.arange(count), counts, sums)
+
+def threshold_splits(x, points, *values, inclusive=False):
+    """
+    Below/above statistics of each value column for every threshold at once
+
+    The data is sorted by x once and prefix-summed, so each threshold costs
+    one binary search. "Below" is x < point, or x <= point when inclusive.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    order = np.argsort(x, kind='stable')
+    sorted_x = x[order]
+    points = np.asarray(points, dtype=np.float64)
+
+    cut = np.searchsorted(sorted_x, points, side='right' if inclusive else 'left')
+    total = len(x)
+    sums_below = []
+    sums_above = []
+    for v in values:
+        prefix = np.concatenate(([0.0], np.cumsum(np.asarray(v, dtype=np.float64)[order])))
+        sums_below.append(prefix[cut])
+        sums_above.append(prefix[-1] - prefix[cut])
+    return SplitStats(points, cut, sums_below, total - cut, sums_above)
+
+def means(stats, column=0):
+    """Mean of one value column per group, bin or side of a split"""
+    if isinstance(stats, SplitStats):
+        return (_means(stats.sums_below[column], stats.count_below),
+                _means(stats.sums_above[column], stats.count_above))
+    return _means(stats.sums[column], stats.counts)
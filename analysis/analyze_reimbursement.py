@@ -3,31 +3,51 @@
 Comprehensive analysis of the reimbursement system based on public_cases.json
 """
 
-import json
+import os
+import sys
+import argparse
 import numpy as np
 import pandas as pd
-from collections import defaultdict
-import math
 
-def load_data():
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "scripts"))
+
+from case_reader import iter_case_chunks
+from aggregates import group_by, bin_by, threshold_splits, means
+
+DEFAULT_CASES = os.path.join(REPO_ROOT, "data", "public_cases.json")
+
+def load_data(path=DEFAULT_CASES):
     """Load and parse the public cases data"""
-    with open('/home/runner/workspace/public_cases.json', 'r') as f:
-        data = json.load(f)
-    
-    # Convert to DataFrame for easier analysis
-    inputs = []
-    outputs = []
-    
-    for case in data:
-        inputs.append(case['input'])
-        outputs.append(case['expected_output'])
-    
-    df = pd.DataFrame(inputs)
-    df['reimbursement'] = outputs
+    # Stream the file in chunks straight into columns rather than holding
+    # the parsed JSON and per-case lists alongside the DataFrame
+    frames = []
+    for chunk in iter_case_chunks(path):
+        frames.append(pd.DataFrame({
+            'trip_duration_days': chunk.days,
+            'miles_traveled': chunk.miles,
+            'total_receipts_amount': chunk.receipts,
+            'reimbursement': chunk.expected,
+        }))
+    
+    df = pd.concat(frames, ignore_index=True)
     
     return df
 
-def basic_statistics(df):
+def _columns(df):
+    """The DataFrame columns every section aggregates over, as arrays, so
+    the sections never add working columns to the shared frame"""
+    days = df['trip_duration_days'].to_numpy()
+    miles = df['miles_traveled'].to_numpy()
+    return {
+        'days': days,
+        'miles': miles,
+        'receipts': df['total_receipts_amount'].to_numpy(),
+        'reimbursement': df['reimbursement'].to_numpy(),
+        'miles_per_day': miles / days,
+    }
+
+def basic_statistics(df, cols):
     """Calculate basic statistics for all variables"""
     print("=== BASIC STATISTICS ===")
     print(f"Total cases: {len(df)}")
@@ -37,12 +57,12 @@ def basic_statistics(df):
     print(df['reimbursement'].describe())
     print()
 
-def analyze_per_diem_patterns(df):
+def analyze_per_diem_patterns(df, cols):
     """Analyze base per diem rates and patterns"""
     print("=== PER DIEM ANALYSIS ===")
     
     # Look at cases with minimal miles and receipts to isolate per diem
-    minimal_cases = df[(df['miles_traveled'] <= 10) & (df['total_receipts_amount'] <= 5)]
+    minimal_cases = df[(cols['miles'] <= 10) & (cols['receipts'] <= 5)]
     
     if len(minimal_cases) > 0:
         print("Cases with minimal miles and receipts (isolating per diem):")
@@ -54,158 +74,146 @@ def analyze_per_diem_patterns(df):
     
     # Analyze per-day rates by trip duration
     print("\nPer-day rates by trip duration:")
-    for days in sorted(df['trip_duration_days'].unique()):
-        day_cases = df[df['trip_duration_days'] == days]
-        avg_per_day = day_cases['reimbursement'].mean() / days
-        print(f"{days} days: Average ${avg_per_day:.2f}/day")
+    by_days = group_by(cols['days'], cols['reimbursement'])
+    for days, avg_reimb in zip(by_days.keys, means(by_days)):
+        print(f"{days} days: Average ${avg_reimb / days:.2f}/day")
     
     print()
 
-def analyze_5day_bonus(df):
+def analyze_5day_bonus(df, cols):
     """Analyze 5-day trip bonus pattern"""
     print("=== 5-DAY TRIP BONUS ANALYSIS ===")
     
     # Compare 5-day trips vs others
-    five_day = df[df['trip_duration_days'] == 5]
-    other_days = df[df['trip_duration_days'] != 5]
-    
-    if len(five_day) > 0:
-        print(f"5-day trips: {len(five_day)} cases")
-        print(f"Average 5-day reimbursement: ${five_day['reimbursement'].mean():.2f}")
-        print(f"Average per day for 5-day trips: ${five_day['reimbursement'].mean() / 5:.2f}")
+    five_day = cols['days'] == 5
+    count = int(np.count_nonzero(five_day))
+    
+    if count > 0:
+        avg_reimb = cols['reimbursement'][five_day].mean()
+        print(f"5-day trips: {count} cases")
+        print(f"Average 5-day reimbursement: ${avg_reimb:.2f}")
+        print(f"Average per day for 5-day trips: ${avg_reimb / 5:.2f}")
         
         # Look for patterns by comparing similar trips
         print("\nSample 5-day trips:")
-        for _, row in five_day.head(5).iterrows():
+        for _, row in df[five_day].head(5).iterrows():
             print(f"Miles: {row['miles_traveled']}, Receipts: ${row['total_receipts_amount']:.2f}, "
                   f"Total: ${row['reimbursement']:.2f}")
     
     print()
 
-def analyze_mileage_tiers(df):
+def analyze_mileage_tiers(df, cols):
     """Analyze mileage tier effects"""
     print("=== MILEAGE TIER ANALYSIS ===")
     
     # Group by mileage ranges
-    df['miles_range'] = pd.cut(df['miles_traveled'], 
-                               bins=[0, 50, 100, 150, 200, 250, 300, float('inf')],
-                               labels=['0-50', '51-100', '101-150', '151-200', '201-250', '251-300', '300+'])
+    labels = ['0-50', '51-100', '101-150', '151-200', '201-250', '251-300', '300+']
+    by_range = bin_by(cols['miles'], [0, 50, 100, 150, 200, 250, 300, float('inf')],
+                      cols['reimbursement'], cols['miles'])
     
     print("Reimbursement by mileage ranges:")
-    for range_label in ['0-50', '51-100', '101-150', '151-200', '201-250', '251-300', '300+']:
-        range_data = df[df['miles_range'] == range_label]
-        if len(range_data) > 0:
-            avg_reimb = range_data['reimbursement'].mean()
-            avg_per_mile = avg_reimb / range_data['miles_traveled'].mean() if range_data['miles_traveled'].mean() > 0 else 0
-            print(f"{range_label} miles: {len(range_data)} cases, Avg: ${avg_reimb:.2f}, $/mile: ${avg_per_mile:.3f}")
+    for label, count, avg_reimb, avg_miles in zip(labels, by_range.counts, means(by_range, 0), means(by_range, 1)):
+        if count > 0:
+            avg_per_mile = avg_reimb / avg_miles if avg_miles > 0 else 0
+            print(f"{label} miles: {count} cases, Avg: ${avg_reimb:.2f}, $/mile: ${avg_per_mile:.3f}")
     
     # Look specifically at the 100-mile breakpoint
     print("\nAnalyzing 100-mile breakpoint:")
-    under_100 = df[df['miles_traveled'] <= 100]
-    over_100 = df[df['miles_traveled'] > 100]
+    split = threshold_splits(cols['miles'], [100], cols['reimbursement'], inclusive=True)
+    below, above = means(split)
     
-    print(f"Under 100 miles: {len(under_100)} cases, avg reimbursement: ${under_100['reimbursement'].mean():.2f}")
-    print(f"Over 100 miles: {len(over_100)} cases, avg reimbursement: ${over_100['reimbursement'].mean():.2f}")
+    print(f"Under 100 miles: {split.count_below[0]} cases, avg reimbursement: ${below[0]:.2f}")
+    print(f"Over 100 miles: {split.count_above[0]} cases, avg reimbursement: ${above[0]:.2f}")
     
     print()
 
-def analyze_efficiency_bonus(df):
+def analyze_efficiency_bonus(df, cols):
     """Analyze efficiency bonus patterns (180-220 miles/day)"""
     print("=== EFFICIENCY BONUS ANALYSIS ===")
     
-    # Calculate miles per day
-    df['miles_per_day'] = df['miles_traveled'] / df['trip_duration_days']
+    miles_per_day = cols['miles_per_day']
     
     # Define efficiency ranges
-    df['efficiency_range'] = pd.cut(df['miles_per_day'],
-                                    bins=[0, 100, 150, 180, 220, 250, float('inf')],
-                                    labels=['0-100', '101-150', '151-180', '181-220', '221-250', '250+'])
+    labels = ['0-100', '101-150', '151-180', '181-220', '221-250', '250+']
+    by_range = bin_by(miles_per_day, [0, 100, 150, 180, 220, 250, float('inf')], cols['reimbursement'])
     
     print("Reimbursement by efficiency (miles/day):")
-    for range_label in ['0-100', '101-150', '151-180', '181-220', '221-250', '250+']:
-        range_data = df[df['efficiency_range'] == range_label]
-        if len(range_data) > 0:
-            avg_reimb = range_data['reimbursement'].mean()
-            print(f"{range_label} miles/day: {len(range_data)} cases, Avg reimbursement: ${avg_reimb:.2f}")
+    for label, count, avg_reimb in zip(labels, by_range.counts, means(by_range)):
+        if count > 0:
+            print(f"{label} miles/day: {count} cases, Avg reimbursement: ${avg_reimb:.2f}")
     
     # Focus on the sweet spot
-    sweet_spot = df[(df['miles_per_day'] >= 180) & (df['miles_per_day'] <= 220)]
+    sweet_spot = np.flatnonzero((miles_per_day >= 180) & (miles_per_day <= 220))
     if len(sweet_spot) > 0:
         print(f"\nSweet spot (180-220 miles/day): {len(sweet_spot)} cases")
-        print(f"Average reimbursement: ${sweet_spot['reimbursement'].mean():.2f}")
+        print(f"Average reimbursement: ${cols['reimbursement'][sweet_spot].mean():.2f}")
         print("Sample cases:")
-        for _, row in sweet_spot.head(5).iterrows():
-            print(f"  {row['miles_per_day']:.1f} miles/day, Total: ${row['reimbursement']:.2f}")
+        for i in sweet_spot[:5]:
+            print(f"  {miles_per_day[i]:.1f} miles/day, Total: ${cols['reimbursement'][i]:.2f}")
     
     print()
 
-def analyze_receipt_patterns(df):
+def analyze_receipt_patterns(df, cols):
     """Analyze receipt processing patterns"""
     print("=== RECEIPT PROCESSING ANALYSIS ===")
     
     # Group by receipt amounts
-    df['receipt_range'] = pd.cut(df['total_receipts_amount'],
-                                 bins=[0, 5, 10, 20, 50, 100, float('inf')],
-                                 labels=['0-5', '6-10', '11-20', '21-50', '51-100', '100+'])
+    labels = ['0-5', '6-10', '11-20', '21-50', '51-100', '100+']
+    by_range = bin_by(cols['receipts'], [0, 5, 10, 20, 50, 100, float('inf')], cols['reimbursement'])
     
     print("Reimbursement by receipt amounts:")
-    for range_label in ['0-5', '6-10', '11-20', '21-50', '51-100', '100+']:
-        range_data = df[df['receipt_range'] == range_label]
-        if len(range_data) > 0:
-            avg_reimb = range_data['reimbursement'].mean()
-            print(f"${range_label}: {len(range_data)} cases, Avg reimbursement: ${avg_reimb:.2f}")
+    for label, count, avg_reimb in zip(labels, by_range.counts, means(by_range)):
+        if count > 0:
+            print(f"${label}: {count} cases, Avg reimbursement: ${avg_reimb:.2f}")
     
     # Look for small receipt penalties
-    small_receipts = df[df['total_receipts_amount'] <= 5]
-    larger_receipts = df[df['total_receipts_amount'] > 5]
+    split = threshold_splits(cols['receipts'], [5], inclusive=True)
     
-    print(f"\nSmall receipts (≤$5): {len(small_receipts)} cases")
-    print(f"Larger receipts (>$5): {len(larger_receipts)} cases")
+    print(f"\nSmall receipts (≤$5): {split.count_below[0]} cases")
+    print(f"Larger receipts (>$5): {split.count_above[0]} cases")
     
     print()
 
-def find_breakpoints_and_thresholds(df):
+def find_breakpoints_and_thresholds(df, cols):
     """Find specific breakpoints and thresholds"""
     print("=== BREAKPOINTS AND THRESHOLDS ===")
     
-    # Mileage breakpoints
+    # Mileage breakpoints, all from one sorted pass
     print("Analyzing mileage breakpoints:")
     mileage_points = [50, 75, 100, 125, 150, 200, 250]
-    for point in mileage_points:
-        below = df[df['miles_traveled'] < point]['reimbursement'].mean()
-        above = df[df['miles_traveled'] >= point]['reimbursement'].mean()
-        diff = above - below
-        count_below = len(df[df['miles_traveled'] < point])
-        count_above = len(df[df['miles_traveled'] >= point])
-        print(f"  {point} miles: Below=${below:.2f} ({count_below}), Above=${above:.2f} ({count_above}), Diff=${diff:.2f}")
+    split = threshold_splits(cols['miles'], mileage_points, cols['reimbursement'])
+    below, above = means(split)
+    for point, mean_below, mean_above, count_below, count_above in zip(
+            mileage_points, below, above, split.count_below, split.count_above):
+        diff = mean_above - mean_below
+        print(f"  {point} miles: Below=${mean_below:.2f} ({count_below}), Above=${mean_above:.2f} ({count_above}), Diff=${diff:.2f}")
     
     # Trip length breakpoints
     print("\nTrip length analysis:")
-    for days in sorted(df['trip_duration_days'].unique()):
-        day_data = df[df['trip_duration_days'] == days]
-        avg_reimb = day_data['reimbursement'].mean()
+    by_days = group_by(cols['days'], cols['reimbursement'])
+    for days, count, avg_reimb in zip(by_days.keys, by_days.counts, means(by_days)):
         avg_per_day = avg_reimb / days
-        print(f"  {days} days: {len(day_data)} cases, Avg: ${avg_reimb:.2f}, Per day: ${avg_per_day:.2f}")
+        print(f"  {days} days: {count} cases, Avg: ${avg_reimb:.2f}, Per day: ${avg_per_day:.2f}")
     
     print()
 
-def reverse_engineer_calculation(df):
+def reverse_engineer_calculation(df, cols):
     """Attempt to reverse engineer the calculation components"""
     print("=== REVERSE ENGINEERING CALCULATION COMPONENTS ===")
     
     # Try to identify base components
     # Start with simple cases
-    simple_cases = df[(df['miles_traveled'] <= 50) & (df['total_receipts_amount'] <= 10) & (df['trip_duration_days'] <= 3)]
+    simple = (cols['miles'] <= 50) & (cols['receipts'] <= 10) & (cols['days'] <= 3)
     
     print("Analyzing simple cases to identify base components:")
     print("Days | Miles | Receipts | Total | Per Day | Per Mile | Analysis")
     print("-" * 80)
     
-    for _, row in simple_cases.head(20).iterrows():
-        days = row['trip_duration_days']
-        miles = row['miles_traveled']
-        receipts = row['total_receipts_amount']
-        total = row['reimbursement']
+    for i in np.flatnonzero(simple)[:20]:
+        days = cols['days'][i]
+        miles = cols['miles'][i]
+        receipts = cols['receipts'][i]
+        total = cols['reimbursement'][i]
         per_day = total / days
         per_mile = total / miles if miles > 0 else 0
         
@@ -216,24 +224,19 @@ def reverse_engineer_calculation(df):
         
         print(f"{days:4d} | {miles:5.0f} | ${receipts:7.2f} | ${total:6.2f} | ${per_day:6.2f} | ${per_mile:7.3f} | Remaining: ${remaining:.2f}")
     
-    # Try different base rates
+    # Try different base rates, every rate against every case in one pass
     print("\nTesting different base per diem rates:")
-    base_rates = [90, 95, 100, 105, 110]
-    
-    for base_rate in base_rates:
-        errors = []
-        for _, row in simple_cases.iterrows():
-            predicted_base = base_rate * row['trip_duration_days']
-            actual = row['reimbursement']
-            error = abs(actual - predicted_base)
-            errors.append(error)
-        
-        avg_error = np.mean(errors)
+    base_rates = np.array([90, 95, 100, 105, 110])
+    predicted = base_rates[:, None] * cols['days'][simple][None, :]
+    errors = np.abs(cols['reimbursement'][simple][None, :] - predicted)
+    
+    for base_rate, row_errors in zip(base_rates, errors):
+        avg_error = np.mean(row_errors)
         print(f"  Base rate ${base_rate}/day: Average error = ${avg_error:.2f}")
     
     print()
 
-def detailed_pattern_analysis(df):
+def detailed_pattern_analysis(df, cols):
     """More detailed pattern analysis"""
     print("=== DETAILED PATTERN ANALYSIS ===")
     
@@ -243,11 +246,11 @@ def detailed_pattern_analysis(df):
     # Sample some cases and try to decompose
     sample_cases = df.sample(10, random_state=42)
     
-    for _, row in sample_cases.iterrows():
-        days = row['trip_duration_days']
-        miles = row['miles_traveled']
-        receipts = row['total_receipts_amount']
-        total = row['reimbursement']
+    for i in sample_cases.index:
+        days = cols['days'][i]
+        miles = cols['miles'][i]
+        receipts = cols['receipts'][i]
+        total = cols['reimbursement'][i]
         
         # Try different decompositions
         base_100 = 100 * days
@@ -272,26 +275,45 @@ def detailed_pattern_analysis(df):
         
         print()
 
+# Report sections in the order they run, selectable with --sections
+SECTIONS = {
+    'basic': basic_statistics,
+    'per_diem': analyze_per_diem_patterns,
+    'five_day': analyze_5day_bonus,
+    'mileage': analyze_mileage_tiers,
+    'efficiency': analyze_efficiency_bonus,
+    'receipts': analyze_receipt_patterns,
+    'breakpoints': find_breakpoints_and_thresholds,
+    'reverse': reverse_engineer_calculation,
+    'detailed': detailed_pattern_analysis,
+}
+
 def main():
     """Main analysis function"""
+    parser = argparse.ArgumentParser(description="Analyze the public reimbursement cases")
+    parser.add_argument("--data", default=DEFAULT_CASES,
+                        help="public case file to analyze (default: data/public_cases.json)")
+    parser.add_argument("--sections", default=",".join(SECTIONS),
+                        help=f"comma-separated sections to run (default: all of {','.join(SECTIONS)})")
+    args = parser.parse_args()
+    
+    sections = [name.strip() for name in args.sections.split(",") if name.strip()]
+    unknown = [name for name in sections if name not in SECTIONS]
+    if unknown:
+        parser.error(f"unknown sections: {', '.join(unknown)}")
+    
     print("REIMBURSEMENT SYSTEM ANALYSIS")
     print("=" * 50)
     
     # Load data
-    df = load_data()
-    
-    # Run all analyses
-    basic_statistics(df)
-    analyze_per_diem_patterns(df)
-    analyze_5day_bonus(df)
-    analyze_mileage_tiers(df)
-    analyze_efficiency_bonus(df)
-    analyze_receipt_patterns(df)
-    find_breakpoints_and_thresholds(df)
-    reverse_engineer_calculation(df)
-    detailed_pattern_analysis(df)
+    df = load_data(args.data)
+    cols = _columns(df)
+    
+    # Run the selected analyses
+    for name in sections:
+        SECTIONS[name](df, cols)
     
     print("Analysis complete!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,13 +1,21 @@
 #!/usr/bin/env python3
 
-import json
+import os
+import sys
 
-def find_specific_cases():
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+import case_cache
+from case_index import CaseIndex
+
+def find_specific_cases(cases):
     """Find the specific cases mentioned by the user"""
     
-    # Load the test cases
-    with open('public_cases.json', 'r') as f:
-        cases = json.load(f)
+    # Index the test cases once; each target is then a box lookup, not a scan
+    days, miles, receipts, expected = cases
+    index = CaseIndex.from_cases(cases)
     
     # Define the target cases with their characteristics
     target_cases = [
@@ -18,163 +26,144 @@ def find_specific_cases():
         {"days": 11, "miles": 740, "receipts": 1171.99, "expected": 902.09}
     ]
     
+    matches = {}
+    for target in target_cases:
+        point = np.array([target['days'], target['miles'], target['receipts']])
+        # Exact days and miles, receipts within a cent
+        for i in index.within(point - [0, 0, 0.01], point + [0, 0, 0.01]):
+            if abs(receipts[i] - target['receipts']) < 0.01 and abs(expected[i] - target['expected']) < 0.01:
+                matches.setdefault(int(i), target)
+    
     found_cases = []
     
-    for i, case in enumerate(cases):
-        input_data = case['input']
-        expected = case['expected_output']
-        
-        # Check if this matches any of our target cases
-        for target in target_cases:
-            if (input_data['trip_duration_days'] == target['days'] and 
-                input_data['miles_traveled'] == target['miles'] and 
-                abs(input_data['total_receipts_amount'] - target['receipts']) < 0.01 and
-                abs(expected - target['expected']) < 0.01):
-                
-                found_cases.append({
-                    'index': i,
-                    'case': case,
-                    'target': target
-                })
-                print(f"Found case {i}: {target['days']} days, {target['miles']} miles, ${target['receipts']:.2f} receipts")
-                print(f"  Expected: ${expected:.2f}")
-                print(f"  Receipts to expected ratio: {target['receipts']/expected:.2f}")
-                print()
-                break
+    # Report in case order, as a single pass over the file would
+    for i in sorted(matches):
+        target = matches[i]
+        case = {
+            'input': {
+                'trip_duration_days': int(days[i]),
+                'miles_traveled': float(miles[i]),
+                'total_receipts_amount': float(receipts[i]),
+            },
+            'expected_output': float(expected[i]),
+        }
+        found_cases.append({
+            'index': i,
+            'case': case,
+            'target': target
+        })
+        print(f"Found case {i}: {target['days']} days, {target['miles']} miles, ${target['receipts']:.2f} receipts")
+        print(f"  Expected: ${expected[i]:.2f}")
+        print(f"  Receipts to expected ratio: {target['receipts']/expected[i]:.2f}")
+        print()
     
     return found_cases
 
-def analyze_patterns(cases_data):
+def analyze_patterns(cases):
     """Analyze patterns in high-receipt cases"""
     
     print("=== ANALYZING HIGH-RECEIPT CASES (>$1000) ===")
-    high_receipt_cases = []
+    days, miles, receipts, expected = cases
     
-    for i, case in enumerate(cases_data):
-        input_data = case['input']
-        expected = case['expected_output']
-        receipts = input_data['total_receipts_amount']
-        
-        if receipts > 1000:
-            days = input_data['trip_duration_days']
-            miles = input_data['miles_traveled']
-            
-            # Calculate some ratios
-            expected_per_day = expected / days
-            receipts_to_expected = receipts / expected
-            
-            high_receipt_cases.append({
-                'index': i,
-                'days': days,
-                'miles': miles,
-                'receipts': receipts,
-                'expected': expected,
-                'expected_per_day': expected_per_day,
-                'receipts_to_expected': receipts_to_expected
-            })
-    
-    # Sort by receipts amount
-    high_receipt_cases.sort(key=lambda x: x['receipts'], reverse=True)
+    # Highest receipts first; a stable sort keeps ties in case order
+    selected = np.flatnonzero(receipts > 1000)
+    selected = selected[np.argsort(-receipts[selected], kind='stable')]
+    
+    high_receipt_cases = []
+    for i in selected:
+        high_receipt_cases.append({
+            'index': int(i),
+            'days': int(days[i]),
+            'miles': float(miles[i]),
+            'receipts': float(receipts[i]),
+            'expected': float(expected[i]),
+            'expected_per_day': expected[i] / days[i],
+            'receipts_to_expected': receipts[i] / expected[i]
+        })
     
     print(f"Found {len(high_receipt_cases)} cases with receipts > $1000")
     print()
     
     for case in high_receipt_cases[:20]:  # Show top 20
-        print(f"Case {case['index']}: {case['days']} days, {case['miles']} miles, ${case['receipts']:.2f} receipts")
+        print(f"Case {case['index']}: {case['days']} days, {case['miles']:g} miles, ${case['receipts']:.2f} receipts")
         print(f"  Expected: ${case['expected']:.2f} (${case['expected_per_day']:.2f}/day)")
         print(f"  Receipts/Expected ratio: {case['receipts_to_expected']:.2f}")
         print()
     
     return high_receipt_cases
 
-def analyze_long_trips(cases_data):
+def analyze_long_trips(cases):
     """Analyze patterns in long trips (8+ days)"""
     
     print("\n=== ANALYZING LONG TRIPS (8+ days) ===")
-    long_trip_cases = []
+    days, miles, receipts, expected = cases
     
-    for i, case in enumerate(cases_data):
-        input_data = case['input']
-        expected = case['expected_output']
-        days = input_data['trip_duration_days']
-        
-        if days >= 8:
-            miles = input_data['miles_traveled']
-            receipts = input_data['total_receipts_amount']
-            
-            expected_per_day = expected / days
-            
-            long_trip_cases.append({
-                'index': i,
-                'days': days,
-                'miles': miles,
-                'receipts': receipts,
-                'expected': expected,
-                'expected_per_day': expected_per_day
-            })
-    
-    # Sort by days
-    long_trip_cases.sort(key=lambda x: x['days'], reverse=True)
+    # Longest trips first; a stable sort keeps ties in case order
+    selected = np.flatnonzero(days >= 8)
+    selected = selected[np.argsort(-days[selected], kind='stable')]
+    
+    long_trip_cases = []
+    for i in selected:
+        long_trip_cases.append({
+            'index': int(i),
+            'days': int(days[i]),
+            'miles': float(miles[i]),
+            'receipts': float(receipts[i]),
+            'expected': float(expected[i]),
+            'expected_per_day': expected[i] / days[i]
+        })
     
     print(f"Found {len(long_trip_cases)} cases with 8+ days")
     print()
     
     for case in long_trip_cases[:20]:  # Show top 20
-        print(f"Case {case['index']}: {case['days']} days, {case['miles']} miles, ${case['receipts']:.2f} receipts")
+        print(f"Case {case['index']}: {case['days']} days, {case['miles']:g} miles, ${case['receipts']:.2f} receipts")
         print(f"  Expected: ${case['expected']:.2f} (${case['expected_per_day']:.2f}/day)")
         print()
     
     return long_trip_cases
 
-def reverse_engineer_logic(cases_data):
+def reverse_engineer_logic(cases):
     """Try to reverse engineer the logic from patterns"""
     
     print("\n=== REVERSE ENGINEERING LOGIC ===")
+    days, miles, receipts, expected = cases
     
     # Let's look at some basic cases first to understand the base logic
     simple_cases = []
     
-    for i, case in enumerate(cases_data[:100]):  # First 100 cases
-        input_data = case['input']
-        expected = case['expected_output']
-        
-        days = input_data['trip_duration_days']
-        miles = input_data['miles_traveled']
-        receipts = input_data['total_receipts_amount']
+    for i in np.flatnonzero(receipts[:100] < 100):  # Low receipt cases among the first 100
+        expected_per_day = expected[i] / days[i]
+        miles_rate = (expected[i] - receipts[i]) / miles[i] if miles[i] > 0 else 0
         
-        if receipts < 100:  # Low receipt cases to understand base logic
-            expected_per_day = expected / days
-            miles_rate = (expected - receipts) / miles if miles > 0 else 0
-            
-            simple_cases.append({
-                'index': i,
-                'days': days,
-                'miles': miles,
-                'receipts': receipts,
-                'expected': expected,
-                'expected_per_day': expected_per_day,
-                'miles_rate': miles_rate
-            })
+        simple_cases.append({
+            'index': int(i),
+            'days': int(days[i]),
+            'miles': float(miles[i]),
+            'receipts': float(receipts[i]),
+            'expected': float(expected[i]),
+            'expected_per_day': expected_per_day,
+            'miles_rate': miles_rate
+        })
     
     print("Sample low-receipt cases:")
     for case in simple_cases[:10]:
-        print(f"Case {case['index']}: {case['days']} days, {case['miles']} miles, ${case['receipts']:.2f} receipts")
+        print(f"Case {case['index']}: {case['days']} days, {case['miles']:g} miles, ${case['receipts']:.2f} receipts")
         print(f"  Expected: ${case['expected']:.2f} (${case['expected_per_day']:.2f}/day)")
         print(f"  Implied miles rate: ${case['miles_rate']:.4f}/mile")
         print()
 
 if __name__ == "__main__":
-    # Load data
-    with open('public_cases.json', 'r') as f:
-        cases_data = json.load(f)
+    # Load data as cached columns, shared by every analysis below
+    cases = case_cache.to_float64(case_cache.load_cases('public_cases.json'))
     
-    print(f"Loaded {len(cases_data)} test cases")
+    print(f"Loaded {len(cases[0])} test cases")
     print()
     
     # Find the specific cases mentioned
-    found_cases = find_specific_cases()
+    found_cases = find_specific_cases(cases)
     
     # Analyze patterns
-    high_receipt_cases = analyze_patterns(cases_data)
-    long_trip_cases = analyze_long_trips(cases_data)
-    reverse_engineer_logic(cases_data)
\ No newline at end of file
+    high_receipt_cases = analyze_patterns(cases)
+    long_trip_cases = analyze_long_trips(cases)
+    reverse_engineer_logic(cases)
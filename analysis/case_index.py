@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Nearest-neighbour index over historical cases
+A k-d tree on (days, miles, receipts), each scaled to the data's range, that
+finds the k most similar trips or every trip inside a box without scanning
+the whole case file
+"""
+
+import os
+import sys
+import heapq
+import argparse
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "scripts"))
+sys.path.insert(0, os.path.join(REPO_ROOT, "algorithms"))
+
+import case_cache
+
+DEFAULT_CASES = os.path.join(REPO_ROOT, "data", "public_cases.json")
+
+# Most points kept in a leaf before it is split
+LEAF_SIZE = 16
+
+class CaseIndex:
+    """
+    k-d tree over an (n, 3) array of (days, miles, receipts)
+
+    Every axis is divided by its range in the data, so distances compare
+    fractions of each axis's spread rather than raw days, miles and dollars
+    (in the public cases a day counts far more than a mile or a dollar).
+    Nodes cover contiguous runs of `order` and keep their bounding boxes, so
+    whole subtrees are skipped or taken at once.
+    """
+
+    def __init__(self, points, leaf_size=LEAF_SIZE):
+        self.points = np.asarray(points, dtype=np.float64)
+        low = self.points.min(axis=0) if len(self.points) else np.zeros(3)
+        span = self.points.max(axis=0) - low if len(self.points) else np.ones(3)
+        self.offset = low
+        self.scale = np.where(span > 0, span, 1.0)
+        self.scaled = (self.points - self.offset) / self.scale
+        self.order = np.arange(len(self.points))
+        self._build(leaf_size)
+
+    @classmethod
+    def from_cases(cls, cases, leaf_size=LEAF_SIZE):
+        """Index a case_cache.to_float64() tuple"""
+        days, miles, receipts = cases[:3]
+        return cls(np.column_stack([days, miles, receipts]), leaf_size)
+
+    def _build(self, leaf_size):
+        starts, ends, lefts, rights, lows, highs = [], [], [], [], [], []
+
+        def new_node(start, end):
+            points = self.scaled[self.order[start:end]]
+            starts.append(start)
+            ends.append(end)
+            lefts.append(-1)
+            rights.append(-1)
+            lows.append(points.min(axis=0) if end > start else np.zeros(3))
+            highs.append(points.max(axis=0) if end > start else np.zeros(3))
+            return len(starts) - 1
+
+        stack = [new_node(0, len(self.points))]
+        while stack:
+            node = stack.pop()
+            start, end = starts[node], ends[node]
+            spread = highs[node] - lows[node]
+            if end - start <= leaf_size or not spread.any():
+                continue
+            # Split the widest axis at the median
+            axis = int(np.argmax(spread))
+            middle = (start + end) // 2
+            segment = self.order[start:end]
+            self.order[start:end] = segment[np.argpartition(self.scaled[segment, axis], middle - start)]
+            lefts[node] = new_node(start, middle)
+            rights[node] = new_node(middle, end)
+            stack += [lefts[node], rights[node]]
+
+        self.starts, self.ends = np.array(starts), np.array(ends)
+        self.lefts, self.rights = np.array(lefts), np.array(rights)
+        self.lows, self.highs = np.array(lows), np.array(highs)
+
+    def _box_distance(self, q, node):
+        gap = np.maximum(0.0, np.maximum(self.lows[node] - q, q - self.highs[node]))
+        return float(np.sqrt(gap @ gap))
+
+    def nearest(self, point, k=5):
+        """
+        (indices, distances) of the k cases closest to point, nearest first
+
+        Distances are in scaled units, where 1 is the data's full range on
+        an axis. Raises ValueError unless k is at least 1.
+        """
+        if k < 1:
+            raise ValueError(f"k must be at least 1, got {k}")
+        q = (np.asarray(point, dtype=np.float64) - self.offset) / self.scale
+        best_distance = np.full(k, np.inf)
+        best_index = np.full(k, -1)
+        heap = [(self._box_distance(q, 0), 0)]
+        while heap:
+            distance, node = heapq.heappop(heap)
+            if distance >= best_distance[-1]:
+                break
+            if self.lefts[node] < 0:
+                index = self.order[self.starts[node]:self.ends[node]]
+                offsets = self.scaled[index] - q
+                distances = np.sqrt(np.einsum('ij,ij->i', offsets, offsets))
+                merged_distance = np.concatenate([best_distance, distances])
+                merged_index = np.concatenate([best_index, index])
+                keep = np.argsort(merged_distance, kind='stable')[:k]
+                best_distance, best_index = merged_distance[keep], merged_index[keep]
+                continue
+            for child in (self.lefts[node], self.rights[node]):
+                heapq.heappush(heap, (self._box_distance(q, child), child))
+        found = best_index >= 0
+        return best_index[found], best_distance[found]
+
+    def within(self, low, high):
+        """Indices, in case order, of cases with low <= (days, miles, receipts) <= high"""
+        low = (np.asarray(low, dtype=np.float64) - self.offset) / self.scale
+        high = (np.asarray(high, dtype=np.float64) - self.offset) / self.scale
+        found = []
+        stack = [0] if len(self.points) else []
+        while stack:
+            node = stack.pop()
+            if np.any(self.highs[node] < low) or np.any(self.lows[node] > high):
+                continue
+            index = self.order[self.starts[node]:self.ends[node]]
+            if np.all(self.lows[node] >= low) and np.all(self.highs[node] <= high):
+                found.append(index)
+            elif self.lefts[node] < 0:
+                points = self.scaled[index]
+                found.append(index[np.all((points >= low) & (points <= high), axis=1)])
+            else:
+                stack += [self.lefts[node], self.rights[node]]
+        return np.sort(np.concatenate(found)) if found else np.array([], dtype=np.int64)
+
+def print_cases(cases, index, distances=None):
+    """One line per case with the engine's output and, if known, the error"""
+    from calculate_reimbursement import calculate_reimbursement_batch
+
+    days, miles, receipts, expected = cases
+    actual = calculate_reimbursement_batch(days[index], miles[index], receipts[index])
+    for row, i in enumerate(index):
+        line = f"    Case {i + 1}: {int(days[i])} days, {miles[i]:g} miles, ${receipts[i]:.2f} receipts  "
+        if expected is not None:
+            line += f"Expected: ${expected[i]:.2f}, Got: ${actual[row]:.2f}, Error: ${abs(actual[row] - expected[i]):.2f}"
+        else:
+            line += f"Got: ${actual[row]:.2f}"
+        if distances is not None:
+            line += f"  (distance {distances[row]:.4f})"
+        print(line)
+
+def main():
+    """Look up the cases most similar to a trip"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("days", type=float)
+    parser.add_argument("miles", type=float)
+    parser.add_argument("receipts", type=float)
+    parser.add_argument("-k", type=int, default=5, help="number of neighbours (default: 5)")
+    parser.add_argument("--within", nargs=3, type=float, metavar=("DAYS", "MILES", "RECEIPTS"),
+                        help="list every case within these distances on each axis instead")
+    parser.add_argument("--cases", default=DEFAULT_CASES,
+                        help="case file to index (default: data/public_cases.json)")
+    args = parser.parse_args()
+    if args.k < 1:
+        parser.error("-k must be at least 1")
+
+    cases = case_cache.to_float64(case_cache.load_cases(args.cases))
+    index = CaseIndex.from_cases(cases)
+    point = np.array([args.days, args.miles, args.receipts])
+    trip = f"{args.days:g} days, {args.miles:g} miles, ${args.receipts:.2f} receipts"
+
+    if args.within:
+        tolerance = np.array(args.within)
+        found = index.within(point - tolerance, point + tolerance)
+        print(f"🔎 {len(found)} of {len(cases[0])} cases within ±{args.within[0]:g} days, "
+              f"±{args.within[1]:g} miles, ±${args.within[2]:g} of {trip}:")
+        print_cases(cases, found)
+    else:
+        found, distances = index.nearest(point, args.k)
+        print(f"🔎 {len(found)} nearest of {len(cases[0])} cases to {trip}:")
+        print_cases(cases, found, distances)
+
+if __name__ == "__main__":
+    main()
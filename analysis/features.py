@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Shared feature table for the case reports
+Reads a case file once and runs the engine over it once, giving one flat
+table of inputs, expected and engine output, error and per-day rates that
+every report queries instead of re-parsing the JSON
+"""
+
+import os
+import sys
+import argparse
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "scripts"))
+sys.path.insert(0, os.path.join(REPO_ROOT, "algorithms"))
+
+import case_cache
+from calculate_reimbursement import calculate_reimbursement_batch
+
+DEFAULT_CASES = os.path.join(REPO_ROOT, "data", "public_cases.json")
+
+# Table columns, in order; expected and the error columns are NaN for private cases
+FEATURES = ("days", "miles", "receipts", "expected", "actual", "error", "abs_error",
+            "miles_per_day", "receipts_per_day")
+
+def extract_features(path=DEFAULT_CASES, engine=calculate_reimbursement_batch):
+    """
+    One row per case, in case-file order
+
+    error is actual minus expected, taken in whole cents so exact matches
+    come out as exactly zero.
+    """
+    days, miles, receipts, expected = case_cache.to_float64(case_cache.load_cases(path))
+    actual = np.asarray(engine(days, miles, receipts), dtype=np.float64)
+    if expected is None:
+        expected = np.full(len(days), np.nan)
+        error = np.full(len(days), np.nan)
+    else:
+        error = (np.rint(actual * 100) - np.rint(expected * 100)) / 100
+    return pd.DataFrame({
+        "days": days,
+        "miles": miles,
+        "receipts": receipts,
+        "expected": expected,
+        "actual": actual,
+        "error": error,
+        "abs_error": np.abs(error),
+        "miles_per_day": miles / days,
+        "receipts_per_day": receipts / days,
+    }, columns=list(FEATURES))
+
+def main():
+    """Write the feature table as CSV"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cases", default=DEFAULT_CASES,
+                        help="public or private case file (default: data/public_cases.json)")
+    parser.add_argument("--output", "-o", default="-", help="CSV path, - for stdout (default: -)")
+    args = parser.parse_args()
+
+    table = extract_features(args.cases)
+    table.to_csv(sys.stdout if args.output == "-" else args.output, index_label="case", float_format="%.10g")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Segmented-regression breakpoint discovery for the rule table
+Fits what one rule would have to pay (expected output minus every other
+rule and the variance) as a piecewise-linear function of its input, finding
+the best breakpoints for each segment count by dynamic programming over
+prefix sums, and writes the result back as rule table bands
+"""
+
+import os
+import re
+import sys
+import argparse
+from collections import namedtuple
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "scripts"))
+sys.path.insert(0, os.path.join(REPO_ROOT, "algorithms"))
+
+import case_cache
+from calculate_reimbursement import batch_rule_inputs
+from reimbursement_rules import RULES_FILE, RULE_NAMES, load_rules, evaluate_rule_batch
+from optimize_rules import DECIMALS, build_model, score_candidates
+
+DEFAULT_CASES = os.path.join(REPO_ROOT, "data", "public_cases.json")
+
+# Rules with a continuous input worth segmenting
+AXES = ("receipts", "mileage", "efficiency")
+
+# Most cut positions the search considers; beyond this many distinct
+# values, cuts are restricted to evenly spaced quantiles
+MAX_CANDIDATES = 512
+
+# Fewest cases a segment may be fitted to
+MIN_SEGMENT = 10
+
+# Bounds are snapped to the coarsest of these steps that fits between two
+# neighbouring input values
+BOUND_STEPS = (1000, 500, 100, 50, 25, 10, 5, 1, 0.5, 0.1, 0.05, 0.01)
+
+# One fitted segment: cases with low < x <= bound get intercept + slope * x
+Segment = namedtuple("Segment", ["low", "bound", "count", "intercept", "slope", "sse"])
+
+def partial_residual(cases_path=DEFAULT_CASES, rules_path=RULES_FILE, axis="receipts"):
+    """
+    (input, target) for one rule: the rule's input per case and what it
+    would have to contribute for the engine to match the expected output,
+    with every other rule and the variance taken as they are
+    """
+    cases = case_cache.load_cases(cases_path)
+    if cases.expected_cents is None:
+        raise ValueError(f"{cases_path} has no expected outputs")
+    days, miles, receipts, expected = case_cache.to_float64(cases)
+    inputs, variance = batch_rule_inputs(days, miles, receipts)
+    rules = load_rules(rules_path)
+    others = sum(evaluate_rule_batch(rules[name], inputs[name]) for name in RULE_NAMES if name != axis)
+    return inputs[axis], expected - variance - others, days
+
+def _cut_positions(x, min_segment):
+    """Sorted positions between distinct values of x that leave min_segment cases at both ends"""
+    changes = np.flatnonzero(np.diff(x) > 0) + 1
+    return changes[(changes >= min_segment) & (changes <= len(x) - min_segment)]
+
+def _candidate_cuts(x, min_segment, max_candidates):
+    """Positions a segment may start or end at in the DP: 0, n and changes of x"""
+    changes = _cut_positions(x, min_segment)
+    if len(changes) > max_candidates - 2:
+        changes = changes[np.unique(np.linspace(0, len(changes) - 1, max_candidates - 2).round().astype(int))]
+    return np.concatenate(([0], changes, [len(x)]))
+
+def _prefix_sums(x, y):
+    """Prefix sums of 1, u, y, u^2, u*y and y^2, with u = x centred and scaled"""
+    # Centring keeps the sums of x^2 and x*y well conditioned
+    u = (x - x.mean()) / (x.std() or 1.0)
+    return [np.concatenate(([0.0], np.cumsum(v))) for v in (np.ones_like(u), u, y, u * u, u * y, y * y)]
+
+def _sse(prefix, starts, ends, min_segment, linear):
+    """
+    Squared error of the best line (or constant) through the cases from
+    each start to each end (broadcast), inf where fewer than min_segment
+
+    Each entry is a few prefix-sum lookups, whatever the segment length.
+    """
+    n, su, sy, suu, suy, syy = (s[ends] - s[starts] for s in prefix)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sse = syy - sy * sy / n
+        if linear:
+            var_u = suu - su * su / n
+            cov = suy - su * sy / n
+            sse = sse - np.where(var_u > 1e-12, cov * cov / var_u, 0.0)
+    return np.where(n >= min_segment, np.maximum(sse, 0.0), np.inf)
+
+def _refine(prefix, positions, changes, min_segment, linear):
+    """
+    Move each breakpoint to the best cut between its neighbours, one at a
+    time, trying every distinct value rather than the DP's coarser grid
+    """
+    positions = positions.copy()
+    for i in range(1, len(positions) - 1):
+        low, high = positions[i - 1], positions[i + 1]
+        candidates = changes[(changes > low) & (changes < high)]
+        if not len(candidates):
+            continue
+        cost = (_sse(prefix, low, candidates, min_segment, linear)
+                + _sse(prefix, candidates, high, min_segment, linear))
+        if np.isfinite(cost.min()):
+            positions[i] = candidates[np.argmin(cost)]
+    return positions
+
+def fit_segments(x, y, max_segments=6, min_segment=MIN_SEGMENT, linear=True,
+                 max_candidates=MAX_CANDIDATES):
+    """
+    Best segmentation of y against x for every segment count up to
+    max_segments
+
+    x is sorted once and prefix-summed, so any segment's error costs O(1).
+    The DP then runs over at most max_candidates cuts in
+    O(max_segments * max_candidates^2), and each breakpoint it picks is
+    refined over every distinct value in O(n), keeping the whole search at
+    O(n log n) per segment count. Returns a list, indexed by segment
+    count - 1, of Segment lists (None where no segmentation has that many
+    segments of min_segment cases).
+    """
+    order = np.argsort(x, kind='stable')
+    x = np.asarray(x, dtype=np.float64)[order]
+    y = np.asarray(y, dtype=np.float64)[order]
+    prefix = _prefix_sums(x, y)
+    changes = _cut_positions(x, min_segment)
+    cuts = _candidate_cuts(x, min_segment, max_candidates)
+    cost = _sse(prefix, cuts[:, None], cuts[None, :], min_segment, linear)
+
+    # best[j] is the lowest error of k segments covering cases before cuts[j]
+    best = cost[0].copy()
+    back = []
+    results = []
+    for k in range(1, max_segments + 1):
+        if k > 1:
+            total = best[:, None] + cost
+            previous = np.argmin(total, axis=0)
+            best = total[previous, np.arange(len(cuts))]
+            back.append(previous)
+        if not np.isfinite(best[-1]):
+            results.append(None)
+            continue
+        # Walk the back pointers from the last cut to recover the segment ends
+        ends = [len(cuts) - 1]
+        for previous in reversed(back):
+            ends.append(previous[ends[-1]])
+        ends.append(0)
+        positions = _refine(prefix, cuts[ends[::-1]], changes, min_segment, linear)
+        results.append([_fit(x, y, start, end, linear) for start, end in zip(positions[:-1], positions[1:])])
+    return results
+
+def _fit(x, y, start, end, linear):
+    xs, ys = x[start:end], y[start:end]
+    slope = 0.0
+    if linear and xs[-1] > xs[0]:
+        slope = float(np.sum((xs - xs.mean()) * (ys - ys.mean())) / np.sum((xs - xs.mean()) ** 2))
+    intercept = float(ys.mean() - slope * xs.mean())
+    sse = float(np.sum((ys - intercept - slope * xs) ** 2))
+    return Segment(float(xs[0]), float(xs[-1]), end - start, intercept, slope, sse)
+
+def round_bound(low, high):
+    """The roundest number b with low <= b < high, so "x <= b" splits them"""
+    for step in BOUND_STEPS:
+        bound = np.ceil(round(low / step, 9)) * step
+        if bound < high:
+            return round(float(bound), 2)
+    return low
+
+def to_bands(segments):
+    """
+    Rule table bands (bound, base, rate, origin) for consecutive segments
+
+    Each bound sits between the last input of its segment and the first of
+    the next; each band's origin is the previous bound, so base is the
+    band's value where it starts.
+    """
+    bands = []
+    origin = 0.0
+    for i, segment in enumerate(segments):
+        bound = round_bound(segment.bound, segments[i + 1].low) if i + 1 < len(segments) else np.inf
+        base = segment.intercept + segment.slope * origin
+        bands.append((bound, round(base, DECIMALS["base"]), round(segment.slope, DECIMALS["rate"]), origin))
+        origin = bound
+    return bands
+
+def bic(segments, count, linear):
+    """Bayesian information criterion of a segmentation: lower is better"""
+    sse = sum(segment.sse for segment in segments)
+    parameters = len(segments) * (2 if linear else 1) + len(segments) - 1
+    return count * np.log(max(sse, 1e-12) / count) + parameters * np.log(count)
+
+def _format_number(value, places):
+    if value == np.inf:
+        return "inf"
+    text = f"{value:.{places}f}".rstrip("0").rstrip(".")
+    return "0" if text in ("", "-0") else text
+
+def format_rule_bands(rules_path, name, bands):
+    """
+    Text of the rule table at rules_path with every band of one rule
+    replaced by bands, laid out like the rule's first band line
+    """
+    lines = []
+    replaced = False
+    with open(rules_path, 'r') as f:
+        for line in f:
+            content = line.split("#", 1)[0]
+            fields = content.split()
+            if len(fields) != 6 or fields[0] != name:
+                lines.append(line)
+                continue
+            if replaced:
+                continue
+            replaced = True
+            starts = [token.start() for token in re.finditer(r"\S+", content)]
+            for bound, base, rate, origin in bands:
+                values = [name, "<=", _format_number(bound, 2), _format_number(base, DECIMALS["base"]),
+                          _format_number(rate, DECIMALS["rate"]), _format_number(origin, 2)]
+                rebuilt = ""
+                for start, value in zip(starts, values):
+                    if len(rebuilt) < start:
+                        rebuilt = rebuilt.ljust(start)
+                    elif rebuilt:
+                        rebuilt += " "
+                    rebuilt += value
+                lines.append(rebuilt.rstrip() + "\n")
+    if not replaced:
+        raise ValueError(f"{rules_path} has no {name} rule")
+    return "".join(lines)
+
+def parse_groups(text):
+    """
+    Trip-length groups from "1-3,4-7,8-" as (low, high) day ranges, for
+    argparse's type=
+    """
+    groups = []
+    for part in text.split(","):
+        low, dash, high = part.strip().partition("-")
+        try:
+            low = int(low)
+            high = int(high) if high else (10 ** 9 if dash else low)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"bad group {part.strip()!r}, expected e.g. \"1-3,4-7,8-\"")
+        if high < low:
+            raise argparse.ArgumentTypeError(f"group {part.strip()!r} ends before it starts")
+        groups.append((low, high))
+    return groups
+
+def print_fits(fits, count, linear, label):
+    """Error and BIC per segment count, then the bands of the best one"""
+    print(f"📈 {label}: {count} cases")
+    scored = [(k + 1, segments, bic(segments, count, linear)) for k, segments in enumerate(fits) if segments]
+    chosen = min(scored, key=lambda item: item[2])
+    for k, segments, criterion in scored:
+        rmse = np.sqrt(sum(segment.sse for segment in segments) / count)
+        print(f"  {k} segment{'s' if k > 1 else ' '}  RMSE ${rmse:8.2f}  BIC {criterion:10.1f}"
+              + ("  ⬅ best" if k == chosen[0] else ""))
+    print(f"  Bands for {chosen[0]} segment{'s' if chosen[0] > 1 else ''}:")
+    for segment, (bound, base, rate, origin) in zip(chosen[1], to_bands(chosen[1])):
+        print(f"    <= {_format_number(bound, 2):>8}  base {base:9.2f}  rate {rate:8.4f}  origin {_format_number(origin, 2):>7}"
+              f"  ({segment.count} cases, {segment.low:g}..{segment.bound:g})")
+    return chosen
+
+def main():
+    """Find breakpoints for one rule and print or write them as rule table bands"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("axis", choices=AXES, help="rule whose input to segment")
+    parser.add_argument("--cases", default=DEFAULT_CASES,
+                        help="public case file to fit (default: data/public_cases.json)")
+    parser.add_argument("--rules-file", default=RULES_FILE,
+                        help="rule table the other rules come from (default: algorithms/reimbursement_rules.txt)")
+    parser.add_argument("--max-segments", type=int, default=6,
+                        help="most segments to try (default: 6)")
+    parser.add_argument("--segments", type=int,
+                        help="use this many segments instead of the lowest BIC")
+    parser.add_argument("--min-segment", type=int, default=MIN_SEGMENT,
+                        help=f"fewest cases per segment (default: {MIN_SEGMENT})")
+    parser.add_argument("--constant", action="store_true",
+                        help="fit a constant per segment (rate 0), like the efficiency bands")
+    parser.add_argument("--groups", type=parse_groups,
+                        help='also fit each trip-length group separately, e.g. "1-3,4-7,8-"')
+    parser.add_argument("--output", help="write the rule table with the new bands here")
+    args = parser.parse_args()
+    if args.max_segments < 1:
+        parser.error("--max-segments must be at least 1")
+    if args.segments is not None and not 1 <= args.segments <= args.max_segments:
+        parser.error("--segments must be between 1 and --max-segments")
+
+    linear = not args.constant
+    x, y, days = partial_residual(args.cases, args.rules_file, args.axis)
+    fits = fit_segments(x, y, args.max_segments, args.min_segment, linear)
+    if not any(fits):
+        print(f"❌ Too few cases for segments of {args.min_segment}")
+        sys.exit(1)
+    k, segments, _ = print_fits(fits, len(x), linear, f"{args.axis}, all trips")
+    if args.segments is not None:
+        k, segments = args.segments, fits[args.segments - 1]
+        if segments is None:
+            print(f"❌ No {k}-segment fit has {args.min_segment} cases per segment")
+            sys.exit(1)
+
+    if args.groups:
+        for low, high in args.groups:
+            group = (days >= low) & (days <= high)
+            label = f"{args.axis}, {low}-{high if high < 10 ** 9 else ''} day trips"
+            group_fits = fit_segments(x[group], y[group], args.max_segments, args.min_segment, linear)
+            print()
+            if any(group_fits):
+                print_fits(group_fits, int(group.sum()), linear, label)
+            else:
+                print(f"📈 {label}: too few cases to fit")
+
+    table = format_rule_bands(args.rules_file, args.axis, to_bands(segments))
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(table)
+        before = build_model(args.cases, args.rules_file)
+        after = build_model(args.cases, args.output)
+        print()
+        print(f"🎯 Score with {k} {args.axis} bands: "
+              f"{score_candidates(before, before['params'][None, :])[0] / 100:.2f} → "
+              f"{score_candidates(after, after['params'][None, :])[0] / 100:.2f}")
+        print(f"📝 Wrote {args.output}")
+    else:
+        print()
+        sys.stdout.write("".join(line for line in table.splitlines(keepends=True)
+                                 if line.split() and line.split()[0] == args.axis))
+
+if __name__ == "__main__":
+    main()
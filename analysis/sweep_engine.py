@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Dense input-space sweep of the reimbursement engine
+Evaluates the engine on a (days, miles, receipts) grid, chunk by chunk on a
+process pool, finds every jump and slope change in its output, and checks
+that map against where the public-case residuals change
+"""
+
+import os
+import sys
+import time
+import argparse
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "scripts"))
+sys.path.insert(0, os.path.join(REPO_ROOT, "algorithms"))
+
+import case_cache
+import calculate_reimbursement
+from reimbursement_rules import RULE_NAMES, evaluate_rule_batch
+
+DEFAULT_CASES = os.path.join(REPO_ROOT, "data", "public_cases.json")
+
+AXES = ("days", "miles", "receipts")
+UNITS = {"days": "day", "miles": "mile", "miles_per_day": "mile/day", "receipts": "$"}
+
+# Grid points evaluated per chunk, which bounds each worker's memory
+CHUNK_POINTS = 1 << 22
+
+# Smallest second difference counted as a break, per engine; the full engine
+# rounds to cents, so its differences are only good to about two cents
+TOLERANCE = {"rules": 1e-6, "full": 0.025}
+
+# A break in the engine's output surface: where it is, the share of grid
+# lines crossing it that see it, its mean slope change and its jump (0 for
+# a pure slope change), and the trip lengths it occurs at
+Boundary = namedtuple("Boundary", ["axis", "low", "high", "lines", "slope_change", "jump", "days"])
+
+# Where the public-case residual changes, and how far either side the
+# window it was measured over reaches
+ResidualChange = namedtuple("ResidualChange", ["axis", "location", "jump", "t", "reach"])
+
+def rule_surface(days, miles, receipts):
+    """
+    The engine before its hash variance and cent rounding: the sum of every
+    rule, floored at $50
+    """
+    inputs, _ = calculate_reimbursement.batch_rule_inputs(days, miles, receipts)
+    rules = calculate_reimbursement.RULES
+    total = evaluate_rule_batch(rules["per_diem"], inputs["per_diem"])
+    for name in RULE_NAMES[1:]:
+        total = total + evaluate_rule_batch(rules[name], inputs[name])
+    return np.maximum(total, 50.0)
+
+ENGINES = {
+    "rules": rule_surface,
+    "full": calculate_reimbursement.calculate_reimbursement_batch,
+}
+
+def parse_range(text):
+    """Grid values for "start:stop:step", stop included"""
+    start, stop, step = (float(part) for part in text.split(":"))
+    if step <= 0 or stop < start:
+        raise ValueError(f"bad range {text!r}")
+    count = int(round((stop - start) / step)) + 1
+    return np.round(start + step * np.arange(count), 6)
+
+def plan_chunks(shape, chunk_points=CHUNK_POINTS):
+    """
+    Split a grid into boxes of roughly chunk_points, as ((start, stop) per
+    axis); every box spans all days so trip length breaks stay inside one
+    """
+    days, miles, receipts = shape
+    miles_block = max(1, min(miles, int(np.sqrt(chunk_points / days))))
+    receipts_block = max(1, min(receipts, chunk_points // (days * miles_block)))
+    return [((0, days), (m, min(m + miles_block, miles)), (r, min(r + receipts_block, receipts)))
+            for m in range(0, miles, miles_block) for r in range(0, receipts, receipts_block)]
+
+def _aggregate(keys, counts, sums, steps):
+    """Combine per-key event statistics that share a key"""
+    unique, inverse = np.unique(keys, return_inverse=True)
+    max_steps = np.zeros(len(unique))
+    np.maximum.at(max_steps, inverse, steps)
+    return (unique, np.bincount(inverse, weights=counts, minlength=len(unique)),
+            np.bincount(inverse, weights=sums, minlength=len(unique)), max_steps)
+
+def sweep_chunk(args):
+    """
+    Worker entry point: evaluate one box of the grid and tally its breaks
+
+    The box is evaluated with one extra point on each side, so second
+    differences are available at every point the box owns. Returns, per
+    axis, (keys, counts, sums, max steps) of the break events the box owns;
+    keys are grid indices on the days axis and day index * axis length +
+    grid index on the other two.
+    """
+    engine, grid, own, tolerance = args
+    low = [max(0, start - 1) for start, _ in own]
+    high = [min(len(values), stop + 1) for values, (_, stop) in zip(grid, own)]
+    values = [axis_values[lo:hi] for axis_values, lo, hi in zip(grid, low, high)]
+    shape = tuple(len(v) for v in values)
+    output = ENGINES[engine](np.broadcast_to(values[0][:, None, None], shape).ravel(),
+                             np.broadcast_to(values[1][None, :, None], shape).ravel(),
+                             np.broadcast_to(values[2][None, None, :], shape).ravel()).reshape(shape)
+
+    results = []
+    for axis in range(3):
+        # Points owned by this box on the other axes, everything on this one
+        region = [slice(start - lo, stop - lo) for (start, stop), lo in zip(own, low)]
+        region[axis] = slice(None)
+        if shape[axis] < 3:
+            results.append((np.empty(0, np.int64),) + (np.empty(0),) * 3)
+            continue
+        delta = np.diff(output[tuple(region)], n=2, axis=axis)
+        index = np.nonzero(np.abs(delta) > tolerance)
+        location = index[axis] + low[axis] + 1
+        keep = (location >= own[axis][0]) & (location < own[axis][1])
+        location = location[keep]
+        steps = delta[index][keep]
+        if axis == 0:
+            keys = location
+        else:
+            keys = (index[0][keep] + own[0][0]) * len(grid[axis]) + location
+        results.append(_aggregate(keys, np.ones(len(keys)), steps, np.abs(steps)))
+    return results
+
+def sweep(engine, grid, tolerance, workers=None, chunk_points=CHUNK_POINTS):
+    """
+    Sweep the whole grid; returns per-axis (keys, counts, sums, max steps)
+    as sweep_chunk() describes, merged over every chunk
+    """
+    jobs = [(engine, grid, own, tolerance)
+            for own in plan_chunks(tuple(len(values) for values in grid), chunk_points)]
+    parts = [[] for _ in AXES]
+    if workers == 1:
+        chunk_results = map(sweep_chunk, jobs)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count())
+        chunk_results = pool.map(sweep_chunk, jobs)
+    try:
+        for result in chunk_results:
+            for axis, tally in enumerate(result):
+                parts[axis].append(tally)
+    finally:
+        if workers != 1:
+            pool.shutdown()
+    return [_aggregate(*(np.concatenate(column) for column in zip(*axis_parts)))
+            for axis_parts in parts]
+
+def _runs(indices):
+    """Split sorted integer indices into runs of consecutive values"""
+    if not len(indices):
+        return []
+    cuts = np.flatnonzero(np.diff(indices) > 1) + 1
+    return np.split(np.arange(len(indices)), cuts)
+
+def _boundary(axis, low, high, lines, net, max_step, step, tolerance, days=None):
+    """
+    A Boundary from the events of one break
+
+    net is the mean over lines of the summed second differences, which is
+    the slope change times the grid step; a single step larger than that is
+    a jump.
+    """
+    slope_change = net / step if abs(net) > tolerance else 0.0
+    jump = max_step if max_step > abs(net) + tolerance else 0.0
+    return Boundary(axis, low, high, lines, slope_change, jump, days)
+
+def find_boundaries(grid, events, tolerance):
+    """
+    Turn merged sweep events into Boundary lists per axis
+
+    Runs of neighbouring grid points are one break on the continuous axes;
+    every day is its own point on the days axis. Miles points that break
+    for fewer than half the trip lengths sit at a fixed miles per day, and
+    are reported on a derived miles_per_day axis instead.
+    """
+    days_values = grid[0]
+    boundaries = {axis: [] for axis in ("days", "miles", "miles_per_day", "receipts")}
+    steps = [np.diff(values).min() if len(values) > 1 else 1.0 for values in grid]
+
+    keys, counts, sums, max_steps = events[0]
+    lines = len(grid[1]) * len(grid[2])
+    for key, count, total, max_step in zip(keys, counts, sums, max_steps):
+        boundaries["days"].append(_boundary("days", grid[0][key], grid[0][key], count / lines,
+                                            total / count, max_step, steps[0], tolerance))
+
+    for axis in (1, 2):
+        name = AXES[axis]
+        keys, counts, sums, max_steps = events[axis]
+        day_index, location = np.divmod(keys, len(grid[axis]))
+        lines_per_day = len(grid[3 - axis])
+
+        # How many trip lengths break at each grid point
+        points, inverse = np.unique(location, return_inverse=True)
+        point_days = np.bincount(inverse, minlength=len(points))
+        if axis == 1:
+            per_day = point_days[inverse] * 2 < len(days_values)
+            if per_day.any():
+                boundaries["miles_per_day"] = _per_day_boundaries(
+                    grid, np.flatnonzero(per_day), day_index, location, counts, sums, max_steps,
+                    steps[1], tolerance, lines_per_day)
+            points = points[point_days * 2 >= len(days_values)]
+
+        for run in _runs(points):
+            members = np.flatnonzero(np.isin(location, points[run]))
+            run_days, lines, nets, day_steps = _by_day(day_index, counts, sums, max_steps, members)
+            boundaries[name].append(_boundary(
+                name, grid[axis][points[run][0]], grid[axis][points[run][-1]],
+                lines.sum() / (lines_per_day * len(days_values)), np.median(nets),
+                np.median(day_steps), steps[axis], tolerance, days_values[run_days]))
+    return boundaries
+
+def _by_day(day_index, counts, sums, max_steps, members):
+    """
+    Per trip length: (day indices, lines, net, largest step) of the events
+    of one break
+
+    Callers take medians over trip lengths, so a different break that
+    happens to coincide with this one on a single trip length is ignored.
+    """
+    days = day_index[members]
+    run_days = np.unique(days)
+    lines, nets, day_steps = [], [], []
+    for day in run_days:
+        mine = members[days == day]
+        # A line can break at several grid points of one run; count it once
+        lines.append(counts[mine].max())
+        nets.append(sums[mine].sum() / lines[-1])
+        day_steps.append(max_steps[mine].max())
+    return run_days, np.array(lines), np.array(nets), np.array(day_steps)
+
+def _per_day_boundaries(grid, events, day_index, location, counts, sums, max_steps, step,
+                        tolerance, lines_per_day):
+    """Cluster miles breaks by miles per day into miles_per_day Boundaries"""
+    days = grid[0][day_index[events]]
+    ratio = grid[1][location[events]] / days
+    order = np.argsort(ratio, kind='stable')
+    # Neighbouring grid points of one break are at most a step apart in miles
+    gap = 1.5 * step / max(1.0, grid[0].min())
+    cuts = np.flatnonzero(np.diff(ratio[order]) > gap) + 1
+    boundaries = []
+    for cluster in np.split(order, cuts):
+        run_days, lines, nets, day_steps = _by_day(day_index, counts, sums, max_steps, events[cluster])
+        # A mile step is 1 / days in miles per day
+        boundary = _boundary("miles_per_day", ratio[cluster].min(), ratio[cluster].max(),
+                             lines.sum() / (lines_per_day * len(grid[0])),
+                             np.median(nets * grid[0][run_days]), np.median(day_steps),
+                             step, tolerance, grid[0][run_days])
+        boundaries.append(boundary)
+    return boundaries
+
+def residual_changes(axis, x, residual, window=50, min_t=4.0):
+    """
+    Points where the mean residual differs between the `window` cases just
+    below and just above, with Welch t of at least min_t
+
+    Each change is a local maximum of |t| within a window either side.
+    """
+    order = np.argsort(x, kind='stable')
+    xs, rs = np.asarray(x, dtype=np.float64)[order], np.asarray(residual, dtype=np.float64)[order]
+    n = len(xs)
+    if n < 2 * window + 1:
+        return []
+    c1 = np.concatenate(([0.0], np.cumsum(rs)))
+    c2 = np.concatenate(([0.0], np.cumsum(rs * rs)))
+    split = np.arange(window, n - window + 1)
+    mean_low = (c1[split] - c1[split - window]) / window
+    mean_high = (c1[split + window] - c1[split]) / window
+    var_low = np.maximum((c2[split] - c2[split - window]) / window - mean_low ** 2, 0)
+    var_high = np.maximum((c2[split + window] - c2[split]) / window - mean_high ** 2, 0)
+    t = (mean_high - mean_low) / np.sqrt((var_low + var_high) / window + 1e-12)
+    # A split must fall between two different values
+    t[xs[split - 1] == xs[split]] = 0.0
+
+    strength = np.abs(t)
+    padded = np.concatenate((np.zeros(window), strength, np.zeros(window)))
+    local_max = np.lib.stride_tricks.sliding_window_view(padded, 2 * window + 1).max(axis=1)
+    changes = []
+    for i in np.flatnonzero((strength >= min_t) & (strength == local_max)):
+        at = split[i]
+        reach = (xs[min(at + window // 2, n - 1)] - xs[max(at - window // 2, 0)]) / 2
+        changes.append(ResidualChange(axis, (xs[at - 1] + xs[at]) / 2, mean_high[i] - mean_low[i],
+                                      float(t[i]), reach))
+    return changes
+
+def compare(boundaries, changes, steps):
+    """
+    Pair every residual change with the nearest engine boundary on its axis
+
+    Returns (change, boundary or None) pairs: a nearby boundary is
+    misplaced or mis-sized, no boundary means the engine is missing a piece.
+    """
+    pairs = []
+    for change in changes:
+        nearest = None
+        for boundary in boundaries.get(change.axis, []):
+            distance = max(0.0, boundary.low - change.location, change.location - boundary.high)
+            if distance <= max(change.reach, steps.get(change.axis, 0)) and (
+                    nearest is None or distance < nearest[0]):
+                nearest = (distance, boundary)
+        pairs.append((change, nearest[1] if nearest else None))
+    return pairs
+
+def _format_location(boundary):
+    if np.isclose(boundary.low, boundary.high):
+        return f"{boundary.low:g}"
+    return f"{boundary.low:g}..{boundary.high:g}"
+
+def print_boundaries(boundaries, limit):
+    for axis, found in boundaries.items():
+        print(f"  {axis} ({len(found)}):")
+        for boundary in found[:limit]:
+            changes = []
+            if boundary.slope_change:
+                changes.append(f"slope {boundary.slope_change:+.4g}/{UNITS[axis]}")
+            if boundary.jump:
+                changes.append(f"jump up to ${boundary.jump:.2f}")
+            where = f"{boundary.lines:.0%} of lines"
+            if boundary.days is not None and len(boundary.days) < 8:
+                where += f", days {', '.join(str(int(d)) for d in boundary.days)}"
+            print(f"    {_format_location(boundary):>18}  {', '.join(changes)}  ({where})")
+        if len(found) > limit:
+            print(f"    ... and {len(found) - limit} more")
+
+def main():
+    """Sweep the engine and report its pieces against the public residuals"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", default="1:14:1", help="days grid start:stop:step (default: 1:14:1)")
+    parser.add_argument("--miles", default="0:1500:1", help="miles grid (default: 0:1500:1)")
+    parser.add_argument("--receipts", default="0:2600:1", help="receipts grid (default: 0:2600:1)")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="rules",
+                        help="rules: the rule sum without the hash variance or cent rounding; "
+                             "full: calculate_reimbursement_batch(), variance and all (default: rules)")
+    parser.add_argument("--tolerance", type=float,
+                        help="smallest second difference counted as a break (default: 1e-6 for rules, "
+                             "0.025 for full)")
+    parser.add_argument("--cases", default=DEFAULT_CASES,
+                        help="public case file for the residuals (default: data/public_cases.json)")
+    parser.add_argument("--window", type=int, default=50,
+                        help="cases either side of a residual split (default: 50)")
+    parser.add_argument("--min-t", type=float, default=4.0,
+                        help="smallest |t| reported as a residual change (default: 4)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of worker processes (default: all cores)")
+    parser.add_argument("--chunk-points", type=int, default=CHUNK_POINTS,
+                        help=f"grid points per chunk (default: {CHUNK_POINTS})")
+    parser.add_argument("--limit", type=int, default=25, help="boundaries listed per axis (default: 25)")
+    args = parser.parse_args()
+
+    try:
+        grid = [parse_range(args.days), parse_range(args.miles), parse_range(args.receipts)]
+    except ValueError as e:
+        parser.error(str(e))
+    tolerance = args.tolerance if args.tolerance is not None else TOLERANCE[args.engine]
+
+    points = int(np.prod([len(values) for values in grid]))
+    started = time.time()
+    events = sweep(args.engine, grid, tolerance, args.workers, args.chunk_points)
+    elapsed = time.time() - started
+    boundaries = find_boundaries(grid, events, tolerance)
+    print(f"🧭 Engine pieces on a {' x '.join(str(len(v)) for v in grid)} grid "
+          f"({points / 1e6:.1f}M points in {elapsed:.1f}s, {points / max(elapsed, 1e-9) / 1e6:.1f}M/s):")
+    print_boundaries(boundaries, args.limit)
+    print()
+
+    days, miles, receipts, expected = case_cache.to_float64(case_cache.load_cases(args.cases))
+    if expected is None:
+        parser.error(f"{args.cases} has no expected outputs")
+    residual = expected - calculate_reimbursement.calculate_reimbursement_batch(days, miles, receipts)
+    inputs = {"days": days, "miles": miles, "miles_per_day": miles / days, "receipts": receipts}
+    changes = [change for axis, x in inputs.items()
+               for change in residual_changes(axis, x, residual, args.window, args.min_t)]
+    steps = {"days": grid[0][1] - grid[0][0] if len(grid[0]) > 1 else 1.0,
+             "miles": grid[1][1] - grid[1][0] if len(grid[1]) > 1 else 1.0,
+             "receipts": grid[2][1] - grid[2][0] if len(grid[2]) > 1 else 1.0}
+
+    print(f"📉 Public-case residual changes (window {args.window} cases, |t| >= {args.min_t:g}):")
+    mismatches = compare(boundaries, changes, steps)
+    for change, boundary in mismatches:
+        line = (f"  {change.axis} ~ {change.location:g}: mean residual moves {change.jump:+.2f} "
+                f"(t = {change.t:+.1f})  ")
+        if boundary is None:
+            line += f"❌ no engine boundary within ±{change.reach:.4g}, a piece is missing"
+        else:
+            line += f"⚠️  engine boundary at {_format_location(boundary)} is misplaced or mis-sized"
+        print(line)
+    if not mismatches:
+        print("  ✅ none; every engine boundary agrees with the data")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the reimbursement engines and evaluation harnesses
+Times every engine and harness, appends the results with environment
+metadata to a JSON Lines history and flags regressions against a baseline
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+import statistics
+from datetime import datetime, timezone
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "algorithms"))
+
+import calculate_reimbursement
+from calculate_reimbursement import calculate_reimbursement_batch, clear_cache
+import case_cache
+
+DEFAULT_HISTORY = os.path.join(REPO_ROOT, "outputs", "benchmark_history.jsonl")
+DEFAULT_BASELINE = os.path.join(REPO_ROOT, "outputs", "benchmark_baseline.json")
+DEFAULT_THRESHOLD = 10.0
+
+PUBLIC_CASES = os.path.join(REPO_ROOT, "data", "public_cases.json")
+PRIVATE_CASES = os.path.join(REPO_ROOT, "data", "private_cases.json")
+SAMPLE_TRIP = ("5", "250", "150.75")
+
+def _result(value, unit, better):
+    return {"value": value, "unit": unit, "better": better}
+
+def _timed_runs(func, repeat):
+    """Wall time in seconds of each of `repeat` calls to func"""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return times
+
+def _run_command(args, stdin=None):
+    """Run a command in the repo root, raising if it fails"""
+    completed = subprocess.run(args, cwd=REPO_ROOT, input=stdin, capture_output=True, text=True)
+    if completed.returncode != 0:
+        message = (completed.stderr or completed.stdout).strip().splitlines()
+        raise RuntimeError(message[-1] if message else f"exit status {completed.returncode}")
+    return completed.stdout
+
+def bench_scalar(repeat):
+    """Latency of calculate_reimbursement() per call, uncached and cached"""
+    days, miles, receipts, _ = case_cache.to_float64(case_cache.load_cases(PUBLIC_CASES))
+    trips = list(zip(days.tolist(), miles.tolist(), receipts.tolist()))
+
+    def run_all():
+        for trip in trips:
+            calculate_reimbursement.calculate_reimbursement(*trip)
+
+    def cold():
+        clear_cache()
+        run_all()
+
+    cold_times = _timed_runs(cold, repeat)
+    run_all()
+    warm_times = _timed_runs(run_all, repeat)
+    return {
+        "scalar_call_uncached": _result(min(cold_times) / len(trips) * 1e6, "us", "lower"),
+        "scalar_call_cached": _result(min(warm_times) / len(trips) * 1e6, "us", "lower"),
+    }
+
+def bench_cli_cold_start(repeat):
+    """Start-up plus one calculation for the Python CLI"""
+    script = os.path.join(REPO_ROOT, "algorithms", "calculate_reimbursement.py")
+    times = _timed_runs(lambda: _run_command([sys.executable, script, *SAMPLE_TRIP]), repeat)
+    return {"cli_cold_start": _result(statistics.median(times) * 1000, "ms", "lower")}
+
+def bench_run_sh(repeat):
+    """run.sh per single-trip call and per trip in --batch mode"""
+    run_sh = os.path.join(REPO_ROOT, "run.sh")
+    call_times = _timed_runs(lambda: _run_command([run_sh, *SAMPLE_TRIP]), repeat)
+
+    days, miles, receipts, _ = case_cache.to_float64(case_cache.load_cases(PUBLIC_CASES))
+    batch = "".join(f"{d},{m:g},{r:.2f}\n" for d, m, r in zip(days.tolist(), miles.tolist(), receipts.tolist()))
+    batch_times = _timed_runs(lambda: _run_command([run_sh, "--batch", "-"], stdin=batch), max(1, repeat // 5))
+    return {
+        "run_sh_call": _result(statistics.median(call_times) * 1000, "ms", "lower"),
+        "run_sh_batch_trip": _result(min(batch_times) / len(days) * 1000, "ms", "lower"),
+    }
+
+def bench_batch_throughput(repeat):
+    """calculate_reimbursement_batch() trips per second on both case files"""
+    results = {}
+    for name, path in (("public", PUBLIC_CASES), ("private", PRIVATE_CASES)):
+        days, miles, receipts, _ = case_cache.to_float64(case_cache.load_cases(path))
+        times = _timed_runs(lambda: calculate_reimbursement_batch(days, miles, receipts), repeat)
+        results[f"batch_{name}_throughput"] = _result(len(days) / min(times), "trips/s", "higher")
+    return results
+
+def bench_eval(repeat):
+    """End-to-end wall time of evaluate.py and eval.sh"""
+    evaluate = os.path.join(REPO_ROOT, "scripts", "evaluate.py")
+    results = {
+        "evaluate_py_wall": _result(
+            statistics.median(_timed_runs(lambda: _run_command([sys.executable, evaluate]), repeat)),
+            "s", "lower"),
+    }
+    # eval.sh runs run.sh once per case, so one run is plenty
+    eval_sh = os.path.join(REPO_ROOT, "eval.sh")
+    results["eval_sh_wall"] = _result(min(_timed_runs(lambda: _run_command([eval_sh]), 1)), "s", "lower")
+    return results
+
+# Benchmark groups in the order they run, selectable with --only
+BENCHMARKS = {
+    "scalar": bench_scalar,
+    "cli": bench_cli_cold_start,
+    "run_sh": bench_run_sh,
+    "batch": bench_batch_throughput,
+    "eval": bench_eval,
+}
+
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def environment():
+    """Metadata identifying the code and machine a run was measured on"""
+    try:
+        bash_version = subprocess.run(["bash", "-c", "echo $BASH_VERSION"],
+                                      capture_output=True, text=True).stdout.strip()
+    except OSError:
+        bash_version = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git("rev-parse", "HEAD"),
+        "git_dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "bash": bash_version,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+def run_benchmarks(names, repeat):
+    """Run the selected benchmark groups; a failing group is recorded, not fatal"""
+    results = {}
+    errors = {}
+    for name in names:
+        print(f"⏱️  {name}...", file=sys.stderr)
+        try:
+            results.update(BENCHMARKS[name](repeat))
+        except (OSError, RuntimeError) as e:
+            errors[name] = str(e)
+            print(f"❌ {name} failed: {e}", file=sys.stderr)
+    return {"environment": environment(), "repeat": repeat, "results": results, "errors": errors}
+
+def load_history(path=DEFAULT_HISTORY):
+    """Every stored run, oldest first"""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def append_history(run, path=DEFAULT_HISTORY):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as f:
+        f.write(json.dumps(run, sort_keys=True) + "\n")
+
+def compare_runs(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare two runs metric by metric
+
+    Returns a list of (name, baseline value, current value, percent change
+    for the worse, regressed) for every baseline metric. A metric missing
+    from the current run, e.g. because its group failed, counts as
+    regressed with a current value and change of None. Against a zero
+    baseline the change is None too, and any nonzero value is a regression.
+    """
+    rows = []
+    for name, result in baseline["results"].items():
+        before = result["value"]
+        if name not in current["results"]:
+            rows.append((name, before, None, None, True))
+            continue
+        result = current["results"][name]
+        after = result["value"]
+        if before == 0:
+            rows.append((name, before, after, None, after != 0))
+            continue
+        change = (after - before) / before * 100
+        worse = change if result["better"] == "lower" else -change
+        rows.append((name, before, after, worse, worse > threshold))
+    return rows
+
+def print_comparison(rows, baseline, current, threshold):
+    """Print the comparison; returns the number of failures (regressions, missing metrics, failed groups)"""
+    print(f"📊 Baseline {baseline['environment'].get('git_commit') or '?'} "
+          f"({baseline['environment']['timestamp']}) vs "
+          f"{current['environment'].get('git_commit') or '?'} ({current['environment']['timestamp']})")
+    for name, before, after, worse, regressed in rows:
+        if after is None:
+            print(f"  ❌ {name}: missing from this run")
+            continue
+        unit = current["results"][name]["unit"]
+        marker = "❌" if regressed else "✅"
+        change = f"{(after - before) / before * 100:+.1f}%" if before else "from zero"
+        print(f"  {marker} {name}: {before:.4g} -> {after:.4g} {unit} ({change})")
+    for name, error in current["errors"].items():
+        print(f"  ❌ {name}: failed ({error})")
+    regressions = sum(1 for row in rows if row[4] and row[2] is not None)
+    missing = sum(1 for row in rows if row[2] is None)
+    failures = regressions + missing + len(current["errors"])
+    if failures:
+        print(f"❌ {regressions} regression(s) over {threshold:g}%, {missing} missing metric(s), "
+              f"{len(current['errors'])} failed group(s)")
+    else:
+        print(f"✅ No regressions over {threshold:g}%")
+    return failures
+
+def print_run(run):
+    for name, result in run["results"].items():
+        print(f"  {name}: {result['value']:.4g} {result['unit']}")
+    for name, error in run["errors"].items():
+        print(f"  {name}: failed ({error})")
+
+def main():
+    """Run, record and compare benchmarks"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--history", default=DEFAULT_HISTORY,
+                        help="JSON Lines history file (default: outputs/benchmark_history.jsonl)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+                        help="baseline run file (default: outputs/benchmark_baseline.json)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run benchmarks and append them to the history")
+    run_parser.add_argument("--only", default=",".join(BENCHMARKS),
+                            help=f"comma-separated groups to run (default: {','.join(BENCHMARKS)})")
+    run_parser.add_argument("--repeat", type=int, default=5, help="repetitions per measurement (default: 5)")
+    run_parser.add_argument("--no-save", action="store_true", help="do not append to the history")
+    run_parser.add_argument("--compare", action="store_true", help="compare against the baseline afterwards")
+    run_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                            help=f"regression threshold in percent (default: {DEFAULT_THRESHOLD:g})")
+
+    compare_parser = commands.add_parser("compare", help="compare the latest stored run against the baseline")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                                help=f"regression threshold in percent (default: {DEFAULT_THRESHOLD:g})")
+
+    commands.add_parser("baseline", help="make the latest stored run the baseline")
+    commands.add_parser("history", help="list stored runs")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        names = [name.strip() for name in args.only.split(",") if name.strip()]
+        unknown = [name for name in names if name not in BENCHMARKS]
+        if unknown:
+            parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+        if args.repeat < 1:
+            parser.error("--repeat must be at least 1")
+        run = run_benchmarks(names, args.repeat)
+        print_run(run)
+        if not args.no_save:
+            append_history(run, args.history)
+        if args.compare:
+            if not os.path.exists(args.baseline):
+                print(f"❌ No baseline at {args.baseline}, run 'benchmark.py baseline' first")
+                sys.exit(1)
+            with open(args.baseline, 'r') as f:
+                baseline = json.load(f)
+            sys.exit(1 if print_comparison(compare_runs(baseline, run, args.threshold),
+                                           baseline, run, args.threshold) else 0)
+        sys.exit(1 if run["errors"] else 0)
+
+    history = load_history(args.history)
+    if args.command == "history":
+        for run in history:
+            env = run["environment"]
+            print(f"{env['timestamp']} {env.get('git_commit') or '?'}{' (dirty)' if env.get('git_dirty') else ''}")
+            print_run(run)
+        return
+
+    if not history:
+        print(f"❌ No stored runs in {args.history}, run 'benchmark.py run' first")
+        sys.exit(1)
+
+    if args.command == "baseline":
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(history[-1], f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"✅ Baseline set to the run from {history[-1]['environment']['timestamp']}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"❌ No baseline at {args.baseline}, run 'benchmark.py baseline' first")
+        sys.exit(1)
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+    rows = compare_runs(baseline, history[-1], args.threshold)
+    sys.exit(1 if print_comparison(rows, baseline, history[-1], args.threshold) else 0)
+
+if __name__ == "__main__":
+    main()
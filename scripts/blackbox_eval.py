@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Concurrent eval.sh for any run.sh-compatible command
+Runs the command once per public case on an asyncio subprocess pool with a
+per-case timeout, and prints the same report eval.sh does
+"""
+
+import os
+import re
+import sys
+import time
+import shlex
+import shutil
+import signal
+import asyncio
+import argparse
+
+import numpy as np
+
+from evaluate import DEFAULT_CASES, REPO_ROOT, load_cases, jq_format, compute_metrics, print_report
+
+DEFAULT_COMMAND = os.path.join(REPO_ROOT, "run.sh")
+
+# eval.sh's test for a valid output, after whitespace is stripped
+OUTPUT_PATTERN = re.compile(r"^-?[0-9]+\.?[0-9]*$")
+
+PROGRESS_EVERY = 100
+
+def _kill(process):
+    """Kill the command and anything it started"""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+async def run_case(command, args, timeout):
+    """
+    Run command once with the case arguments
+
+    stdout and stderr come from the same execution. Returns (output, None)
+    on success or (None, eval.sh-style error message).
+    """
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *command, *args, stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+            start_new_session=True)
+    except OSError as e:
+        return None, f"Script failed with error: {e}"
+
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+    except asyncio.TimeoutError:
+        _kill(process)
+        await process.wait()
+        return None, f"Script timed out after {timeout:g}s"
+    except asyncio.CancelledError:
+        _kill(process)
+        raise
+
+    if process.returncode != 0:
+        message = stderr.decode(errors='replace').replace("\n", "")
+        return None, f"Script failed with error: {message}"
+    output = "".join(stdout.decode(errors='replace').split())
+    if not OUTPUT_PATTERN.match(output):
+        return None, f"Invalid output format: {output}"
+    return float(output), None
+
+async def run_all(command, days, miles, receipts, concurrency, timeout, progress=True):
+    """
+    Run every case with at most `concurrency` commands in flight
+
+    Returns (outputs, succeeded mask, {case index: error message}).
+    """
+    count = len(days)
+    outputs = np.zeros(count)
+    succeeded = np.zeros(count, dtype=bool)
+    errors = {}
+    cases = iter(range(count))
+    done = 0
+
+    async def worker():
+        nonlocal done
+        for i in cases:
+            args = (jq_format(days[i]), jq_format(miles[i]), jq_format(receipts[i]))
+            output, error = await run_case(command, args, timeout)
+            if error is None:
+                outputs[i] = output
+                succeeded[i] = True
+            else:
+                errors[i] = error
+            done += 1
+            if progress and done % PROGRESS_EVERY == 0:
+                print(f"Progress: {done}/{count} cases processed...", file=sys.stderr)
+
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, count)))))
+    return outputs, succeeded, errors
+
+def main():
+    """Run the evaluation and print the eval.sh report"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("command", nargs="?", default=DEFAULT_COMMAND,
+                        help="command taking <days> <miles> <receipts>, split like a shell would "
+                             "(default: run.sh)")
+    parser.add_argument("--cases", default=DEFAULT_CASES,
+                        help="public case file to score against (default: data/public_cases.json)")
+    parser.add_argument("--concurrency", type=int, default=os.cpu_count() or 1,
+                        help="commands running at once (default: number of cores)")
+    parser.add_argument("--timeout", type=float, default=10.0,
+                        help="seconds before a case is killed and counted as an error (default: 10)")
+    parser.add_argument("--quiet", action="store_true", help="no progress lines on stderr")
+    args = parser.parse_args()
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+
+    print("🧾 Black Box Challenge - Reimbursement System Evaluation")
+    print("=======================================================")
+    print()
+
+    command = shlex.split(args.command)
+    if not command or shutil.which(command[0]) is None:
+        print(f"❌ Error: {args.command} not found!")
+        print("Please create a run.sh script that takes three parameters:")
+        print("  ./run.sh <trip_duration_days> <miles_traveled> <total_receipts_amount>")
+        print("  and outputs the reimbursement amount")
+        sys.exit(1)
+    if not os.path.isfile(args.cases):
+        print(f"❌ Error: {args.cases} not found!")
+        print("Please ensure the public cases file is in the current directory.")
+        sys.exit(1)
+
+    print("📊 Running evaluation against 1,000 test cases...")
+    print()
+    print("Extracting test data...")
+
+    days, miles, receipts, expected = load_cases(args.cases)
+    started = time.time()
+    actual, succeeded, errors = asyncio.run(
+        run_all(command, days, miles, receipts, args.concurrency, args.timeout, not args.quiet))
+    if not args.quiet:
+        print(f"⏱️  {len(days)} cases in {time.time() - started:.1f}s "
+              f"({args.concurrency} at a time)", file=sys.stderr)
+
+    metrics = compute_metrics(expected, actual, succeeded)
+    print_report(days, miles, receipts, expected, actual, metrics,
+                 [f"Case {i + 1}: {errors[i]}" for i in sorted(errors)])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Memory-mapped columnar cache for the public and private case files
+Converts a case JSON file once into a compact binary file and maps that
+file on later loads, rebuilding it whenever the source JSON changes
+"""
+
+import os
+import sys
+import json
+import hashlib
+import argparse
+from collections import namedtuple
+
+import numpy as np
+
+import case_reader
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_DIR = os.path.join(REPO_ROOT, "data", ".cache")
+
+MAGIC = b"RCASES01"
+ALIGNMENT = 64
+
+# Column name -> on-disk dtype; expected_cents only exists for public cases
+COLUMNS = (
+    ("days", np.dtype("<i2")),
+    ("miles", np.dtype("<f4")),
+    ("receipt_cents", np.dtype("<i4")),
+    ("expected_cents", np.dtype("<i4")),
+)
+
+# expected_cents is None for private cases
+CaseColumns = namedtuple("CaseColumns", ["days", "miles", "receipt_cents", "expected_cents"])
+
+def cache_path(source, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Location of the cache file for a case JSON file
+
+    Named after the file and a hash of its absolute path, so same-named
+    case files in different directories never share a cache; the size and
+    mtime the cache was built from are checked by load_cases().
+    """
+    source = os.path.realpath(source)
+    name = os.path.splitext(os.path.basename(source))[0]
+    digest = hashlib.sha256(source.encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{name}-{digest}.cases")
+
+def _file_sha256(path):
+    """SHA-256 of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+def _read_header(path):
+    """Header dict of a cache file, or None if it is missing or not a cache file"""
+    try:
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            length = int.from_bytes(f.read(4), "little")
+            return json.loads(f.read(length))
+    except (OSError, ValueError):
+        return None
+
+def _columns_from_json(source):
+    """Stream a public or private case file into on-disk column arrays"""
+    parts = {name: [] for name, _ in COLUMNS}
+    for chunk in case_reader.iter_case_chunks(source):
+        chunk_columns = {
+            "days": chunk.days,
+            "miles": chunk.miles,
+            "receipt_cents": np.rint(chunk.receipts * 100),
+        }
+        if chunk.expected is not None:
+            chunk_columns["expected_cents"] = np.rint(chunk.expected * 100)
+
+        for name, dtype in COLUMNS:
+            if name not in chunk_columns:
+                continue
+            values = chunk_columns[name]
+            if dtype.kind == "i":
+                info = np.iinfo(dtype)
+                if values.min() < info.min or values.max() > info.max:
+                    raise ValueError(f"{source}: {name} does not fit in {dtype.name}")
+            parts[name].append(values.astype(dtype))
+
+    columns = {name: np.concatenate(parts[name]) for name, _ in COLUMNS if parts[name]}
+    if not columns:
+        columns = {name: np.empty(0, dtype) for name, dtype in COLUMNS[:3]}
+    return columns
+
+def write_columns(path, count, names, chunks, header=None):
+    """
+    Write count cases to a case file at path (atomically), chunk by chunk
+
+    chunks yields {name: array} for the given column names; together they
+    must hold exactly count cases, so nothing beyond one chunk is held in
+    memory. header holds extra JSON fields to record.
+
+    Layout: magic, a little-endian uint32 header length, a JSON header
+    describing the data and each column's offset, then the columns, each
+    starting on a 64-byte boundary.
+    """
+    dtypes = dict(COLUMNS)
+    header = dict(header or {}, count=count, columns=[])
+    # Offsets depend on the header length, so lay out the columns after a
+    # header padded to a generous fixed size
+    header_space = _align(len(MAGIC) + 4 + 1024)
+    offset = header_space
+    for name in names:
+        header["columns"].append([name, dtypes[name].str, offset])
+        offset = _align(offset + count * dtypes[name].itemsize)
+    encoded = json.dumps(header).encode()
+    if len(MAGIC) + 4 + len(encoded) > header_space:
+        raise ValueError("cache header too large")
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC + len(encoded).to_bytes(4, "little") + encoded)
+            written = 0
+            for chunk in chunks:
+                size = len(chunk[names[0]])
+                if written + size > count:
+                    raise ValueError(f"more than {count} cases")
+                for name, dtype, column_offset in header["columns"]:
+                    f.seek(column_offset + written * dtypes[name].itemsize)
+                    f.write(np.asarray(chunk[name]).astype(dtype).tobytes())
+                written += size
+            if written != count:
+                raise ValueError(f"expected {count} cases, got {written}")
+            f.truncate(offset)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return header
+
+def build_cache(source, path, stat=None, sha256=None):
+    """
+    Convert source to a cache file at path (written atomically)
+
+    The source is streamed, so building needs memory for the columns only.
+    """
+    stat = stat or os.stat(source)
+    sha256 = sha256 or _file_sha256(source)
+    columns = _columns_from_json(source)
+    names = [name for name, _ in COLUMNS if name in columns]
+    return write_columns(path, len(columns["days"]), names, [columns], {
+        "source_mtime_ns": stat.st_mtime_ns,
+        "source_size": stat.st_size,
+        "source_sha256": sha256,
+    })
+
+def _refresh_mtime(path, header, stat):
+    """Record a new source mtime in place when only the timestamp changed"""
+    header["source_mtime_ns"] = stat.st_mtime_ns
+    encoded = json.dumps(header).encode()
+    # The header only outgrows its space if the timestamp gained digits
+    if len(MAGIC) + 4 + len(encoded) > header["columns"][0][2]:
+        return False
+    with open(path, 'r+b') as f:
+        f.seek(len(MAGIC))
+        f.write(len(encoded).to_bytes(4, "little") + encoded)
+    return True
+
+def load_cases(source, cache_dir=DEFAULT_CACHE_DIR, rebuild=False):
+    """
+    Load a case file as memory-mapped columns, building the cache if needed
+
+    The cache is trusted while the source's mtime and size are unchanged.
+    When they differ the source is hashed: a matching hash only updates the
+    recorded mtime, anything else rebuilds the cache.
+    """
+    path = cache_path(source, cache_dir)
+    stat = os.stat(source)
+    header = None if rebuild else _read_header(path)
+
+    if header is not None and (header["source_mtime_ns"] != stat.st_mtime_ns
+                               or header["source_size"] != stat.st_size):
+        sha256 = _file_sha256(source)
+        if sha256 != header["source_sha256"] or not _refresh_mtime(path, header, stat):
+            header = build_cache(source, path, stat, sha256)
+    elif header is None:
+        header = build_cache(source, path, stat)
+
+    return _map_columns(path, header)
+
+def _map_columns(path, header):
+    count = header["count"]
+    columns = {}
+    for name, dtype, offset in header["columns"]:
+        columns[name] = np.memmap(path, dtype=np.dtype(dtype), mode='r', offset=offset, shape=(count,))
+    return CaseColumns(columns["days"], columns["miles"], columns["receipt_cents"],
+                       columns.get("expected_cents"))
+
+def open_columns(path):
+    """
+    Map a case file written by write_columns() directly, with no source
+    JSON behind it
+    """
+    header = _read_header(path)
+    if header is None:
+        raise ValueError(f"{path}: not a case file")
+    return _map_columns(path, header)
+
+def to_float64(cases):
+    """
+    Inputs (and expected output, or None) as the int64/float64 arrays the
+    engines take
+
+    Miles are stored as float32; rounding back to hundredths recovers the
+    exact two-decimal JSON value for anything below 100,000 miles.
+    """
+    days = cases.days.astype(np.int64)
+    miles = np.round(cases.miles.astype(np.float64), 2)
+    receipts = cases.receipt_cents / 100
+    expected = None if cases.expected_cents is None else cases.expected_cents / 100
+    return days, miles, receipts, expected
+
+def main():
+    """Build or refresh case caches and print a summary of each"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("sources", nargs="*",
+                        default=[os.path.join(REPO_ROOT, "data", "public_cases.json"),
+                                 os.path.join(REPO_ROOT, "data", "private_cases.json")],
+                        help="case JSON files (default: data/public_cases.json data/private_cases.json)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help="directory holding the cache files (default: data/.cache)")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild even if the cache is current")
+    args = parser.parse_args()
+
+    for source in args.sources:
+        try:
+            cases = load_cases(source, args.cache_dir, args.rebuild)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"❌ {source}: {e}", file=sys.stderr)
+            sys.exit(1)
+        kind = "public" if cases.expected_cents is not None else "private"
+        path = cache_path(source, args.cache_dir)
+        print(f"✅ {source}: {len(cases.days)} {kind} cases -> {path} ({os.path.getsize(path)} bytes)")
+
+if __name__ == "__main__":
+    main()
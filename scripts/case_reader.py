@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Incremental reader for case files of any size
+Walks the top-level JSON array one case at a time and yields fixed-size
+chunks of cases as arrays, so memory use does not grow with the file
+"""
+
+import sys
+import json
+import argparse
+from collections import namedtuple
+
+import numpy as np
+
+CHUNK_SIZE = 65536
+BLOCK_SIZE = 1 << 20
+
+# A single case longer than this many characters is treated as malformed input
+MAX_CASE_SIZE = 16 << 20
+
+# expected is None for private cases, which have no expected output
+CaseChunk = namedtuple("CaseChunk", ["days", "miles", "receipts", "expected"])
+
+_WHITESPACE = " \t\n\r"
+
+def iter_cases(path, block_size=BLOCK_SIZE):
+    """
+    Yield the objects of a top-level JSON array one at a time
+
+    The file is read in blocks; each element is decoded as soon as it is
+    complete and the consumed text is dropped from the buffer.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r') as f:
+        buffer = ""
+        pos = 0
+
+        def fill():
+            """Read another block, dropping consumed text; False at end of file"""
+            nonlocal buffer, pos
+            block = f.read(block_size)
+            buffer = buffer[pos:] + block
+            pos = 0
+            return bool(block)
+
+        def skip_whitespace():
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                    pos += 1
+                if pos < len(buffer) or not fill():
+                    return
+
+        skip_whitespace()
+        if buffer[pos:pos + 1] != "[":
+            raise ValueError(f"{path}: expected a JSON array")
+        pos += 1
+
+        first = True
+        while True:
+            skip_whitespace()
+            if buffer[pos:pos + 1] == "]":
+                return
+            if not first:
+                if buffer[pos:pos + 1] != ",":
+                    raise ValueError(f"{path}: expected ',' or ']' between cases")
+                pos += 1
+                skip_whitespace()
+            if buffer[pos:pos + 1] != "{":
+                raise ValueError(f"{path}: expected a case object")
+
+            # A failed decode near the end of the buffer just means the
+            # object continues in the next block
+            while True:
+                try:
+                    case, end = decoder.raw_decode(buffer, pos)
+                    break
+                except json.JSONDecodeError:
+                    if len(buffer) - pos > MAX_CASE_SIZE or not fill():
+                        raise
+            pos = end
+            first = False
+            yield case
+
+def _to_chunk(days, miles, receipts, expected):
+    return CaseChunk(
+        np.array(days, dtype=np.int64),
+        np.array(miles, dtype=np.float64),
+        np.array(receipts, dtype=np.float64),
+        None if expected is None else np.array(expected, dtype=np.float64),
+    )
+
+def iter_case_chunks(path, chunk_size=CHUNK_SIZE, block_size=BLOCK_SIZE):
+    """
+    Yield CaseChunk arrays of at most chunk_size cases
+
+    Handles the public schema ({"input": {...}, "expected_output": ...}) and
+    the flat private schema; a file must not mix the two.
+    """
+    days, miles, receipts, expected = [], [], [], None
+    public = None
+    for index, case in enumerate(iter_cases(path, block_size)):
+        if public is None:
+            public = "input" in case
+            expected = [] if public else None
+        elif public != ("input" in case):
+            raise ValueError(f"{path}: case {index} does not match the file's schema")
+
+        trip = case["input"] if public else case
+        days.append(trip["trip_duration_days"])
+        miles.append(trip["miles_traveled"])
+        receipts.append(trip["total_receipts_amount"])
+        if public:
+            expected.append(case["expected_output"])
+
+        if len(days) >= chunk_size:
+            yield _to_chunk(days, miles, receipts, expected)
+            days, miles, receipts = [], [], []
+            expected = [] if public else None
+    if days:
+        yield _to_chunk(days, miles, receipts, expected)
+
+def main():
+    """Stream a case file and report how many cases and chunks it holds"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path", help="public or private case JSON file")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help=f"cases per chunk (default: {CHUNK_SIZE})")
+    args = parser.parse_args()
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+
+    count = 0
+    chunks = 0
+    try:
+        for chunk in iter_case_chunks(args.path, args.chunk_size):
+            count += len(chunk.days)
+            chunks += 1
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ {args.path}: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"✅ {args.path}: {count} cases in {chunks} chunks")
+
+if __name__ == "__main__":
+    main()
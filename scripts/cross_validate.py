@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Cross-validation and bootstrap scoring of the rule table
+Resamples the public cases across a process pool and reports confidence
+intervals for the exact-match rate, average error and eval.sh score, as an
+estimate of how the rules will do on cases they were not tuned on
+"""
+
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "algorithms"))
+
+from reimbursement_rules import RULES_FILE, RULE_NAMES
+from optimize_rules import DEFAULT_CASES, build_model, coordinate_descent
+
+# Resamples handed to a worker per task, so results come back in few messages
+BOOTSTRAP_BATCH = 64
+
+# Model arrays placed in shared memory; every worker maps the same copy
+SHARED_ARRAYS = ("design", "offset", "expected_cents", "params")
+
+# Per-worker state, set up once by _init_worker()
+_model = None
+_shared = []
+
+def share_model(model):
+    """
+    Copy the model's arrays into shared memory
+
+    Returns (blocks, spec); the caller keeps the blocks alive and unlinks
+    them when done, and workers attach through the picklable spec.
+    """
+    blocks = []
+    spec = {"labels": model["labels"], "arrays": {}}
+    for key in SHARED_ARRAYS:
+        array = np.ascontiguousarray(model[key])
+        block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+        np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+        blocks.append(block)
+        spec["arrays"][key] = (block.name, array.shape, array.dtype.str)
+    return blocks, spec
+
+def _init_worker(spec):
+    global _model
+    _model = {"labels": spec["labels"]}
+    for key, (name, shape, dtype) in spec["arrays"].items():
+        block = shared_memory.SharedMemory(name=name)
+        _shared.append(block)
+        _model[key] = np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+
+def _subset(model, index):
+    return dict(model, design=model["design"][index], offset=model["offset"][index],
+                expected_cents=model["expected_cents"][index])
+
+def split_metrics(model, index, params):
+    """
+    (exact matches, total error in cents, cases) of params on the cases at index
+    """
+    totals = model["design"][index] @ params + model["offset"][index]
+    cents = np.rint(np.maximum(totals, 50.0) * 100).astype(np.int64)
+    error_cents = np.abs(cents - model["expected_cents"][index])
+    return int(np.count_nonzero(error_cents < 1)), int(error_cents.sum()), len(index)
+
+def _evaluate_split(train, test, fit):
+    """Score the table, refitted on train first if fit, on test"""
+    params = _model["params"]
+    if fit:
+        params = coordinate_descent(_subset(_model, train), np.array(params))[0]
+    return split_metrics(_model, test, params)
+
+def _kfold_task(args):
+    """Worker entry point: one fold of one shuffled k-fold repetition"""
+    seed, folds, fold, fit = args
+    order = np.random.default_rng(seed).permutation(len(_model["offset"]))
+    parts = np.array_split(order, folds)
+    train = np.concatenate(parts[:fold] + parts[fold + 1:])
+    return [_evaluate_split(train, parts[fold], fit)]
+
+def _bootstrap_task(args):
+    """
+    Worker entry point: a batch of bootstrap resamples
+
+    Without fit each resample is scored as a whole; with fit the table is
+    refitted on the resample and scored on the cases it left out.
+    """
+    seed, count, fit = args
+    rng = np.random.default_rng(seed)
+    size = len(_model["offset"])
+    results = []
+    for _ in range(count):
+        sample = rng.integers(0, size, size)
+        if not fit:
+            results.append(split_metrics(_model, sample, _model["params"]))
+            continue
+        out_of_bag = np.flatnonzero(np.bincount(sample, minlength=size) == 0)
+        results.append(_evaluate_split(sample, out_of_bag, True))
+    return results
+
+def to_scores(results, score_cases):
+    """
+    Exact-match rate, average error in dollars and eval.sh score per split
+
+    Scores are projected to score_cases cases so splits of different sizes
+    and the full public or private set are directly comparable.
+    """
+    exact, error_cents, cases = np.array(results, dtype=np.int64).reshape(-1, 3).T
+    exact_rate = exact / cases
+    avg_error_cents = error_cents // cases
+    misses = np.rint((1 - exact_rate) * score_cases)
+    return {
+        "exact_rate": exact_rate,
+        "avg_error": avg_error_cents / 100,
+        "score": (avg_error_cents * 100 + misses * 10) / 100,
+    }
+
+def run_resampling(model, folds=5, repeats=1, bootstraps=1000, fit=False, seed=1, workers=None):
+    """
+    Run repeats x folds k-fold splits and `bootstraps` bootstrap resamples
+    on a process pool sharing one copy of the model
+
+    Returns {"kfold": [...], "bootstrap": [...]} of split_metrics() tuples.
+    """
+    kfold_jobs = [(seed + repeat, folds, fold, fit)
+                  for repeat in range(repeats) for fold in range(folds)] if folds > 1 else []
+    bootstrap_jobs = [(seed + repeats + i, min(BOOTSTRAP_BATCH, bootstraps - start), fit)
+                      for i, start in enumerate(range(0, bootstraps, BOOTSTRAP_BATCH))]
+
+    blocks, spec = share_model(model)
+    try:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                                 initializer=_init_worker, initargs=(spec,)) as pool:
+            kfold = pool.map(_kfold_task, kfold_jobs)
+            bootstrap = pool.map(_bootstrap_task, bootstrap_jobs)
+            return {
+                "kfold": [result for batch in kfold for result in batch],
+                "bootstrap": [result for batch in bootstrap for result in batch],
+            }
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+def print_summary(title, scores, confidence):
+    if not len(scores["score"]):
+        return
+    tail = (1 - confidence) / 2 * 100
+    print(f"📈 {title} ({len(scores['score'])} splits, {confidence:.0%} interval):")
+    for key, label, fmt in (("exact_rate", "Exact matches", "{:.1%}"),
+                            ("avg_error", "Average error", "${:.2f}"),
+                            ("score", "Score", "{:.2f}")):
+        values = scores[key]
+        low, high = np.percentile(values, [tail, 100 - tail])
+        print(f"  {label:<14} {fmt.format(np.mean(values)):>10}   "
+              f"[{fmt.format(low)} .. {fmt.format(high)}]")
+    print()
+
+def main():
+    """Resample the public cases and print confidence intervals"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cases", default=DEFAULT_CASES,
+                        help="public case file to resample (default: data/public_cases.json)")
+    parser.add_argument("--rules-file", default=RULES_FILE,
+                        help="rule table to score (default: algorithms/reimbursement_rules.txt)")
+    parser.add_argument("--folds", type=int, default=5, help="k-fold folds, 0 to skip (default: 5)")
+    parser.add_argument("--repeats", type=int, default=1,
+                        help="k-fold repetitions with different shuffles (default: 1)")
+    parser.add_argument("--bootstraps", type=int, default=1000,
+                        help="bootstrap resamples, 0 to skip (default: 1000)")
+    parser.add_argument("--fit", action="store_true",
+                        help="refit the table on each training split before scoring the held-out cases")
+    parser.add_argument("--score-cases", type=int, default=None,
+                        help="project scores to this many cases, e.g. 5000 for the private set "
+                             "(default: the number of cases resampled)")
+    parser.add_argument("--confidence", type=float, default=0.95, help="interval coverage (default: 0.95)")
+    parser.add_argument("--seed", type=int, default=1, help="seed of the first resample (default: 1)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    model = build_model(args.cases, args.rules_file, RULE_NAMES)
+    cases = len(model["offset"])
+    score_cases = args.score_cases or cases
+    full = to_scores([split_metrics(model, np.arange(cases), model["params"])], score_cases)
+    print(f"🎯 Full-set score: {full['score'][0]:.2f} over {cases} cases "
+          f"(projected to {score_cases} cases)\n")
+
+    started = time.time()
+    results = run_resampling(model, args.folds, args.repeats, args.bootstraps, args.fit,
+                             args.seed, args.workers)
+    elapsed = time.time() - started
+
+    held_out = " held-out" if args.fit else ""
+    print_summary(f"{args.folds}-fold cross-validation{held_out}",
+                  to_scores(results["kfold"], score_cases), args.confidence)
+    print_summary(f"Bootstrap{' out-of-bag' if args.fit else ''}",
+                  to_scores(results["bootstrap"], score_cases), args.confidence)
+    splits = len(results["kfold"]) + len(results["bootstrap"])
+    print(f"⏱️  {splits} splits in {elapsed:.1f}s", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+In-process replacement for eval.sh
+Loads the public cases once, scores them with calculate_reimbursement_batch()
+and prints the same report eval.sh does
+"""
+
+import os
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "algorithms"))
+
+from calculate_reimbursement import calculate_reimbursement_batch
+import case_cache
+
+DEFAULT_CASES = os.path.join(REPO_ROOT, "data", "public_cases.json")
+
+# Most decimals compared; eval.sh subtracts with bc at scale=10
+MAX_DECIMALS = 10
+
+def load_cases(path=DEFAULT_CASES):
+    """Load a public case file into input and expected-output arrays"""
+    cases = case_cache.load_cases(path)
+    if cases.expected_cents is None:
+        raise ValueError(f"{path} has no expected outputs")
+    return case_cache.to_float64(cases)
+
+def _score_chunk(chunk):
+    """Worker entry point: run the batch engine over one slice of the cases"""
+    return calculate_reimbursement_batch(*chunk)
+
+def run_engine(days, miles, receipts, workers=1):
+    """Score every case, optionally split across a process pool"""
+    if workers <= 1 or len(days) < workers:
+        return calculate_reimbursement_batch(days, miles, receipts)
+
+    bounds = np.linspace(0, len(days), workers + 1).astype(int)
+    chunks = [(days[lo:hi], miles[lo:hi], receipts[lo:hi])
+              for lo, hi in zip(bounds[:-1], bounds[1:])]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return np.concatenate(list(pool.map(_score_chunk, chunks)))
+
+def to_units(values, scale):
+    """Convert dollar amounts with at most scale decimals to integer 10**-scale units"""
+    return np.rint(np.asarray(values, dtype=np.float64) * 10 ** scale).astype(np.int64)
+
+def to_cents(values):
+    """Convert dollar amounts with at most two decimals to integer cents"""
+    return to_units(values, 2)
+
+def decimal_places(values):
+    """
+    Fewest decimals, at least two, that write every amount exactly as
+    printed (capped at MAX_DECIMALS, and where units stop fitting a double)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    largest = float(np.abs(values).max()) if len(values) else 0.0
+    for scale in range(2, MAX_DECIMALS):
+        if largest * 10 ** (scale + 1) >= 2 ** 53:
+            return scale
+        if np.array_equal(to_units(values, scale) / 10 ** scale, values):
+            return scale
+    return MAX_DECIMALS
+
+def bc_format(units, scale):
+    """
+    Format an integer count of 10**-scale units the way bc prints it
+    (no leading zero before the point, a bare 0 for zero)
+    """
+    units = int(units)
+    if units == 0:
+        return "0"
+    sign = "-" if units < 0 else ""
+    whole, frac = divmod(abs(units), 10 ** scale)
+    return f"{sign}{whole if whole else ''}.{frac:0{scale}d}"
+
+def jq_format(value):
+    """Format a JSON number the way jq -r prints it"""
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+def compute_metrics(expected, actual, succeeded=None):
+    """
+    Compute every eval.sh metric in one vectorized pass
+
+    Amounts are compared as integers at the precision they were printed
+    with, like eval.sh's bc, so the exact (<$0.01) and close (<$1.00) checks
+    and bc's truncating scale=2 averages come out identical: 100.006 is an
+    exact match for 100.00 even though it rounds to 100.01. error_cents
+    holds each case's exact error in cents (fractional only when an amount
+    has more than two decimals).
+    succeeded masks the cases that produced an output; the others count
+    towards the score as misses and get an error of -1.
+    """
+    scale = max(decimal_places(expected), decimal_places(actual))
+    unit = 10 ** (scale - 2)
+    error_units = np.abs(to_units(actual, scale) - to_units(expected, scale))
+    if succeeded is not None:
+        error_units = np.where(succeeded, error_units, -1)
+
+    num_cases = len(error_units)
+    ok = error_units >= 0
+    successful_runs = int(np.count_nonzero(ok))
+    exact_matches = int(np.count_nonzero(ok & (error_units < unit)))
+    close_matches = int(np.count_nonzero(ok & (error_units < 100 * unit)))
+    total_error_units = int(error_units[ok].sum())
+
+    metrics = {
+        'num_cases': num_cases,
+        'successful_runs': successful_runs,
+        'exact_matches': exact_matches,
+        'close_matches': close_matches,
+        'error_cents': error_units if unit == 1 else np.where(ok, error_units / unit, -1.0),
+        'max_error': "0",
+    }
+    if successful_runs:
+        # bc prints the largest error with the decimals of that case's amounts
+        worst = int(np.argmax(error_units))
+        case_scale = max(decimal_places(np.asarray(expected)[worst:worst + 1]),
+                         decimal_places(np.asarray(actual)[worst:worst + 1]))
+        metrics['max_error'] = bc_format(error_units[worst] // 10 ** (scale - case_scale), case_scale)
+        # bc truncates to the requested scale rather than rounding
+        avg_error_cents = total_error_units // (successful_runs * unit)
+        metrics['avg_error_cents'] = avg_error_cents
+        metrics['exact_pct_tenths'] = exact_matches * 1000 // successful_runs
+        metrics['close_pct_tenths'] = close_matches * 1000 // successful_runs
+        metrics['score_cents'] = avg_error_cents * 100 + (num_cases - exact_matches) * 10
+    return metrics
+
+def worst_cases(error_cents, count=5):
+    """
+    Indices of the highest-error cases in eval.sh order
+
+    eval.sh sorts with `sort -t: -k4 -nr`, which breaks ties on the error by
+    comparing whole result lines in reverse; the line starts with the 1-based
+    case number, so ties go to the case number that sorts last as text.
+    """
+    if len(error_cents) == 0:
+        return []
+    count = min(count, len(error_cents))
+    cutoff = np.partition(error_cents, len(error_cents) - count)[len(error_cents) - count]
+    candidates = np.flatnonzero(error_cents >= cutoff)
+    ranked = sorted(candidates.tolist(),
+                    key=lambda i: (float(error_cents[i]), str(i + 1).encode()),
+                    reverse=True)
+    return ranked[:count]
+
+def print_report(days, miles, receipts, expected, actual, metrics, errors=()):
+    """Print the eval.sh results summary, then up to ten of the case errors"""
+    num_cases = metrics['num_cases']
+    successful_runs = metrics['successful_runs']
+    exact_matches = metrics['exact_matches']
+
+    if successful_runs == 0:
+        print("❌ No successful test cases!")
+        print("")
+        print("Your script either:")
+        print("  - Failed to run properly")
+        print("  - Produced invalid output format")
+        print("  - Timed out on all cases")
+        print("")
+        print("Check the errors below for details.")
+    else:
+        avg_error = bc_format(metrics['avg_error_cents'], 2)
+        exact_pct = bc_format(metrics['exact_pct_tenths'], 1)
+        close_pct = bc_format(metrics['close_pct_tenths'], 1)
+        max_error = metrics['max_error']
+
+        print("✅ Evaluation Complete!")
+        print("")
+        print("📈 Results Summary:")
+        print(f"  Total test cases: {num_cases}")
+        print(f"  Successful runs: {successful_runs}")
+        print(f"  Exact matches (±$0.01): {exact_matches} ({exact_pct}%)")
+        print(f"  Close matches (±$1.00): {metrics['close_matches']} ({close_pct}%)")
+        print(f"  Average error: ${avg_error}")
+        print(f"  Maximum error: ${max_error}")
+        print("")
+
+        score = bc_format(metrics['score_cents'], 2)
+        print(f"🎯 Your Score: {score} (lower is better)")
+        print("")
+
+        if exact_matches == num_cases:
+            print("🏆 PERFECT SCORE! You have reverse-engineered the system completely!")
+        elif exact_matches > 950:
+            print("🥇 Excellent! You are very close to the perfect solution.")
+        elif exact_matches > 800:
+            print("🥈 Great work! You have captured most of the system behavior.")
+        elif exact_matches > 500:
+            print("🥉 Good progress! You understand some key patterns.")
+        else:
+            print("📚 Keep analyzing the patterns in the interviews and test cases.")
+
+        print("")
+        print("💡 Tips for improvement:")
+        if exact_matches < num_cases:
+            print("  Check these high-error cases:")
+            error_cents = metrics['error_cents']
+            for i in worst_cases(error_cents):
+                if error_cents[i] < 0:
+                    continue
+                print(f"    Case {i + 1}: {jq_format(days[i])} days, {jq_format(miles[i])} miles, "
+                      f"${jq_format(receipts[i])} receipts")
+                print(f"      Expected: ${expected[i]:.2f}, Got: ${actual[i]:.2f}, "
+                      f"Error: ${error_cents[i] / 100:.2f}")
+
+    if errors:
+        print()
+        print("⚠️  Errors encountered:")
+        for error in errors[:10]:
+            print(f"  {error}")
+        if len(errors) > 10:
+            print(f"  ... and {len(errors) - 10} more errors")
+
+    print()
+    print("📝 Next steps:")
+    print("  1. Fix any script errors shown above")
+    print("  2. Ensure your run.sh outputs only a number")
+    print("  3. Analyze the patterns in the interviews and public cases")
+    print("  4. Test edge cases around trip length and receipt amounts")
+    print("  5. Submit your solution via the Google Form when ready!")
+
+def main():
+    """Run the evaluation and print the eval.sh report"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cases", default=DEFAULT_CASES,
+                        help="public case file to score against (default: data/public_cases.json)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes (default: 1, score in-process)")
+    args = parser.parse_args()
+
+    print("🧾 Black Box Challenge - Reimbursement System Evaluation")
+    print("=======================================================")
+    print()
+
+    if not os.path.isfile(args.cases):
+        print(f"❌ Error: {args.cases} not found!")
+        print("Please ensure the public cases file is in the current directory.")
+        sys.exit(1)
+
+    print("📊 Running evaluation against 1,000 test cases...")
+    print()
+    print("Extracting test data...")
+
+    days, miles, receipts, expected = load_cases(args.cases)
+    actual = run_engine(days, miles, receipts, args.workers)
+    metrics = compute_metrics(expected, actual)
+    print_report(days, miles, receipts, expected, actual, metrics)
+
+if __name__ == "__main__":
+    main()
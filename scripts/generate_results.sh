@@ -2,8 +2,11 @@
 
 # Black Box Challenge - Results Generation Script
 # This script runs your implementation against test cases and outputs results to private_results.txt
+# Environment: JOBS (parallel shards, default: all cores), SHARD_SIZE (cases per shard, default: 250),
+#              WORK_DIR (shard checkpoints for resuming, default: .generate_results)
 
 set -e
+set -o pipefail
 
 echo "🧾 Black Box Challenge - Generating Private Results"
 echo "===================================================="
@@ -42,48 +45,126 @@ echo "📊 Processing test cases and generating results..."
 echo "📝 Output will be saved to private_results.txt"
 echo
 
-# Extract all test data upfront in a single jq call for better performance
-echo "Extracting test data..."
-test_data=$(jq -r '.[] | "\(.trip_duration_days):\(.miles_traveled):\(.total_receipts_amount)"' private_cases.json)
+# Cases are split into shards that are processed in parallel. Every finished
+# shard is checkpointed under $WORK_DIR, so an interrupted run picks up where
+# it left off; the final file is only replaced once all shards are done.
+SHARD_SIZE=${SHARD_SIZE:-250}
+WORK_DIR=${WORK_DIR:-.generate_results}
+if [ -z "$JOBS" ]; then
+    JOBS=$(nproc 2>/dev/null || sysctl -n hw.ncpu 2>/dev/null || echo 4)
+fi
 
-# Convert to arrays for faster access (compatible with bash 3.2+)
-test_cases=()
-while IFS= read -r line; do
-    test_cases+=("$line")
-done <<< "$test_data"
-total_cases=${#test_cases[@]}
+# Number of cases the results file must end up with
+expected_cases=$(jq length private_cases.json) || {
+    status=$?
+    echo "❌ Error: private_cases.json is not valid JSON" >&2
+    exit $status
+}
 
-# Remove existing results file if it exists
-rm -f private_results.txt
+# Checkpoints are only valid for the same cases, engine, rule table and shard size
+rules_file=${REIMBURSEMENT_RULES:-algorithms/reimbursement_rules.txt}
+fingerprint="$(cksum < private_cases.json) $(cksum < run.sh) $(cksum < "$rules_file" 2>/dev/null) $SHARD_SIZE"
+if [ -f "$WORK_DIR/fingerprint" ] && [ "$(cat "$WORK_DIR/fingerprint")" = "$fingerprint" ]; then
+    done_shards=$(find "$WORK_DIR" -name 'shard_*.out' | wc -l | tr -d ' ')
+    echo "Resuming: $done_shards shard(s) already complete in $WORK_DIR" >&2
+else
+    rm -rf "$WORK_DIR"
+    mkdir -p "$WORK_DIR"
 
-echo "Processing $total_cases test cases..." >&2
+    # Extract all test data upfront in a single jq call, then split it into shards
+    echo "Extracting test data..."
+    jq -r '.[] | "\(.trip_duration_days):\(.miles_traveled):\(.total_receipts_amount)"' private_cases.json |
+    awk -v size="$SHARD_SIZE" -v dir="$WORK_DIR" '
+    (NR - 1) % size == 0 {
+        if (shard) close(shard)
+        shard = sprintf("%s/shard_%06d.in", dir, (NR - 1) / size)
+    }
+    { print > shard }' || {
+        status=$?
+        echo "❌ Error: Could not extract the test cases from private_cases.json" >&2
+        rm -rf "$WORK_DIR"
+        exit $status
+    }
 
-# Process each test case
-for ((i=0; i<total_cases; i++)); do
-    if [ $((i % 100)) -eq 0 ] && [ $i -gt 0 ]; then
-        echo "Progress: $i/$total_cases cases processed..." >&2
-    fi
-    
-    # Extract test case data from pre-loaded array
-    IFS=':' read -r trip_duration miles_traveled receipts_amount <<< "${test_cases[i]}"
-    
-    # Run the user's implementation
-    if script_output=$(./run.sh "$trip_duration" "$miles_traveled" "$receipts_amount" 2>/dev/null); then
-        # Check if output is a valid number
-        output=$(echo "$script_output" | tr -d '[:space:]')
-        if [[ $output =~ ^-?[0-9]+\.?[0-9]*$ ]]; then
-            echo "$output" >> private_results.txt
+    echo "$fingerprint" > "$WORK_DIR/fingerprint"
+fi
+
+shopt -s nullglob
+total_cases=$(cat /dev/null "$WORK_DIR"/shard_*.in | wc -l | tr -d ' ')
+total_shards=$(find "$WORK_DIR" -name 'shard_*.in' | wc -l | tr -d ' ')
+if [ "$expected_cases" -eq 0 ]; then
+    echo "❌ Error: private_cases.json has no test cases" >&2
+    rm -rf "$WORK_DIR"
+    exit 1
+fi
+if [ "$total_cases" -ne "$expected_cases" ]; then
+    echo "❌ Error: Extracted $total_cases test cases but private_cases.json has $expected_cases" >&2
+    rm -rf "$WORK_DIR"
+    exit 1
+fi
+
+# Run every case of one shard, then publish its results with an atomic rename
+process_shard() {
+    local shard_in=$1
+    local shard_out="${shard_in%.in}.out"
+    local shard_num=${shard_in##*shard_}
+    shard_num=$((10#${shard_num%.in}))
+    local case_num=$((shard_num * SHARD_SIZE))
+    local tmp_out="$shard_out.tmp.$$"
+    local err_file="$shard_out.err.$$"
+    local trip_duration miles_traveled receipts_amount script_output output
+
+    : > "$tmp_out"
+    while IFS=':' read -r trip_duration miles_traveled receipts_amount; do
+        case_num=$((case_num + 1))
+
+        # Run the user's implementation, capturing stderr in the same execution
+        if script_output=$(./run.sh "$trip_duration" "$miles_traveled" "$receipts_amount" 2>"$err_file"); then
+            # Check if output is a valid number
+            output=$(echo "$script_output" | tr -d '[:space:]')
+            if [[ $output =~ ^-?[0-9]+\.?[0-9]*$ ]]; then
+                echo "$output" >> "$tmp_out"
+            else
+                echo "Error on case $case_num: Invalid output format: $output" >&2
+                echo "ERROR" >> "$tmp_out"
+            fi
         else
-            echo "Error on case $((i+1)): Invalid output format: $output" >&2
-            echo "ERROR" >> private_results.txt
+            echo "Error on case $case_num: Script failed: $(tr -d '\n' < "$err_file")" >&2
+            echo "ERROR" >> "$tmp_out"
         fi
-    else
-        # Capture stderr for error reporting
-        error_msg=$(./run.sh "$trip_duration" "$miles_traveled" "$receipts_amount" 2>&1 >/dev/null | tr -d '\n')
-        echo "Error on case $((i+1)): Script failed: $error_msg" >&2
-        echo "ERROR" >> private_results.txt
+    done < "$shard_in"
+
+    rm -f "$err_file"
+    mv -f "$tmp_out" "$shard_out"
+    echo "Progress: shard $((shard_num + 1))/$TOTAL_SHARDS complete" >&2
+}
+export -f process_shard
+export SHARD_SIZE TOTAL_SHARDS=$total_shards
+
+echo "Processing $total_cases test cases in $total_shards shards on $JOBS parallel jobs..." >&2
+
+# Only shards without a checkpoint still need work
+for shard_in in "$WORK_DIR"/shard_*.in; do
+    [ -f "${shard_in%.in}.out" ] || echo "$shard_in"
+done | xargs -n 1 -P "$JOBS" bash -c '[ -z "$1" ] || process_shard "$1"' _ || true
+
+# Merge the shards in case order and replace the results file in one step
+for shard_in in "$WORK_DIR"/shard_*.in; do
+    if [ ! -f "${shard_in%.in}.out" ]; then
+        echo "❌ Error: ${shard_in%.in}.out is missing; rerun to resume" >&2
+        exit 1
     fi
 done
+cat /dev/null "$WORK_DIR"/shard_*.out > "private_results.txt.tmp.$$"
+result_lines=$(wc -l < "private_results.txt.tmp.$$" | tr -d ' ')
+if [ "$result_lines" -ne "$expected_cases" ]; then
+    echo "❌ Error: Shards hold $result_lines results for $expected_cases test cases; private_results.txt was not replaced" >&2
+    rm -f "private_results.txt.tmp.$$"
+    rm -rf "$WORK_DIR"
+    exit 1
+fi
+mv -f "private_results.txt.tmp.$$" private_results.txt
+rm -rf "$WORK_DIR"
 
 echo
 echo "✅ Results generated successfully!" >&2
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Synthetic workload generator
+Fits the joint distribution of days, miles and receipts in the public cases
+and streams any number of synthetic trips, chunk by chunk, as JSON Lines or
+as a columnar case file; the same seed always gives the same trips
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+import case_cache
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CASES = os.path.join(REPO_ROOT, "data", "public_cases.json")
+
+# Trips drawn per generator block; every block has its own seeded stream,
+# so output does not depend on how it is chunked
+BLOCK_SIZE = 65536
+
+def fit_workload(cases_path=DEFAULT_CASES):
+    """
+    Fit a smoothed-bootstrap model of the case inputs
+
+    A synthetic trip copies the days of a random public case and jitters its
+    miles and receipts with a Gaussian kernel. Kernel widths follow Scott's
+    rule within each trip length, so clusters such as long trips with large
+    receipts keep their shape instead of being averaged away.
+    """
+    days, miles, receipts, _ = case_cache.to_float64(case_cache.load_cases(cases_path))
+    if not len(days):
+        raise ValueError(f"{cases_path} has no cases")
+    points = np.column_stack([miles, receipts])
+
+    bandwidth = np.zeros((len(days), 2))
+    overall = points.std(axis=0) * len(days) ** (-1 / 6)
+    for value in np.unique(days):
+        group = days == value
+        count = int(np.count_nonzero(group))
+        # Groups too small for a spread of their own borrow the overall one
+        width = points[group].std(axis=0) * count ** (-1 / 6) if count > 2 else overall
+        bandwidth[group] = np.where(width > 0, width, overall)
+
+    return {
+        "days": days,
+        "points": points,
+        "bandwidth": bandwidth,
+        "low": points.min(axis=0),
+        "high": points.max(axis=0),
+        "integer_miles": float(np.mean(miles == np.round(miles))),
+    }
+
+def _reflect(values, low, high):
+    """Fold values back into [low, high] instead of piling them on the edges"""
+    span = high - low
+    if span <= 0:
+        return np.full_like(values, low)
+    folded = np.mod(values - low, 2 * span)
+    return low + np.where(folded > span, 2 * span - folded, folded)
+
+def generate_block(model, seed, block, size):
+    """Trips of one generator block as (days, miles, receipts) arrays"""
+    rng = np.random.default_rng([seed, block])
+    source = rng.integers(0, len(model["days"]), size)
+    jitter = rng.standard_normal((size, 2)) * model["bandwidth"][source]
+    points = model["points"][source] + jitter
+
+    miles = _reflect(points[:, 0], model["low"][0], model["high"][0])
+    receipts = _reflect(points[:, 1], model["low"][1], model["high"][1])
+    # Keep the public cases' mix of whole-mile and two-decimal distances
+    whole = rng.random(size) < model["integer_miles"]
+    miles = np.where(whole, np.round(miles), np.round(miles, 2))
+    return model["days"][source], miles, np.round(receipts, 2)
+
+def iter_workload(model, count, seed=1, chunk_size=BLOCK_SIZE):
+    """
+    Yield (days, miles, receipts) chunks of at most chunk_size trips, count
+    trips in total
+
+    Blocks are always generated whole and cut to size, so a shorter run is
+    a prefix of a longer one with the same seed.
+    """
+    buffered = None
+    for block, start in enumerate(range(0, count, BLOCK_SIZE)):
+        columns = generate_block(model, seed, block, BLOCK_SIZE)
+        columns = tuple(column[:count - start] for column in columns)
+        if buffered is not None:
+            columns = tuple(np.concatenate(pair) for pair in zip(buffered, columns))
+        while len(columns[0]) >= chunk_size:
+            yield tuple(column[:chunk_size] for column in columns)
+            columns = tuple(column[chunk_size:] for column in columns)
+        buffered = columns
+    if buffered is not None and len(buffered[0]):
+        yield buffered
+
+def _format_number(value):
+    return str(int(value)) if value.is_integer() else repr(value)
+
+def write_jsonl(chunks, f):
+    """Write trips as flat private-case JSON objects, one per line"""
+    for days, miles, receipts in chunks:
+        f.write("".join(
+            f'{{"trip_duration_days": {d}, "miles_traveled": {_format_number(m)}, '
+            f'"total_receipts_amount": {_format_number(r)}}}\n'
+            for d, m, r in zip(days.tolist(), miles.tolist(), receipts.tolist())))
+
+def write_columnar(chunks, path, count, header):
+    """Write trips as a case_cache columnar file, readable with case_cache.open_columns()"""
+    columns = ({"days": days, "miles": miles, "receipt_cents": np.rint(receipts * 100)}
+               for days, miles, receipts in chunks)
+    return case_cache.write_columns(path, count, ["days", "miles", "receipt_cents"], columns, header)
+
+def main():
+    """Generate a synthetic workload"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("count", type=int, help="number of trips to generate")
+    parser.add_argument("--seed", type=int, default=1, help="random seed (default: 1)")
+    parser.add_argument("--format", choices=("jsonl", "columnar"), default="jsonl",
+                        help="JSON Lines or a columnar case file (default: jsonl)")
+    parser.add_argument("--output", "-o", default="-",
+                        help="output path, - for stdout with jsonl (default: -)")
+    parser.add_argument("--chunk-size", type=int, default=BLOCK_SIZE,
+                        help=f"trips generated and written at a time (default: {BLOCK_SIZE})")
+    parser.add_argument("--cases", default=DEFAULT_CASES,
+                        help="public case file to fit (default: data/public_cases.json)")
+    args = parser.parse_args()
+    if args.count < 0:
+        parser.error("count must not be negative")
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+    if args.format == "columnar" and args.output == "-":
+        parser.error("columnar output needs --output")
+
+    started = time.time()
+    model = fit_workload(args.cases)
+    chunks = iter_workload(model, args.count, args.seed, args.chunk_size)
+    if args.format == "columnar":
+        write_columnar(chunks, args.output, args.count,
+                       {"synthetic": {"seed": args.seed, "fitted_to": os.path.basename(args.cases)}})
+    elif args.output == "-":
+        write_jsonl(chunks, sys.stdout)
+    else:
+        with open(args.output, 'w') as f:
+            write_jsonl(chunks, f)
+
+    if args.output != "-":
+        elapsed = time.time() - started
+        print(f"✅ {args.count} trips -> {args.output} ({os.path.getsize(args.output)} bytes, "
+              f"{args.count / max(elapsed, 1e-9):.0f} trips/s)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Vectorized optimizer for the reimbursement rule table
+Searches the base and rate of every rule band for the lowest eval.sh score,
+scoring whole batches of candidate tables against all public cases at once
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "algorithms"))
+
+from calculate_reimbursement import batch_rule_inputs
+from reimbursement_rules import RULES_FILE, RULE_NAMES, load_rule_table, load_rules
+import case_cache
+
+DEFAULT_CASES = os.path.join(REPO_ROOT, "data", "public_cases.json")
+
+# Coordinate steps per field: each pass tries value + step * STEP_MULTIPLES,
+# and a pass that finds nothing better moves on to the next, finer step
+STEPS = {
+    "base": (10.0, 1.0, 0.1, 0.01),
+    "rate": (0.1, 0.01, 0.001, 0.0001),
+}
+STEP_MULTIPLES = np.arange(-5, 6, dtype=np.float64)
+
+# Decimals kept when a parameter is written back to the table
+DECIMALS = {"base": 2, "rate": 4}
+
+# Per-worker state, set up once by _init_worker()
+_model = None
+
+def build_model(cases_path=DEFAULT_CASES, rules_path=RULES_FILE, rule_names=RULE_NAMES):
+    """
+    Express the reimbursement of every case as a linear function of the
+    table's parameters
+
+    Band membership depends only on the (fixed) bounds, so each case's total
+    before flooring and rounding is design @ params + variance. Returns a
+    dict with the design matrix, the variance and expected cents per case,
+    the starting parameter vector and (rule, band, field) per parameter.
+    """
+    cases = case_cache.load_cases(cases_path)
+    if cases.expected_cents is None:
+        raise ValueError(f"{cases_path} has no expected outputs")
+    days, miles, receipts, _ = case_cache.to_float64(cases)
+    inputs, variance = batch_rule_inputs(days, miles, receipts)
+
+    table = load_rule_table(rules_path)
+    rules = load_rules(rules_path)
+
+    columns = []
+    fixed = np.zeros(len(days))
+    params = []
+    labels = []
+    for name in RULE_NAMES:
+        rule = rules[name]
+        x = inputs[name]
+        band_of_case = np.searchsorted(rule.breakpoint_array, x, side='left')
+        for band in range(len(table[name])):
+            in_band = (band_of_case == band).astype(np.float64)
+            offset = in_band * (x - rule.origins[band])
+            if name not in rule_names:
+                # Frozen rules still contribute, just not as parameters
+                fixed += rule.bases[band] * in_band + rule.rates[band] * offset
+                continue
+            columns += [in_band, offset]
+            params += [rule.bases[band], rule.rates[band]]
+            labels += [(name, band, "base"), (name, band, "rate")]
+
+    return {
+        "design": np.column_stack(columns) if columns else np.zeros((len(days), 0)),
+        "offset": variance + fixed,
+        "expected_cents": cases.expected_cents.astype(np.int64),
+        "params": np.array(params, dtype=np.float64),
+        "labels": labels,
+    }
+
+def score_candidates(model, candidates):
+    """
+    eval.sh score, in cents, of each row of a (candidates x params) matrix
+
+    Mirrors evaluate.compute_metrics(): average error truncated to cents
+    plus $0.10 for every case that is not an exact match.
+    """
+    totals = model["design"] @ candidates.T + model["offset"][:, None]
+    cents = np.rint(np.maximum(totals, 50.0) * 100).astype(np.int64)
+    error_cents = np.abs(cents - model["expected_cents"][:, None])
+
+    num_cases = len(error_cents)
+    exact_matches = np.count_nonzero(error_cents < 1, axis=0)
+    avg_error_cents = error_cents.sum(axis=0) // num_cases
+    return avg_error_cents * 100 + (num_cases - exact_matches) * 10
+
+def coordinate_descent(model, start, max_passes=200):
+    """
+    Best-improvement coordinate descent from start
+
+    Every pass scores all single-parameter moves at the current step size in
+    one batch and takes the best one; steps shrink when no move helps.
+    Returns (params, score_cents, candidates_scored).
+    """
+    labels = model["labels"]
+    params = start.copy()
+    best = int(score_candidates(model, params[None, :])[0])
+    scored = 1
+    decimals = np.array([DECIMALS[field] for _, _, field in labels])
+
+    for level in range(len(STEPS["base"])):
+        steps = np.array([STEPS[field][level] for _, _, field in labels])
+        for _ in range(max_passes):
+            # One candidate per (parameter, multiple), each moving one parameter
+            moves = steps[:, None] * STEP_MULTIPLES[None, :]
+            candidates = np.repeat(params[None, :], moves.size, axis=0)
+            rows = np.arange(moves.size)
+            candidates[rows, rows // len(STEP_MULTIPLES)] += moves.ravel()
+            candidates = np.round(candidates, decimals.max())
+
+            scores = score_candidates(model, candidates)
+            scored += len(candidates)
+            winner = int(np.argmin(scores))
+            if scores[winner] >= best:
+                break
+            best = int(scores[winner])
+            params = candidates[winner]
+
+    # Parameters never move by less than their written precision, so this
+    # only trims floating-point noise
+    for i, places in enumerate(decimals):
+        params[i] = round(params[i], int(places))
+    return params, best, scored
+
+def _init_worker(cases_path, rules_path, rule_names):
+    global _model
+    _model = build_model(cases_path, rules_path, rule_names)
+
+def _restart(args):
+    """Worker entry point: one descent from a perturbed starting point"""
+    seed, spread = args
+    start = _model["params"].copy()
+    if seed:
+        rng = np.random.default_rng(seed)
+        coarse = np.array([STEPS[field][0] for _, _, field in _model["labels"]])
+        start += rng.normal(0, spread, len(start)) * coarse
+    return coordinate_descent(_model, start)
+
+def optimize(cases_path=DEFAULT_CASES, rules_path=RULES_FILE, rule_names=RULE_NAMES,
+             restarts=0, workers=1, seed=1, spread=1.0):
+    """
+    Run one descent from the current table plus `restarts` descents from
+    random perturbations of it, across a process pool
+
+    Returns (labels, best params, best score in cents, candidates scored).
+    """
+    jobs = [(0, spread)] + [(seed + i, spread) for i in range(restarts)]
+    if workers <= 1:
+        _init_worker(cases_path, rules_path, rule_names)
+        results = [_restart(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(cases_path, rules_path, rule_names)) as pool:
+            results = list(pool.map(_restart, jobs))
+        _init_worker(cases_path, rules_path, rule_names)
+
+    params, best, _ = min(results, key=lambda result: result[1])
+    return _model["labels"], params, best, sum(result[2] for result in results)
+
+def _format_number(value, places):
+    text = f"{value:.{places}f}".rstrip("0").rstrip(".")
+    return "0" if text in ("", "-0") else text
+
+def format_rule_table(rules_path, labels, params):
+    """
+    Text of the rule table at rules_path with the given parameters
+    substituted, keeping comments and layout
+    """
+    values = {label: value for label, value in zip(labels, params)}
+    bands = {}
+    lines = []
+    with open(rules_path, 'r') as f:
+        for line in f:
+            content = line.split("#", 1)[0]
+            fields = content.split()
+            if len(fields) != 6:
+                lines.append(line)
+                continue
+            name = fields[0]
+            band = bands.get(name, 0)
+            bands[name] = band + 1
+            for column, field in ((3, "base"), (4, "rate")):
+                if (name, band, field) in values:
+                    fields[column] = _format_number(values[(name, band, field)], DECIMALS[field])
+
+            # Keep every column where it started, as long as the values fit
+            tokens = list(re.finditer(r"\S+", content))
+            rebuilt = ""
+            for i, token in enumerate(tokens):
+                if len(rebuilt) < token.start():
+                    rebuilt = rebuilt.ljust(token.start())
+                elif i:
+                    rebuilt += " "
+                rebuilt += fields[i]
+            lines.append(rebuilt + line[tokens[-1].end():])
+    return "".join(lines)
+
+def main():
+    """Optimize the rule table and print or write the best one"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cases", default=DEFAULT_CASES,
+                        help="public case file to score against (default: data/public_cases.json)")
+    parser.add_argument("--rules-file", default=RULES_FILE,
+                        help="starting rule table (default: algorithms/reimbursement_rules.txt)")
+    parser.add_argument("--rules", default=",".join(RULE_NAMES),
+                        help="comma-separated rules to tune; the others stay fixed (default: all)")
+    parser.add_argument("--restarts", type=int, default=0,
+                        help="extra descents from random perturbations of the table (default: 0)")
+    parser.add_argument("--spread", type=float, default=1.0,
+                        help="size of the random perturbations, in coarsest steps (default: 1.0)")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the first restart (default: 1)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes (default: 1, search in-process)")
+    parser.add_argument("--output", help="write the best table here instead of stdout")
+    args = parser.parse_args()
+
+    rule_names = [name.strip() for name in args.rules.split(",") if name.strip()]
+    unknown = sorted(set(rule_names) - set(RULE_NAMES))
+    if unknown:
+        parser.error(f"unknown rules: {', '.join(unknown)}")
+
+    model = build_model(args.cases, args.rules_file, rule_names)
+    start_score = int(score_candidates(model, model["params"][None, :])[0])
+    print(f"🎯 Starting score: {start_score / 100:.2f} ({len(model['labels'])} parameters)", file=sys.stderr)
+
+    started = time.time()
+    labels, params, best, scored = optimize(args.cases, args.rules_file, rule_names,
+                                            args.restarts, args.workers, args.seed, args.spread)
+    elapsed = time.time() - started
+    print(f"🏁 Best score: {best / 100:.2f} after {scored} candidates "
+          f"({scored / elapsed:.0f}/s)", file=sys.stderr)
+
+    table = format_rule_table(args.rules_file, labels, params)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(table)
+        print(f"📝 Wrote {args.output}", file=sys.stderr)
+    else:
+        sys.stdout.write(table)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Append-only store of per-case results across evaluation runs
+Every run's outputs are appended as one fixed-width int64 column of
+thousandths of a dollar, tagged with the git commit and engine, so any two
+runs can be diffed case by case
+"""
+
+import os
+import sys
+import json
+import shlex
+import asyncio
+import hashlib
+import argparse
+import subprocess
+from datetime import datetime, timezone
+
+import numpy as np
+
+import case_cache
+from evaluate import DEFAULT_CASES, REPO_ROOT, run_engine, to_units, compute_metrics, bc_format
+from blackbox_eval import run_all
+
+DEFAULT_STORE = os.path.join(REPO_ROOT, "outputs", "results")
+INDEX_FILE = "index.jsonl"
+DATA_FILE = "outputs.bin"
+
+# Column dtype and decimals, recorded with every run, and the value stored
+# for a case the engine failed on. Thousandths keep the sub-cent outputs
+# eval.sh scores at their printed precision
+DTYPE = np.dtype("<i8")
+SCALE = 3
+MISSING = np.iinfo(DTYPE).min
+
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _case_file_name(path):
+    """Repo-relative path for case files in the repo, absolute otherwise"""
+    path = os.path.abspath(path)
+    relative = os.path.relpath(path, REPO_ROOT)
+    return path if relative.startswith(os.pardir) else relative
+
+def _dollars(column):
+    """A stored column as dollars, with failed cases zeroed"""
+    column = np.asarray(column, dtype=np.int64)
+    return np.where(column != MISSING, column, 0) / 10 ** SCALE
+
+def load_index(store=DEFAULT_STORE):
+    """Every recorded run, oldest first"""
+    path = os.path.join(store, INDEX_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def append_run(store, cases_path, engine, outputs, succeeded=None, expected=None):
+    """
+    Append one run's outputs (dollars) and return its index entry
+
+    The column goes to the data file before the index line is written, so
+    an interrupted append leaves at most some unreferenced bytes behind.
+    """
+    units = to_units(outputs, SCALE)
+    if succeeded is not None:
+        units = np.where(succeeded, units, MISSING)
+    column = units.astype(DTYPE)
+
+    os.makedirs(store, exist_ok=True)
+    with open(os.path.join(store, DATA_FILE), 'ab') as f:
+        offset = f.seek(0, os.SEEK_END)
+        f.write(column.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+
+    entry = {
+        "run": len(load_index(store)) + 1,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git("rev-parse", "HEAD"),
+        "git_dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "engine": engine,
+        "cases": _case_file_name(cases_path),
+        "cases_sha256": _file_sha256(cases_path),
+        "count": len(column),
+        "offset": offset,
+        "dtype": DTYPE.str,
+        "scale": SCALE,
+        "failed": int(np.count_nonzero(column == MISSING)),
+    }
+    if expected is not None:
+        metrics = compute_metrics(expected, _dollars(column), column != MISSING)
+        entry["score_cents"] = metrics.get("score_cents")
+        entry["exact_matches"] = metrics["exact_matches"]
+    with open(os.path.join(store, INDEX_FILE), 'a') as f:
+        f.write(json.dumps(entry, sort_keys=True) + "\n")
+    return entry
+
+def read_run(store, entry):
+    """A run's outputs in thousandths, MISSING where the engine failed (memory-mapped)"""
+    if entry.get("dtype") != DTYPE.str or entry.get("scale") != SCALE:
+        raise ValueError(f"run {entry['run']} was recorded in an older format; record it again")
+    return np.memmap(os.path.join(store, DATA_FILE), dtype=DTYPE, mode='r',
+                     offset=entry["offset"], shape=(entry["count"],))
+
+def find_run(index, ref):
+    """Look up a run by number, or by negative position (-1 is the latest)"""
+    number = int(ref)
+    if number < 0:
+        if -number > len(index):
+            raise ValueError(f"only {len(index)} runs recorded")
+        return index[number]
+    for entry in index:
+        if entry["run"] == number:
+            return entry
+    raise ValueError(f"no run {ref}")
+
+def _exact(error_cents):
+    return (error_cents >= 0) & (error_cents < 1)
+
+def diff_runs(before, after, expected=None):
+    """
+    Per-case comparison of two runs' stored columns
+
+    Returns a dict with the changed case indices and their change in cents
+    and, when expected outputs are known, each case's error in cents before
+    and after (as compute_metrics() measures it), the cases fixed or broken
+    (exact matches gained or lost) and both runs' scores.
+    """
+    before = np.asarray(before, dtype=np.int64)
+    after = np.asarray(after, dtype=np.int64)
+    changed = np.flatnonzero(before != after)
+    ran = (before[changed] != MISSING) & (after[changed] != MISSING)
+    result = {
+        "before": before,
+        "after": after,
+        "changed": changed,
+        "change_cents": np.where(ran, (after[changed] - before[changed]) / 10 ** (SCALE - 2), 0),
+        "now_failing": changed[after[changed] == MISSING],
+        "now_running": changed[before[changed] == MISSING],
+    }
+    if expected is not None:
+        for name, column in (("before", before), ("after", after)):
+            metrics = compute_metrics(expected, _dollars(column), column != MISSING)
+            result[f"error_{name}"] = metrics["error_cents"]
+            result[f"score_{name}"] = metrics.get("score_cents")
+        exact_before, exact_after = _exact(result["error_before"]), _exact(result["error_after"])
+        result["fixed"] = np.flatnonzero(exact_after & ~exact_before)
+        result["broke"] = np.flatnonzero(exact_before & ~exact_after)
+    return result
+
+def _describe(entry):
+    commit = (entry.get("git_commit") or "unknown")[:10] + ("-dirty" if entry.get("git_dirty") else "")
+    return f"run {entry['run']} ({entry['engine']} @ {commit}, {entry['timestamp']})"
+
+def _amount(units):
+    if units == MISSING:
+        return "ERROR"
+    # Two decimals unless the engine printed a sub-cent amount
+    return f"${units / 10 ** SCALE:.{SCALE if units % 10 else 2}f}"
+
+def _signed(cents):
+    return ("-" if cents < 0 else "+") + bc_format(abs(cents), 2)
+
+def print_diff(first, second, diff, cases=None, limit=10):
+    """Print what changed between two runs, biggest error changes first"""
+    print(f"🔀 {_describe(first)} → {_describe(second)}")
+    print(f"   {first['cases']}, {first['count']} cases")
+    changed = diff["changed"]
+    change = np.abs(diff["change_cents"])
+    line = f"  Changed: {len(changed)} cases"
+    if len(changed):
+        line += f", mean |change| ${change.mean() / 100:.2f}, max ${change.max() / 100:.2f}"
+    print(line)
+    if len(diff["now_failing"]) or len(diff["now_running"]):
+        print(f"  Now failing: {len(diff['now_failing'])}, now running: {len(diff['now_running'])}")
+
+    scored = "error_before" in diff
+    if scored:
+        print(f"  Exact matches fixed: {len(diff['fixed'])}, broken: {len(diff['broke'])}")
+        before, after = diff["score_before"], diff["score_after"]
+        if before is not None and after is not None:
+            print(f"  🎯 Score: {bc_format(before, 2)} → {bc_format(after, 2)} ({_signed(after - before)})")
+
+    if not len(changed) or limit <= 0:
+        return
+    if scored:
+        # Order by how much the error moved, so what a rule change fixed or broke leads
+        moved = diff["error_after"][changed] - diff["error_before"][changed]
+        order = np.argsort(-np.abs(moved), kind='stable')
+    else:
+        order = np.argsort(-change, kind='stable')
+    print()
+    print("  Largest changes:")
+    for i in changed[order[:limit]]:
+        line = f"    Case {i + 1}: "
+        if cases is not None:
+            days, miles, receipts = (column[i] for column in cases[:3])
+            line += f"{int(days)} days, {miles:g} miles, ${receipts:.2f} receipts  "
+        line += f"{_amount(diff['before'][i])} → {_amount(diff['after'][i])}"
+        if scored and diff["error_before"][i] >= 0 and diff["error_after"][i] >= 0:
+            error_before, error_after = diff["error_before"][i], diff["error_after"][i]
+            line += (f"  error ${error_before / 100:.2f} → ${error_after / 100:.2f} "
+                     f"{'✅' if error_after < error_before else '❌'}")
+        print(line)
+
+def print_runs(index):
+    """One line per recorded run"""
+    if not index:
+        print("No runs recorded yet")
+        return
+    for entry in index:
+        line = f"  {entry['run']:>4}  {entry['timestamp']}  {(entry.get('git_commit') or 'unknown')[:10]}"
+        line += f"{'-dirty' if entry.get('git_dirty') else '':<6}  {entry['engine']:<20}  {entry['cases']} ({entry['count']})"
+        if entry.get("score_cents") is not None:
+            line += f"  score {bc_format(entry['score_cents'], 2)}, {entry['exact_matches']} exact"
+        if entry.get("failed"):
+            line += f"  ⚠️  {entry['failed']} failed"
+        print(line)
+
+def read_results_file(path, count):
+    """Outputs and succeeded mask from a generate_results.sh file (a number or ERROR per line)"""
+    with open(path, 'r') as f:
+        lines = [line.strip() for line in f if line.strip()]
+    if len(lines) != count:
+        raise ValueError(f"{path} has {len(lines)} results for {count} cases")
+    succeeded = np.array([line != "ERROR" for line in lines], dtype=bool)
+    outputs = np.array([float(line) if ok else 0.0 for line, ok in zip(lines, succeeded)])
+    return outputs, succeeded
+
+def main():
+    """Record runs into the store, list them, or diff two of them"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--store", default=DEFAULT_STORE,
+                        help="store directory (default: outputs/results)")
+    actions = parser.add_subparsers(dest="action", required=True)
+
+    record_parser = actions.add_parser("record", help="score a case file and append the outputs")
+    record_parser.add_argument("--cases", default=DEFAULT_CASES,
+                               help="public or private case file (default: data/public_cases.json)")
+    source = record_parser.add_mutually_exclusive_group()
+    source.add_argument("--command",
+                        help="run.sh-compatible command to run per case instead of the Python engine")
+    source.add_argument("--results-file",
+                        help="import a generate_results.sh output file instead of running anything")
+    record_parser.add_argument("--engine",
+                               help="name to tag the run with (default: python, the command, "
+                                    "or the results file name)")
+    record_parser.add_argument("--workers", type=int, default=1,
+                               help="worker processes for the Python engine (default: 1)")
+    record_parser.add_argument("--concurrency", type=int, default=os.cpu_count() or 1,
+                               help="commands running at once with --command (default: number of cores)")
+    record_parser.add_argument("--timeout", type=float, default=10.0,
+                               help="per-case timeout in seconds with --command (default: 10)")
+
+    actions.add_parser("list", help="list recorded runs")
+
+    diff_parser = actions.add_parser("diff", help="compare two runs case by case")
+    diff_parser.add_argument("before", nargs="?", default="-2",
+                             help="run number, or -N for the Nth latest (default: -2)")
+    diff_parser.add_argument("after", nargs="?", default="-1",
+                             help="run number, or -N for the Nth latest (default: -1)")
+    diff_parser.add_argument("--limit", type=int, default=10,
+                             help="changed cases to list (default: 10)")
+    args = parser.parse_args()
+
+    if args.action == "record":
+        cases = case_cache.load_cases(args.cases)
+        days, miles, receipts, expected = case_cache.to_float64(cases)
+        succeeded = None
+        if args.results_file:
+            try:
+                outputs, succeeded = read_results_file(args.results_file, len(days))
+            except ValueError as e:
+                print(f"❌ {e}")
+                sys.exit(1)
+            engine = args.engine or os.path.basename(args.results_file)
+        elif args.command:
+            outputs, succeeded, _ = asyncio.run(run_all(
+                shlex.split(args.command), days, miles, receipts, args.concurrency, args.timeout))
+            engine = args.engine or args.command
+        else:
+            outputs = run_engine(days, miles, receipts, args.workers)
+            engine = args.engine or "python"
+        entry = append_run(args.store, args.cases, engine, outputs, succeeded, expected)
+        print(f"✅ Recorded run {entry['run']}: {entry['count']} cases from {engine}"
+              + (f", score {bc_format(entry['score_cents'], 2)}" if entry.get("score_cents") is not None else ""))
+
+    elif args.action == "list":
+        print_runs(load_index(args.store))
+
+    else:
+        index = load_index(args.store)
+        try:
+            first, second = find_run(index, args.before), find_run(index, args.after)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        if first["cases_sha256"] != second["cases_sha256"]:
+            print(f"❌ Runs {first['run']} and {second['run']} scored different case files")
+            sys.exit(1)
+
+        # Inputs and expected outputs only if the case file is still the one scored
+        cases_path = os.path.join(REPO_ROOT, first["cases"])
+        cases = expected = None
+        if os.path.exists(cases_path) and _file_sha256(cases_path) == first["cases_sha256"]:
+            cases = case_cache.to_float64(case_cache.load_cases(cases_path))
+            expected = cases[3]
+        try:
+            before, after = read_run(args.store, first), read_run(args.store, second)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        diff = diff_runs(before, after, expected)
+        print_diff(first, second, diff, cases, args.limit)
+
+if __name__ == "__main__":
+    main()
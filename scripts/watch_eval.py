@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Incremental evaluation watch mode
+Keeps every case's last output, and whenever the engine or its rule table is
+saved rescores only the cases the change can affect, then prints the score,
+an error histogram and the worst cases
+
+A rule table change is scored exactly. A code change is only probed a few
+cases per partition, so its score is marked approximate until the full
+rescore that follows once saves settle (or when Enter is pressed)
+"""
+
+import os
+import sys
+import time
+import select
+import hashlib
+import argparse
+import importlib
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "algorithms"))
+
+import reimbursement_rules
+import calculate_reimbursement
+import case_cache
+from evaluate import DEFAULT_CASES, compute_metrics, worst_cases, bc_format
+
+ENGINE_FILE = os.path.abspath(calculate_reimbursement.__file__)
+
+# Probes per partition when the engine code itself changes
+PROBES_PER_PARTITION = 2
+
+# Seconds without a save before a probed code change is fully rescored
+FULL_RESCORE_DELAY = 2.0
+
+# Upper edges, in dollars, of the error histogram buckets
+HISTOGRAM_EDGES = (0.01, 1, 10, 50, 100, 250, 500, 1000, float("inf"))
+
+def _file_digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def affected_by_rules(inputs, old_rules, new_rules):
+    """
+    Cases whose value can differ between two rule tables
+
+    A rule gives a case the same value under both tables exactly when the
+    band it falls in has the same base, rate and origin in each, so only
+    cases that hit a changed or moved band are flagged.
+    """
+    affected = np.zeros(len(inputs["per_diem"]), dtype=bool)
+    for name in reimbursement_rules.RULE_NAMES:
+        x = inputs[name]
+        old, new = old_rules[name], new_rules[name]
+        old_band = np.searchsorted(old.breakpoint_array, x, side='left')
+        new_band = np.searchsorted(new.breakpoint_array, x, side='left')
+        same = ((old.base_array[old_band] == new.base_array[new_band])
+                & (old.rate_array[old_band] == new.rate_array[new_band])
+                & (old.origin_array[old_band] == new.origin_array[new_band]))
+        affected |= ~same
+    return affected
+
+def partition_keys(days, inputs, rules):
+    """
+    Partition id per case keyed on days and the band of every rule
+
+    Probes only see edits that change a whole partition; an edit keyed on
+    a threshold that is not a band boundary can still slip past them.
+    """
+    columns = [days]
+    for name in reimbursement_rules.RULE_NAMES:
+        columns.append(np.searchsorted(rules[name].breakpoint_array, inputs[name], side='left'))
+    keys = np.stack(columns, axis=1)
+    return np.unique(keys, axis=0, return_inverse=True)[1].ravel()
+
+def affected_by_probes(engine, days, miles, receipts, previous, keys, probes=PROBES_PER_PARTITION):
+    """
+    Cases in partitions where the new engine disagrees with a previous
+    output on any probe case
+
+    Returns (affected mask, probe indices, probe outputs) so the probes do
+    not have to be scored twice.
+    """
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    # Rank of each case within its partition, in case order
+    rank = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+    probe_index = np.sort(order[rank < probes])
+
+    probe_output = engine(days[probe_index], miles[probe_index], receipts[probe_index])
+    changed = np.unique(keys[probe_index][probe_output != previous[probe_index]])
+    return np.isin(keys, changed), probe_index, probe_output
+
+def error_histogram(error_cents):
+    """Case counts per HISTOGRAM_EDGES bucket of absolute error"""
+    edges = np.array([edge * 100 for edge in HISTOGRAM_EDGES])
+    buckets = np.searchsorted(edges, error_cents, side='right')
+    return np.bincount(buckets, minlength=len(edges))[:len(edges)]
+
+def print_report(cases, outputs, metrics, previous_score, rescored, elapsed, approximate=False):
+    days, miles, receipts, expected = cases
+    score = bc_format(metrics['score_cents'], 2)
+    change = ""
+    if previous_score is not None:
+        delta = metrics['score_cents'] - previous_score
+        change = f" ({'+' if delta >= 0 else '-'}{abs(delta) / 100:.2f})"
+    print(f"🎯 Score: {score}{change}   exact {metrics['exact_matches']}, "
+          f"close {metrics['close_matches']}, avg error ${bc_format(metrics['avg_error_cents'], 2)}   "
+          f"[{rescored}/{len(days)} cases rescored in {elapsed * 1000:.1f} ms]")
+    if approximate:
+        print("⚠️  Approximate: the code change was only probed; a full rescore follows "
+              "once saves settle (or press Enter)")
+
+    print("📊 Error histogram:")
+    low = 0
+    counts = error_histogram(metrics['error_cents'])
+    for edge, count in zip(HISTOGRAM_EDGES, counts):
+        label = f"${low:g}-${edge:g}" if edge != float("inf") else f"${low:g}+"
+        bar = "█" * int(round(40 * count / max(1, len(days))))
+        print(f"  {label:>12} {count:6d} {bar}")
+        low = edge
+
+    print("💡 Worst cases:")
+    for i in worst_cases(metrics['error_cents']):
+        print(f"    Case {i + 1}: {int(days[i])} days, {miles[i]:g} miles, ${receipts[i]:.2f} receipts  "
+              f"Expected: ${expected[i]:.2f}, Got: ${outputs[i]:.2f}")
+    print()
+
+class _Engine:
+    """The currently loaded engine modules and what they were loaded from"""
+
+    def __init__(self):
+        self.engine_digest = _file_digest(ENGINE_FILE)
+        self.rules = calculate_reimbursement.RULES
+
+    def reload(self):
+        """Reload both modules; returns (engine code changed, old rules)"""
+        old_rules = self.rules
+        engine_digest = _file_digest(ENGINE_FILE)
+        importlib.reload(reimbursement_rules)
+        importlib.reload(calculate_reimbursement)
+        code_changed = engine_digest != self.engine_digest
+        self.engine_digest = engine_digest
+        self.rules = calculate_reimbursement.RULES
+        return code_changed, old_rules
+
+def _enter_pressed(timeout):
+    """Wait up to timeout seconds; True if a line was entered on a terminal"""
+    if not sys.stdin.isatty():
+        time.sleep(timeout)
+        return False
+    if select.select([sys.stdin], [], [], timeout)[0]:
+        sys.stdin.readline()
+        return True
+    return False
+
+def watch(cases_path=DEFAULT_CASES, interval=0.2, once=False, full_delay=FULL_RESCORE_DELAY):
+    """
+    Score everything once, then rescore incrementally on every save
+
+    Probed code changes are fully rescored after full_delay seconds without
+    another save (never if full_delay is None), or when Enter is pressed.
+    """
+    days, miles, receipts, expected = case_cache.to_float64(case_cache.load_cases(cases_path))
+    if expected is None:
+        raise ValueError(f"{cases_path} has no expected outputs")
+    cases = (days, miles, receipts, expected)
+
+    engine = _Engine()
+    started = time.perf_counter()
+    outputs = calculate_reimbursement.calculate_reimbursement_batch(days, miles, receipts)
+    metrics = compute_metrics(expected, outputs)
+    print_report(cases, outputs, metrics, None, len(days), time.perf_counter() - started)
+    if once:
+        return
+
+    inputs, _ = calculate_reimbursement.batch_rule_inputs(days, miles, receipts)
+    watched = [ENGINE_FILE, reimbursement_rules.RULES_FILE]
+    mtimes = [os.stat(path).st_mtime_ns for path in watched]
+    print(f"👀 Watching {', '.join(os.path.relpath(path, REPO_ROOT) for path in watched)} "
+          f"(Enter for a full rescore, Ctrl-C to stop)")
+    approximate = False
+    last_save = time.perf_counter()
+
+    while True:
+        full = _enter_pressed(interval)
+        current = [os.stat(path).st_mtime_ns for path in watched]
+        if current == mtimes:
+            settled = full_delay is not None and time.perf_counter() - last_save >= full_delay
+            if full or (approximate and settled):
+                started = time.perf_counter()
+                previous_score = metrics['score_cents']
+                outputs = calculate_reimbursement.calculate_reimbursement_batch(days, miles, receipts)
+                metrics = compute_metrics(expected, outputs)
+                approximate = False
+                print_report(cases, outputs, metrics, previous_score, len(days), time.perf_counter() - started)
+            continue
+        mtimes = current
+        last_save = time.perf_counter()
+
+        started = time.perf_counter()
+        try:
+            code_changed, old_rules = engine.reload()
+        except Exception as e:
+            # A half-written save; keep the last good engine and wait for the next one
+            print(f"❌ Could not load the engine: {type(e).__name__}: {e}\n")
+            continue
+
+        batch = calculate_reimbursement.calculate_reimbursement_batch
+        new_outputs = outputs.copy()
+        approximate = approximate or code_changed
+        if code_changed:
+            inputs, _ = calculate_reimbursement.batch_rule_inputs(days, miles, receipts)
+            keys = partition_keys(days, inputs, engine.rules)
+            affected, probe_index, probe_output = affected_by_probes(batch, days, miles, receipts, outputs, keys)
+            new_outputs[probe_index] = probe_output
+            affected[probe_index] = False
+            rescored = len(probe_index)
+        else:
+            affected = affected_by_rules(inputs, old_rules, engine.rules)
+            rescored = 0
+        if affected.any():
+            new_outputs[affected] = batch(days[affected], miles[affected], receipts[affected])
+            rescored += int(np.count_nonzero(affected))
+
+        previous_score = metrics['score_cents']
+        outputs = new_outputs
+        metrics = compute_metrics(expected, outputs)
+        print_report(cases, outputs, metrics, previous_score, rescored, time.perf_counter() - started,
+                     approximate)
+
+def main():
+    """Run the watch loop"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cases", default=DEFAULT_CASES,
+                        help="public case file to score against (default: data/public_cases.json)")
+    parser.add_argument("--interval", type=float, default=0.2,
+                        help="seconds between checks for saved changes (default: 0.2)")
+    parser.add_argument("--full-rescore", type=float, default=FULL_RESCORE_DELAY, metavar="SECONDS",
+                        help="seconds without a save before a probed code change is fully rescored, "
+                             f"0 to only rescore on Enter (default: {FULL_RESCORE_DELAY:g})")
+    parser.add_argument("--once", action="store_true", help="print the current report and exit")
+    args = parser.parse_args()
+    if args.full_rescore < 0:
+        parser.error("--full-rescore must not be negative")
+
+    try:
+        watch(args.cases, args.interval, args.once, args.full_rescore or None)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
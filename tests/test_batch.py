@@ -0,0 +1,30 @@
+"""
+calculate_reimbursement_batch() must agree with calculate_reimbursement()
+"""
+
+import os
+import sys
+import json
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "algorithms"))
+
+from calculate_reimbursement import calculate_reimbursement, calculate_reimbursement_batch
+
+PUBLIC_CASES = os.path.join(REPO_ROOT, "data", "public_cases.json")
+
+def test_batch_matches_scalar_on_public_cases():
+    with open(PUBLIC_CASES, 'r') as f:
+        trips = [case["input"] for case in json.load(f)]
+    days = np.array([trip["trip_duration_days"] for trip in trips])
+    miles = np.array([trip["miles_traveled"] for trip in trips], dtype=np.float64)
+    receipts = np.array([trip["total_receipts_amount"] for trip in trips], dtype=np.float64)
+
+    batch = calculate_reimbursement_batch(days, miles, receipts)
+    scalar = np.array([calculate_reimbursement(*trip) for trip in zip(days.tolist(), miles.tolist(),
+                                                                      receipts.tolist())])
+    mismatched = np.flatnonzero(batch != scalar)
+    assert len(batch) == len(trips)
+    assert not len(mismatched), [(int(i) + 1, batch[i], scalar[i]) for i in mismatched[:10]]